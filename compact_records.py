@@ -0,0 +1,203 @@
+"""
+Compact Records - slotted record types for patients, doctors, hospitals, beds and visits
+A plain dict per record carries a hash table sized for its 15-25 keys; these
+classes keep the values in __slots__ and share one field list across every
+instance, so a large in-memory store costs a fraction of the memory. The
+in-memory tables, the local FHIR store and the FHIR result cache hold their
+records this way (see RECORD_TYPES and to_record). Records
+still behave like dicts (record["id"], .get(), iteration, item assignment), so
+existing callers keep working, and they serialize as plain dicts wherever they
+appear in a FastAPI response, including nested inside another dict.
+"""
+import importlib
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple, Type
+from pydantic_core import SchemaSerializer, core_schema
+from backend.app.services.fhir_json import dumps
+
+class CompactRecord(MutableMapping):
+    """
+    Dict-like record whose known fields live in __slots__
+    
+    Subclasses list their fields in FIELDS and declare __slots__ = FIELDS. A
+    field that was never set is absent (as a missing dict key would be), and
+    keys outside FIELDS go to a small overflow dict so no data is dropped.
+    """
+    __slots__ = ("_extra",)
+    
+    FIELDS: Tuple[str, ...] = ()
+    # "module:Class" of the Pydantic model the record converts to with to_model()
+    MODEL: Optional[str] = None
+    _field_set = frozenset()
+    # Pydantic looks this up on values it has no schema for (e.g. a record inside a
+    # response_model=dict response), so records serialize as their to_dict()
+    __pydantic_serializer__ = SchemaSerializer(core_schema.any_schema(
+        serialization=core_schema.plain_serializer_function_ser_schema(lambda record: record.to_dict())
+    ))
+    
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._field_set = frozenset(cls.FIELDS)
+    
+    def __init__(self, data: Optional[Mapping] = None, **fields):
+        self._extra: Optional[Dict[str, Any]] = None
+        if data:
+            self.update(data)
+        if fields:
+            self.update(fields)
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._extra is None:
+            raise KeyError(key)
+        return self._extra[key]
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._field_set:
+            return getattr(self, key, default)
+        return default if self._extra is None else self._extra.get(key, default)
+    
+    def __setitem__(self, key: str, value: Any):
+        if key in self._field_set:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+    
+    def __delitem__(self, key: str):
+        if key in self._field_set:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+    
+    def __contains__(self, key: object) -> bool:
+        if key in self._field_set:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+    
+    def __iter__(self) -> Iterator[str]:
+        for field in self.FIELDS:
+            if hasattr(self, field):
+                yield field
+        if self._extra:
+            yield from self._extra
+    
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_dict()!r})"
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        return self.to_dict()
+    
+    def __setstate__(self, state: Dict[str, Any]):
+        self._extra = None
+        self.update(state)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain dict copy, fields first in FIELDS order"""
+        data = {field: getattr(self, field) for field in self.FIELDS if hasattr(self, field)}
+        if self._extra:
+            data.update(self._extra)
+        return data
+    
+    def to_json(self) -> bytes:
+        """JSON encoding (via orjson when it is installed)"""
+        return dumps(self.to_dict())
+    
+    def to_model(self):
+        """
+        Validate into the record's Pydantic model (fields the model does not declare are ignored)
+        
+        Raises:
+            TypeError if the record type has no model
+        """
+        if not self.MODEL:
+            raise TypeError(f"{type(self).__name__} has no Pydantic model")
+        module, name = self.MODEL.split(":")
+        return getattr(importlib.import_module(module), name).model_validate(self.to_dict())
+    
+    def copy(self) -> "CompactRecord":
+        return type(self)(self)
+    
+    def updated(self, changes: Mapping) -> "CompactRecord":
+        """New record with changes applied, like {**record, **changes}"""
+        record = self.copy()
+        record.update(changes)
+        return record
+
+class PatientRecord(CompactRecord):
+    """Patient in the in-memory stores, with the fields of fhir_mapper.fhir_patient_to_model"""
+    FIELDS = (
+        "id", "first_name", "last_name", "date_of_birth", "gender", "email", "phone", "address",
+        "emergency_contact_name", "emergency_contact_phone", "blood_type", "allergies", "medical_history",
+        "insurance_provider", "insurance_id", "primary_care_physician", "created_at", "updated_at"
+    )
+    __slots__ = FIELDS
+    MODEL = "backend.app.models.patient:Patient"
+
+class DoctorRecord(CompactRecord):
+    """Doctor in the in-memory stores, with the fields of fhir_mapper.fhir_practitioner_to_doctor"""
+    FIELDS = (
+        "id", "first_name", "last_name", "specialization", "qualification", "license_number", "email", "phone",
+        "hospital_id", "department", "experience_years", "languages", "consultation_fee", "availability",
+        "next_available", "rating", "created_at", "updated_at"
+    )
+    __slots__ = FIELDS
+    MODEL = "backend.app.models.doctor:Doctor"
+
+class HospitalRecord(CompactRecord):
+    """Hospital in the in-memory stores, with the fields of fhir_mapper.fhir_organization_to_hospital"""
+    FIELDS = (
+        "id", "name", "address", "city", "state", "zip_code", "country", "phone", "email", "emergency_phone",
+        "hospital_type", "total_beds", "icu_beds", "specialties", "facilities", "operating_hours", "website",
+        "rating", "trauma_level", "created_at", "updated_at"
+    )
+    __slots__ = FIELDS
+    MODEL = "backend.app.models.hospital:Hospital"
+
+class BedAvailabilityRecord(CompactRecord):
+    """Bed availability for one hospital"""
+    FIELDS = (
+        "id", "hospital_id", "hospital_name", "total_beds", "occupied_beds", "available_beds", "icu_beds",
+        "occupied_icu", "available_icu", "emergency_beds", "available_emergency", "surgery_rooms",
+        "available_surgery", "occupancy_rate", "icu_occupancy_rate", "last_updated", "status"
+    )
+    __slots__ = FIELDS
+
+class VisitRecord(CompactRecord):
+    """Visit with the fields of fhir_mapper.fhir_encounter_to_visit"""
+    FIELDS = (
+        "id", "patientId", "patientName", "encounterType", "encounterCode", "status", "startDate", "startTime",
+        "endDate", "endTime", "durationMinutes", "hospitalId", "hospitalName", "location", "reason",
+        "diagnoses", "participants"
+    )
+    __slots__ = FIELDS
+
+# Record type the mapped records of each FHIR resource type are held in
+RECORD_TYPES: Dict[str, Type[CompactRecord]] = {
+    "Patient": PatientRecord,
+    "Practitioner": DoctorRecord,
+    "Organization": HospitalRecord,
+    "Encounter": VisitRecord
+}
+
+def to_record(resource_type: str, data: Optional[Mapping]) -> Optional[Mapping]:
+    """data as a record of RECORD_TYPES[resource_type] (types without one, records and None pass through)"""
+    record_type = RECORD_TYPES.get(resource_type)
+    if record_type is None or data is None or isinstance(data, CompactRecord):
+        return data
+    return record_type(data)
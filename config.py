@@ -8,6 +8,89 @@ FHIR_BASE_URL = os.getenv("FHIR_BASE_URL", "https://hapi.fhir.org/baseR4")
 # Use real FHIR data by default - set to False to use in-memory mock data
 FHIR_USE_REAL_DATA = os.getenv("FHIR_USE_REAL_DATA", "true").lower() == "true"
 
+# FHIR connection pool settings (shared by the sync and async clients)
+FHIR_POOL_MAX_CONNECTIONS = int(os.getenv("FHIR_POOL_MAX_CONNECTIONS", "100"))
+FHIR_POOL_MAX_KEEPALIVE = int(os.getenv("FHIR_POOL_MAX_KEEPALIVE", "20"))
+FHIR_KEEPALIVE_EXPIRY = float(os.getenv("FHIR_KEEPALIVE_EXPIRY", "30"))
+# Maximum number of in-flight async requests per FHIR host
+FHIR_MAX_CONCURRENCY_PER_HOST = int(os.getenv("FHIR_MAX_CONCURRENCY_PER_HOST", "20"))
+# Maximum number of entries sent in one FHIR batch Bundle
+FHIR_BATCH_MAX_ENTRIES = int(os.getenv("FHIR_BATCH_MAX_ENTRIES", "200"))
+# Maximum number of entries sent in one FHIR transaction Bundle (each chunk commits on its own)
+FHIR_TRANSACTION_MAX_ENTRIES = int(os.getenv("FHIR_TRANSACTION_MAX_ENTRIES", "500"))
+
+# FHIR response cache (TTL + LRU); set FHIR_CACHE_ENABLED=false for strictly real-time reads
+FHIR_CACHE_ENABLED = os.getenv("FHIR_CACHE_ENABLED", "true").lower() == "true"
+FHIR_CACHE_MAX_ENTRIES = int(os.getenv("FHIR_CACHE_MAX_ENTRIES", "1024"))
+# Seconds an entry is served without revalidation, per resource type
+FHIR_CACHE_TTLS = {
+    "Organization": float(os.getenv("FHIR_CACHE_TTL_ORGANIZATION", "3600")),
+    "Practitioner": float(os.getenv("FHIR_CACHE_TTL_PRACTITIONER", "1800")),
+    "PractitionerRole": float(os.getenv("FHIR_CACHE_TTL_PRACTITIONER_ROLE", "1800")),
+    "Patient": float(os.getenv("FHIR_CACHE_TTL_PATIENT", "60")),
+}
+FHIR_CACHE_DEFAULT_TTL = float(os.getenv("FHIR_CACHE_DEFAULT_TTL", "30"))
+# Seconds past the TTL during which a stale entry is served while it refreshes in the background
+FHIR_CACHE_STALE_SECONDS = float(os.getenv("FHIR_CACHE_STALE_SECONDS", "300"))
+# Resources remembered with their ETag/Last-Modified for conditional (304) re-reads
+FHIR_CONDITIONAL_READ_ENTRIES = int(os.getenv("FHIR_CONDITIONAL_READ_ENTRIES", "5000"))
+
+# Seconds a server's CapabilityStatement (/metadata) is trusted before it is re-read
+FHIR_CAPABILITIES_TTL = float(os.getenv("FHIR_CAPABILITIES_TTL", "3600"))
+
+# Federated search: comma-separated name=url FHIR servers queried together (defaults to FHIR_BASE_URL alone)
+FHIR_FEDERATION_SERVERS = {
+    name.strip(): url.strip()
+    for name, url in (entry.split("=", 1) for entry in os.getenv("FHIR_FEDERATION_SERVERS", "").split(",") if "=" in entry)
+} or {"primary": FHIR_BASE_URL}
+# Seconds each federated server gets before its results are left out
+FHIR_FEDERATION_DEADLINE = float(os.getenv("FHIR_FEDERATION_DEADLINE", "5"))
+
+# Seconds a paged FHIR list endpoint may spend upstream before returning a partial page with a cursor
+FHIR_REQUEST_BUDGET = float(os.getenv("FHIR_REQUEST_BUDGET", "5"))
+# Seconds the patient summary fan-out may take before unfinished sections are left out
+FHIR_SUMMARY_DEADLINE = float(os.getenv("FHIR_SUMMARY_DEADLINE", "8"))
+
+# Local FHIR store (SQLite) filled by bulk $export ingest
+FHIR_STORE_PATH = os.getenv("FHIR_STORE_PATH", "fhir_store.db")
+# Bulk $export: files ingested in parallel, status poll interval, overall deadline and rows per checkpoint
+FHIR_EXPORT_WORKERS = int(os.getenv("FHIR_EXPORT_WORKERS", "4"))
+FHIR_EXPORT_POLL_SECONDS = float(os.getenv("FHIR_EXPORT_POLL_SECONDS", "5"))
+FHIR_EXPORT_TIMEOUT = float(os.getenv("FHIR_EXPORT_TIMEOUT", "3600"))
+FHIR_EXPORT_BATCH_SIZE = int(os.getenv("FHIR_EXPORT_BATCH_SIZE", "500"))
+
+# Background sync of catalog resources into the local store; reads are served locally once a type is synced
+FHIR_SYNC_ENABLED = os.getenv("FHIR_SYNC_ENABLED", "false").lower() == "true"
+FHIR_SYNC_TYPES = [t.strip() for t in os.getenv("FHIR_SYNC_TYPES", "Organization,Practitioner,PractitionerRole,Coverage").split(",") if t.strip()]
+FHIR_SYNC_INTERVAL = float(os.getenv("FHIR_SYNC_INTERVAL", "60"))
+FHIR_SYNC_PAGE_SIZE = int(os.getenv("FHIR_SYNC_PAGE_SIZE", "200"))
+
+# JSON decoder for FHIR responses: "auto" (orjson when installed), "orjson" or "json"
+FHIR_JSON_BACKEND = os.getenv("FHIR_JSON_BACKEND", "auto").lower()
+# Bytes read per chunk when a search Bundle is parsed incrementally
+FHIR_STREAM_CHUNK_SIZE = int(os.getenv("FHIR_STREAM_CHUNK_SIZE", "65536"))
+
+# FHIR resilience: retries for idempotent calls (jittered exponential backoff)
+FHIR_RETRY_MAX = int(os.getenv("FHIR_RETRY_MAX", "2"))
+FHIR_RETRY_BASE_DELAY = float(os.getenv("FHIR_RETRY_BASE_DELAY", "0.2"))
+FHIR_RETRY_MAX_DELAY = float(os.getenv("FHIR_RETRY_MAX_DELAY", "2.0"))
+# Per-host circuit breaker: consecutive failures before opening, seconds before a trial request
+FHIR_BREAKER_FAILURE_THRESHOLD = int(os.getenv("FHIR_BREAKER_FAILURE_THRESHOLD", "5"))
+FHIR_BREAKER_RESET_SECONDS = float(os.getenv("FHIR_BREAKER_RESET_SECONDS", "30"))
+# Hedged reads: send a duplicate GET once the first is slower than this latency percentile
+FHIR_HEDGE_ENABLED = os.getenv("FHIR_HEDGE_ENABLED", "false").lower() == "true"
+FHIR_HEDGE_PERCENTILE = float(os.getenv("FHIR_HEDGE_PERCENTILE", "95"))
+FHIR_HEDGE_MIN_SAMPLES = int(os.getenv("FHIR_HEDGE_MIN_SAMPLES", "20"))
+
+# Client-side rate limits (token buckets): requests/second and burst per FHIR host and per resource type
+FHIR_RATE_LIMIT_ENABLED = os.getenv("FHIR_RATE_LIMIT_ENABLED", "true").lower() == "true"
+FHIR_RATE_LIMIT_HOST_RPS = float(os.getenv("FHIR_RATE_LIMIT_HOST_RPS", "20"))
+FHIR_RATE_LIMIT_HOST_BURST = int(os.getenv("FHIR_RATE_LIMIT_HOST_BURST", "40"))
+FHIR_RATE_LIMIT_TYPE_RPS = float(os.getenv("FHIR_RATE_LIMIT_TYPE_RPS", "10"))
+FHIR_RATE_LIMIT_TYPE_BURST = int(os.getenv("FHIR_RATE_LIMIT_TYPE_BURST", "20"))
+# Longest 429 Retry-After honoured by pausing a host's bucket (longer values are capped)
+FHIR_RATE_LIMIT_MAX_PAUSE = float(os.getenv("FHIR_RATE_LIMIT_MAX_PAUSE", "60"))
+
 # Application Settings
 DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
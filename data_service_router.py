@@ -6,7 +6,7 @@ from typing import List, Dict, Optional
 
 # Always use real data service for comprehensive healthcare data
 from backend.app.services.real_data_service import (
-    get_all_patients, get_patient, create_patient, update_patient, delete_patient,
+    get_all_patients, count_patients, get_patient, create_patient, update_patient, delete_patient,
     get_all_doctors, get_doctor, get_doctors_by_hospital, get_doctors_by_specialization,
     create_doctor, update_doctor, delete_doctor,
     get_all_hospitals, get_hospital, search_hospitals,
@@ -16,7 +16,7 @@ from backend.app.services.real_data_service import (
 
 # Export all functions
 __all__ = [
-    "get_all_patients", "get_patient", "create_patient", "update_patient", "delete_patient",
+    "get_all_patients", "count_patients", "get_patient", "create_patient", "update_patient", "delete_patient",
     "get_all_doctors", "get_doctor", "get_doctors_by_hospital", "get_doctors_by_specialization",
     "create_doctor", "update_doctor", "delete_doctor",
     "get_all_hospitals", "get_hospital", "search_hospitals",
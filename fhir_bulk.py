@@ -0,0 +1,167 @@
+"""
+FHIR Bulk Data - $export (NDJSON) ingestion into the local FHIR store
+Kicks off an export, polls its status URL and streams every output file
+through the fhir_mapper functions, checkpointing as it goes so an
+interrupted ingest resumes without re-applying work.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import List, Dict, Optional, Union
+from backend.app.config import (
+    FHIR_EXPORT_WORKERS,
+    FHIR_EXPORT_POLL_SECONDS,
+    FHIR_EXPORT_TIMEOUT,
+    FHIR_EXPORT_BATCH_SIZE
+)
+from backend.app.services.fhir_client import FHIRClient, get_fhir_client
+from backend.app.services.fhir_mapper import MAPPERS
+from backend.app.services.fhir_store import FHIRStore, StoreRow, get_store
+
+class BulkExportError(Exception):
+    """The $export could not be started, failed on the server or timed out"""
+
+class ExportStatusError(BulkExportError):
+    """The $export status URL failed (the job errored, expired or is gone), so it cannot be resumed"""
+
+def to_store_row(resource: Dict, now: Optional[str] = None) -> StoreRow:
+    """
+    Map a FHIR resource for the local store (types without a mapper keep only the raw resource)
+    
+    Args:
+        now: Timestamp shared by the batch being ingested (defaults to the current time)
+    """
+    mapper = MAPPERS.get(resource.get("resourceType"))
+    record = None
+    if mapper:
+        try:
+            record = mapper(resource, now)
+        except Exception as e:
+            print(f"Error mapping FHIR {resource.get('resourceType')}: {e}")
+    return resource.get("id"), resource, record, resource.get("meta", {}).get("lastUpdated")
+
+def wait_for_export(client: FHIRClient, status_url: str, timeout: float = FHIR_EXPORT_TIMEOUT) -> Dict:
+    """
+    Poll a $export status URL until the manifest is ready
+    
+    Honours the server's Retry-After, falling back to FHIR_EXPORT_POLL_SECONDS.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            manifest, retry_after = client.export_status(status_url)
+        except Exception as e:
+            raise ExportStatusError(f"FHIR $export failed: {e}") from e
+        if manifest is not None:
+            return manifest
+        
+        delay = retry_after if retry_after is not None else FHIR_EXPORT_POLL_SECONDS
+        if time.monotonic() + delay > deadline:
+            raise BulkExportError(f"FHIR $export did not finish within {timeout:.0f}s")
+        time.sleep(delay)
+
+def ingest_file(client: FHIRClient, store: FHIRStore, status_url: str, output: Dict,
+                batch_size: int = FHIR_EXPORT_BATCH_SIZE) -> int:
+    """
+    Stream one NDJSON output file into the store
+    
+    Lines already checkpointed by an earlier, interrupted run are skipped, and
+    each batch is written together with its checkpoint.
+    
+    Returns:
+        Number of resources ingested by this call
+    """
+    url = output["url"]
+    lines_done, done = store.file_progress(status_url, url)
+    if done:
+        return 0
+    
+    ingested = 0
+    line_number = 0
+    batch = []
+    now = datetime.now().isoformat()
+    for resource in client.iter_ndjson(url):
+        line_number += 1
+        if line_number <= lines_done:
+            continue
+        batch.append(to_store_row(resource, now))
+        if len(batch) >= batch_size:
+            store.ingest(status_url, url, output.get("type"), batch, line_number)
+            ingested += len(batch)
+            batch = []
+    
+    store.ingest(status_url, url, output.get("type"), batch, line_number, done=True)
+    return ingested + len(batch)
+
+def run_export(
+    resource_types: List[str] = None,
+    since: Union[str, datetime, None] = None,
+    client: Optional[FHIRClient] = None,
+    store: Optional[FHIRStore] = None,
+    workers: int = FHIR_EXPORT_WORKERS
+) -> Dict:
+    """
+    Run a Bulk Data $export into the local store, resuming an unfinished
+    export of the same resource types and since if there is one
+    
+    A job whose status URL fails is marked abandoned so no later run resumes
+    it; when that job was being resumed, a new $export is started instead.
+    
+    Args:
+        resource_types: Resource types to export (_type); None exports everything
+        since: Only export resources updated after this instant (_since)
+        client: FHIR client (defaults to the global one; point it at a local stand-in to test)
+        store: Destination store (defaults to the global one)
+        workers: Output files ingested in parallel
+    
+    Returns:
+        Summary with the status URL, files, per-type resource counts and the
+        export's transactionTime (a safe _since for the next incremental run)
+    """
+    client = client or get_fhir_client()
+    store = store or get_store()
+    
+    if isinstance(since, datetime):
+        since = since.isoformat()
+    job = store.unfinished_export(resource_types, since)
+    resumed = job is not None
+    if job is None:
+        try:
+            status_url = client.export(resource_types, since)
+        except Exception as e:
+            raise BulkExportError(f"FHIR $export could not be started: {e}") from e
+        store.begin_export(status_url, resource_types, since)
+        job = {"status_url": status_url, "manifest": None}
+    
+    status_url = job["status_url"]
+    manifest = job["manifest"]
+    if manifest is None:
+        try:
+            manifest = wait_for_export(client, status_url)
+        except ExportStatusError:
+            store.abandon_export(status_url)
+            if not resumed:
+                raise
+            # The saved job expired or failed on the server: start over with a new one
+            return run_export(resource_types, since, client, store, workers)
+        store.save_manifest(status_url, manifest)
+    
+    outputs = manifest.get("output", [])
+    counts: Dict[str, int] = {}
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="fhir-export") as executor:
+        futures = [(output, executor.submit(ingest_file, client, store, status_url, output)) for output in outputs]
+        for output, future in futures:
+            try:
+                ingested = future.result()
+            except Exception as e:
+                # The checkpoint stays in place, so the next run resumes from here
+                raise BulkExportError(f"FHIR $export file {output.get('url')} failed: {e}") from e
+            counts[output.get("type")] = counts.get(output.get("type"), 0) + ingested
+    
+    return {
+        "status_url": status_url,
+        "files": len(outputs),
+        "resources": counts,
+        "transaction_time": store.finish_export(status_url),
+        "errors": manifest.get("error", [])
+    }
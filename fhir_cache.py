@@ -0,0 +1,223 @@
+"""
+FHIR Cache - TTL + LRU cache for FHIR search/read results
+Entries are keyed by resource type plus normalized search params, expire per
+resource type, and are refreshed in the background while stale. Callers get
+their own copy of a cached value, so mutating a result never reaches the cache.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from backend.app.config import (
+    FHIR_CACHE_MAX_ENTRIES,
+    FHIR_CACHE_TTLS,
+    FHIR_CACHE_DEFAULT_TTL,
+    FHIR_CACHE_STALE_SECONDS,
+    FHIR_CONDITIONAL_READ_ENTRIES
+)
+
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def cache_key(resource_type: str, params: Optional[Dict[str, Any]] = None) -> CacheKey:
+    """
+    Build a cache key from a resource type and search params
+    
+    Params are normalized so that ordering, value types and list ordering do not
+    produce different keys for the same query (e.g. {"_count": 50} == {"_count": "50"}).
+    """
+    normalized = []
+    for name, value in (params or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            value = ",".join(sorted(str(v) for v in value))
+        normalized.append((str(name), str(value)))
+    return resource_type, tuple(sorted(normalized))
+
+
+class FHIRCache:
+    def __init__(
+        self,
+        max_entries: int = FHIR_CACHE_MAX_ENTRIES,
+        ttls: Dict[str, float] = None,
+        default_ttl: float = FHIR_CACHE_DEFAULT_TTL,
+        stale_seconds: float = FHIR_CACHE_STALE_SECONDS
+    ):
+        """
+        Initialize the cache
+        
+        Args:
+            max_entries: Entries kept before the least recently used is evicted
+            ttls: Seconds an entry stays fresh, per resource type
+            default_ttl: Freshness for resource types not listed in ttls
+            stale_seconds: Window after expiry in which a stale value is served while it refreshes
+        """
+        self.max_entries = max_entries
+        self.ttls = dict(FHIR_CACHE_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.stale_seconds = stale_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._refreshing = set()
+        # Bumped by invalidate(); a fetch that started before an invalidation is not stored
+        self._epoch = 0
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+    
+    def _ttl(self, resource_type: str) -> float:
+        return self.ttls.get(resource_type, self.default_ttl)
+    
+    def _generation(self, resource_type: str) -> Tuple[int, int]:
+        return self._epoch, self._generations.get(resource_type, 0)
+    
+    def get(self, resource_type: str, params: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        """Get a fresh cached value, or None"""
+        key = cache_key(resource_type, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self._ttl(resource_type):
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(entry[1])
+    
+    def set(self, resource_type: str, params: Optional[Dict[str, Any]], value: Any):
+        """Store a value, evicting the least recently used entries beyond max_entries"""
+        key = cache_key(resource_type, params)
+        with self._lock:
+            self._store(key, copy.deepcopy(value))
+    
+    def _store(self, key: CacheKey, value: Any):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats["evictions"] += 1
+    
+    def get_or_fetch(self, resource_type: str, params: Optional[Dict[str, Any]], fetch: Callable[[], Any]) -> Any:
+        """
+        Get a cached value, calling fetch() on a miss
+        
+        Fresh entries are returned directly. Entries past their TTL but within
+        the stale window are returned immediately while fetch() refreshes them
+        on a background thread. Anything older is fetched synchronously.
+        Empty results (e.g. an upstream error) are not cached, nor are results
+        of a fetch that overlapped an invalidate() for the resource type, since
+        they may predate the write that caused it.
+        """
+        key = cache_key(resource_type, params)
+        with self._lock:
+            generation = self._generation(resource_type)
+            entry = self._entries.get(key)
+            if entry is not None:
+                age = time.monotonic() - entry[0]
+                ttl = self._ttl(resource_type)
+                if age <= ttl:
+                    self._entries.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return copy.deepcopy(entry[1])
+                if age <= ttl + self.stale_seconds:
+                    self._entries.move_to_end(key)
+                    self.stats["stale_hits"] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, fetch, generation), daemon=True).start()
+                    return copy.deepcopy(entry[1])
+            self.stats["misses"] += 1
+        
+        value = fetch()
+        if value:
+            with self._lock:
+                if self._generation(resource_type) == generation:
+                    self._store(key, copy.deepcopy(value))
+        return value
+    
+    def _refresh(self, key: CacheKey, fetch: Callable[[], Any], generation: Tuple[int, int]):
+        """Re-fetch a stale entry in the background"""
+        try:
+            value = fetch()
+            if value:
+                with self._lock:
+                    # Skip if the entry was invalidated while we were fetching
+                    if key in self._entries and self._generation(key[0]) == generation:
+                        self._store(key, copy.deepcopy(value))
+        except Exception as e:
+            print(f"FHIR cache refresh error: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+    
+    def invalidate(self, resource_type: Optional[str] = None):
+        """Drop every entry for resource_type (or the whole cache when None)"""
+        with self._lock:
+            if resource_type is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._epoch += 1
+            else:
+                self._generations[resource_type] = self._generations.get(resource_type, 0) + 1
+                keys = [key for key in self._entries if key[0] == resource_type]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+            self.stats["invalidations"] += removed
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class ConditionalReadCache:
+    def __init__(self, max_entries: int = FHIR_CONDITIONAL_READ_ENTRIES):
+        """
+        Remember read responses with their validators (ETag / Last-Modified)
+        so the next read can be sent as a conditional GET and a 304 served
+        from here without downloading or re-parsing the resource.
+        
+        Args:
+            max_entries: Resources remembered before the least recently used is dropped
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Optional[str], Optional[str], Dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"revalidated": 0, "modified": 0}
+    
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """If-None-Match / If-Modified-Since headers for a previously read url"""
+        with self._lock:
+            entry = self._entries.get(url)
+        if entry is None:
+            return {}
+        etag, last_modified, _ = entry
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+    
+    def not_modified(self, url: str) -> Optional[Dict]:
+        """Handle a 304 for url, returning the remembered resource (None if it was evicted meanwhile)"""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is None:
+                return None
+            self._entries.move_to_end(url)
+            self.stats["revalidated"] += 1
+            return entry[2]
+    
+    def remember(self, url: str, etag: Optional[str], last_modified: Optional[str], resource: Dict):
+        """Store a freshly downloaded resource if the server sent any validator"""
+        with self._lock:
+            self.stats["modified"] += 1
+            if not etag and not last_modified:
+                self._entries.pop(url, None)
+                return
+            self._entries[url] = (etag, last_modified, resource)
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def forget(self, url: str):
+        """Drop the remembered resource for url (after an update or delete)"""
+        with self._lock:
+            self._entries.pop(url, None)
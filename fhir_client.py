@@ -2,10 +2,216 @@
 FHIR Client Service for retrieving real-time data from FHIR servers
 Supports HAPI FHIR, Azure FHIR, and other FHIR R4 servers
 """
+import asyncio
+import time
+import uuid
 import requests
-from typing import List, Dict, Optional, Any
-import json
-from backend.app.config import FHIR_BASE_URL
+import httpx
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from requests.adapters import HTTPAdapter
+from datetime import datetime
+from typing import List, Dict, Optional, Any, Union, Iterator, AsyncIterator, Tuple
+from urllib.parse import urlparse
+from backend.app.config import (
+    FHIR_BASE_URL,
+    FHIR_POOL_MAX_CONNECTIONS,
+    FHIR_POOL_MAX_KEEPALIVE,
+    FHIR_KEEPALIVE_EXPIRY,
+    FHIR_MAX_CONCURRENCY_PER_HOST,
+    FHIR_BATCH_MAX_ENTRIES,
+    FHIR_TRANSACTION_MAX_ENTRIES,
+    FHIR_STREAM_CHUNK_SIZE,
+    FHIR_CAPABILITIES_TTL
+)
+from backend.app.services.fhir_json import BundleStreamParser, iter_bundle_entries, loads
+from backend.app.services.fhir_cache import cache_key, ConditionalReadCache
+from backend.app.services.singleflight import SingleFlight
+from backend.app.services.fhir_resilience import (
+    CircuitOpenError,
+    IDEMPOTENT_METHODS,
+    RETRYABLE_STATUS,
+    for_host,
+    retry_policy
+)
+from backend.app.services.fhir_ratelimit import rate_limiter
+from backend.app.services.fhir_deadline import DeadlineExceeded, clamp_timeout, within_budget
+
+# Coalesces identical concurrent searches/reads from both the sync and async clients. A leader
+# out of request budget withdraws its call instead of failing followers with budget left.
+_inflight = SingleFlight(personal=(DeadlineExceeded,))
+# ETag/Last-Modified validators for conditional reads, shared by both clients
+_validators = ConditionalReadCache()
+# Workers that run hedged duplicate reads for the blocking client
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="fhir-hedge")
+
+# Errors turned into empty results by the client methods (an open circuit or spent request budget fails fast).
+# ValueError covers a 2xx body that is not JSON (a proxy's HTML error page, an empty body);
+# orjson.JSONDecodeError and json.JSONDecodeError both subclass it.
+_SYNC_ERRORS = (requests.exceptions.RequestException, CircuitOpenError, DeadlineExceeded, ValueError)
+_ASYNC_ERRORS = (httpx.HTTPError, CircuitOpenError, DeadlineExceeded, ValueError)
+# Sync and async reads of the same URL share one call (see _inflight), so either may see the other's errors
+_READ_ERRORS = _SYNC_ERRORS + _ASYNC_ERRORS
+
+FHIR_HEADERS = {
+    "Accept": "application/fhir+json",
+    "Content-Type": "application/fhir+json"
+}
+
+def _is_included(entry: Dict) -> bool:
+    """Whether a search Bundle entry was added by _include/_revinclude rather than matched"""
+    return entry.get("search", {}).get("mode") == "include"
+
+def _bundle_resources(bundle: Dict) -> List[Dict]:
+    """Extract the matched (primary) entry resources from a FHIR search Bundle"""
+    resources = []
+    if bundle.get("resourceType") == "Bundle" and bundle.get("entry"):
+        for entry in bundle.get("entry", []):
+            if "resource" in entry and not _is_included(entry):
+                resources.append(entry["resource"])
+    return resources
+
+def _included_resources(bundle: Dict) -> Dict[str, Dict]:
+    """Index the _include/_revinclude entry resources of a search Bundle by reference"""
+    included = {}
+    if bundle.get("resourceType") == "Bundle" and bundle.get("entry"):
+        for entry in bundle.get("entry", []):
+            resource = entry.get("resource")
+            if resource and _is_included(entry):
+                included[f"{resource.get('resourceType')}/{resource.get('id')}"] = resource
+    return included
+
+def _search_params(
+    params: Dict[str, Any] = None,
+    include: List[str] = None,
+    revinclude: List[str] = None,
+    updated_since: Union[str, datetime, None] = None,
+    elements: List[str] = None
+) -> Dict[str, Any]:
+    """
+    Merge _include/_revinclude directives (e.g. "PractitionerRole:practitioner"),
+    an _lastUpdated lower bound and an _elements projection into search params
+    """
+    merged = dict(params or {})
+    if include:
+        merged["_include"] = list(include)
+    if revinclude:
+        merged["_revinclude"] = list(revinclude)
+    if updated_since:
+        if isinstance(updated_since, datetime):
+            updated_since = updated_since.isoformat()
+        merged["_lastUpdated"] = f"gt{updated_since}"
+    if elements:
+        merged["_elements"] = ",".join(elements)
+    return merged
+
+def _next_link(bundle: Dict) -> Optional[str]:
+    """Get the URL of the next page of a FHIR search Bundle, if any"""
+    for link in bundle.get("link", []):
+        if link.get("relation") == "next":
+            return link.get("url")
+    return None
+
+def _search_param_index(statement: Dict) -> Dict[str, set]:
+    """Index the search parameter names a CapabilityStatement declares, by resource type"""
+    index = {}
+    for rest in statement.get("rest", []):
+        for resource in rest.get("resource", []):
+            names = {param.get("name") for param in resource.get("searchParam", [])}
+            index.setdefault(resource.get("type"), set()).update(names)
+    return index
+
+def _resource_type(base_url: str, url: str) -> Optional[str]:
+    """Resource type a request URL addresses, for its rate-limit bucket (None for system-level calls)"""
+    path = urlparse(url).path
+    base_path = urlparse(base_url).path.rstrip("/")
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    first = path.strip("/").split("/")[0]
+    return first if first[:1].isupper() else None
+
+def _batch_bundle(refs: List[str]) -> Dict:
+    """Build a FHIR batch Bundle of GET requests for the given references"""
+    return {
+        "resourceType": "Bundle",
+        "type": "batch",
+        "entry": [{"request": {"method": "GET", "url": ref}} for ref in refs]
+    }
+
+def _batch_results(refs: List[str], bundle: Dict) -> Dict[str, Optional[Dict]]:
+    """Pair batch-response entries (returned in request order) with their references"""
+    results = {}
+    entries = bundle.get("entry", []) if bundle.get("resourceType") == "Bundle" else []
+    for ref, entry in zip(refs, entries):
+        status = entry.get("response", {}).get("status", "")
+        results[ref] = entry.get("resource") if status.startswith("2") else None
+    return results
+
+def write_entry(resource: Dict, resource_id: Optional[str] = None) -> Dict:
+    """
+    Transaction Bundle entry creating resource (POST), or replacing resource_id (PUT)
+    
+    Created resources get a urn:uuid fullUrl, so other entries of the same
+    transaction can reference them before the server assigns an ID.
+    """
+    resource_type = resource["resourceType"]
+    if resource_id:
+        return {
+            "fullUrl": f"{resource_type}/{resource_id}",
+            "resource": {**resource, "id": resource_id},
+            "request": {"method": "PUT", "url": f"{resource_type}/{resource_id}"}
+        }
+    return {
+        "fullUrl": f"urn:uuid:{uuid.uuid4()}",
+        "resource": resource,
+        "request": {"method": "POST", "url": resource_type}
+    }
+
+def _transaction_bundle(entries: List[Dict]) -> Dict:
+    return {"resourceType": "Bundle", "type": "transaction", "entry": entries}
+
+def _location_id(location: str) -> Optional[str]:
+    """Resource ID from a response location such as Patient/123/_history/1"""
+    path = location.split("/_history")[0].rstrip("/")
+    return path.rsplit("/", 1)[-1] or None
+
+def _transaction_results(entries: List[Dict], bundle: Dict) -> List[Optional[Dict]]:
+    """
+    Pair transaction-response entries (returned in request order) with the
+    request entries: status, location and server-assigned id of each write
+    """
+    responses = bundle.get("entry", []) if bundle.get("resourceType") == "Bundle" else []
+    results: List[Optional[Dict]] = [None] * len(entries)
+    for index, (entry, answer) in enumerate(zip(entries, responses)):
+        response = answer.get("response", {})
+        status = response.get("status", "")
+        if not status.startswith("2"):
+            continue
+        location = response.get("location")
+        resource = answer.get("resource")
+        resource_id = (resource or {}).get("id") or (location and _location_id(location)) or entry["resource"].get("id")
+        results[index] = {"id": resource_id, "status": status, "location": location, "resource": resource}
+    return results
+
+def _transaction_idempotent(entries: List[Dict]) -> bool:
+    """A transaction without creates (POST) can be retried safely"""
+    return all(entry["request"]["method"] != "POST" for entry in entries)
+
+def _forget_updated(base_url: str, entries: List[Dict]):
+    for entry in entries:
+        if entry["request"]["method"] != "POST":
+            _validators.forget(f"{base_url}/{entry['request']['url']}")
+
+def _read_failed(error: Exception, raise_errors: bool) -> None:
+    """A failed read gives None: always when the resource does not exist, otherwise unless raise_errors"""
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if raise_errors and status not in (404, 410):
+        raise error
+    print(f"FHIR read error: {error}")
+    return None
+
+def _chunks(items: List[str], size: int) -> List[List[str]]:
+    """Split items into lists of at most size elements"""
+    return [items[i:i + size] for i in range(0, len(items), size)]
 
 class FHIRClient:
     def __init__(self, base_url: str = None):
@@ -17,61 +223,456 @@ class FHIRClient:
         """
         self.base_url = base_url or FHIR_BASE_URL
         self.session = requests.Session()
-        self.session.headers.update({
-            "Accept": "application/fhir+json",
-            "Content-Type": "application/fhir+json"
-        })
+        self.session.headers.update(FHIR_HEADERS)
+        # Keep-alive connection pool sized for concurrent threadpool workers
+        adapter = HTTPAdapter(pool_connections=FHIR_POOL_MAX_KEEPALIVE, pool_maxsize=FHIR_POOL_MAX_CONNECTIONS)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._capabilities: Dict[str, set] = {}
+        self._capabilities_expires = 0.0
+    
+    def _request(self, method: str, url: str, idempotent: Optional[bool] = None, hedge: bool = False, **kwargs) -> requests.Response:
+        """
+        Send a request through the host's rate limiter and circuit breaker,
+        retrying idempotent calls with jittered exponential backoff
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            idempotent: Whether retries are safe (defaults to the method's HTTP semantics)
+            hedge: Allow a duplicate request once the first exceeds the host's latency percentile
+        """
+        netloc = urlparse(url).netloc
+        host = for_host(netloc)
+        resource_type = _resource_type(self.base_url, url)
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = retry_policy.max_retries + 1 if idempotent else 1
+        timeout = kwargs.get("timeout")
+        
+        for attempt in range(attempts):
+            # Queue for the host's and resource type's request budget rather than risk a 429
+            rate_limiter.acquire(netloc, resource_type)
+            # Never wait on the server past the per-request deadline (see fhir_deadline)
+            bounded = clamp_timeout(timeout)
+            if bounded is not None:
+                kwargs["timeout"] = bounded
+            budget_bound = bounded != timeout
+            if not host.breaker.allow():
+                host.count("short_circuited")
+                raise CircuitOpenError(f"FHIR circuit open for {netloc}")
+            host.count("requests")
+            is_last = attempt == attempts - 1
+            started = time.monotonic()
+            try:
+                if hedge:
+                    response = self._send_hedged(host, method, url, **kwargs)
+                else:
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if budget_bound and isinstance(e, requests.exceptions.Timeout):
+                    # Our own deadline cut the call short; that says nothing about the host,
+                    # but a half-open trial must not stay claimed
+                    host.breaker.abandon()
+                    raise DeadlineExceeded("FHIR request budget exhausted") from e
+                host.breaker.record_failure()
+                host.count("failures")
+                if is_last:
+                    raise
+                host.count("retries")
+                time.sleep(within_budget(retry_policy.delay(attempt)))
+                continue
+            except Exception:
+                # Any other error still counts against the host (and ends a half-open trial)
+                host.breaker.record_failure()
+                host.count("failures")
+                raise
+            except BaseException:
+                # Interrupted: no verdict on the host, but a half-open trial must not stay claimed
+                host.breaker.abandon()
+                raise
+            
+            if response.status_code >= 500:
+                host.breaker.record_failure()
+                host.count("failures")
+            else:
+                host.breaker.record_success()
+                host.latency.record(time.monotonic() - started)
+            
+            if response.status_code == 429:
+                rate_limiter.throttle(netloc, response.headers.get("Retry-After"))
+            
+            if response.status_code in RETRYABLE_STATUS and not is_last:
+                host.count("retries")
+                response.close()
+                time.sleep(within_budget(retry_policy.delay(attempt, response.headers.get("Retry-After"))))
+                continue
+            
+            # 304 Not Modified answers a conditional read rather than signalling an error
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
     
-    def search(self, resource_type: str, params: Dict[str, Any] = None) -> List[Dict]:
+    def _send_hedged(self, host, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a request, firing a duplicate if it is slower than the host's hedge threshold"""
+        delay = host.hedge_delay()
+        if delay is None:
+            return self.session.request(method, url, **kwargs)
+        
+        primary = _hedge_pool.submit(self.session.request, method, url, **kwargs)
+        try:
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        
+        host.count("hedged")
+        backup = _hedge_pool.submit(self.session.request, method, url, **kwargs)
+        for future in as_completed([primary, backup]):
+            if future.exception() is None:
+                if future is backup:
+                    host.count("hedge_wins")
+                return future.result()
+        return primary.result()
+    
+    def search(self, resource_type: str, params: Dict[str, Any] = None, include: List[str] = None, revinclude: List[str] = None, updated_since: Union[str, datetime, None] = None, elements: List[str] = None) -> List[Dict]:
         """
         Search for FHIR resources
         
         Args:
             resource_type: FHIR resource type (Patient, Practitioner, Organization, etc.)
             params: Search parameters (e.g., {"name": "john", "_count": 10})
+            include: _include directives (e.g., ["PractitionerRole:practitioner"])
+            revinclude: _revinclude directives (e.g., ["PractitionerRole:practitioner"])
+            updated_since: Only return resources with _lastUpdated after this instant (e.g. the last sync)
+            elements: Only return these top-level elements (_elements), e.g. from fhir_mapper.elements_for
+        
+        Returns:
+            List of FHIR resources (primary matches only; see search_with_includes)
+        """
+        resources, _ = self.search_with_includes(resource_type, params, include=include, revinclude=revinclude, updated_since=updated_since, elements=elements)
+        return resources
+    
+    def search_with_includes(self, resource_type: str, params: Dict[str, Any] = None, include: List[str] = None, revinclude: List[str] = None, updated_since: Union[str, datetime, None] = None, elements: List[str] = None) -> Tuple[List[Dict], Dict[str, Dict]]:
+        """
+        Search for FHIR resources together with the resources they reference
+        
+        Args:
+            resource_type: FHIR resource type
+            params: Search parameters
+            include: _include directives (e.g., ["PractitionerRole:practitioner"])
+            revinclude: _revinclude directives
+            updated_since: Only return resources with _lastUpdated after this instant
+            elements: Only return these top-level elements (_elements)
         
         Returns:
-            List of FHIR resources
+            (primary resources, included resources keyed by reference such as "Practitioner/123")
         """
         url = f"{self.base_url}/{resource_type}"
+        search_params = _search_params(params, include, revinclude, updated_since, elements)
         
-        try:
-            response = self.session.get(url, params=params or {}, timeout=20)  # Increased timeout for slow FHIR servers
-            response.raise_for_status()
-            
-            bundle = response.json()
-            resources = []
+        def fetch():
+            response = self._request("GET", url, hedge=True, params=search_params, timeout=20)  # Increased timeout for slow FHIR servers
             
-            if bundle.get("resourceType") == "Bundle" and bundle.get("entry"):
-                for entry in bundle.get("entry", []):
-                    if "resource" in entry:
-                        resources.append(entry["resource"])
-            
-            return resources
-        except requests.exceptions.RequestException as e:
+            bundle = loads(response.content)
+            return _bundle_resources(bundle), _included_resources(bundle)
+        
+        # Handled outside the shared call, so another request's spent budget is not shared (see _inflight)
+        try:
+            resources, included = _inflight.do(("search", url, cache_key(resource_type, search_params)), fetch)
+        except _READ_ERRORS as e:
             print(f"FHIR search error: {e}")
-            return []
+            return [], {}
+        return list(resources), dict(included)
+    
+    def _get_page(self, url: str, params: Dict[str, Any] = None) -> Optional[Dict]:
+        """Fetch one page of a search Bundle, returning None on error"""
+        try:
+            response = self._request("GET", url, hedge=True, params=params, timeout=20)
+            return loads(response.content)
+        except _SYNC_ERRORS as e:
+            print(f"FHIR search error: {e}")
+            return None
+    
+    def iter_search(self, resource_type: str, params: Dict[str, Any] = None, prefetch: bool = False, updated_since: Union[str, datetime, None] = None, stream: bool = False, elements: List[str] = None) -> Iterator[Dict]:
+        """
+        Search for FHIR resources, following Bundle next links lazily
+        
+        Only one page is held in memory at a time, so arbitrarily large result
+        sets can be streamed. _count in params sets the page size.
+        
+        Args:
+            resource_type: FHIR resource type
+            params: Search parameters
+            prefetch: Fetch the next page in the background while the current one is consumed
+            updated_since: Only return resources with _lastUpdated after this instant
+            stream: Parse each page incrementally as it downloads, so no page is
+                ever held in memory as a whole (prefetch does not apply)
+            elements: Only return these top-level elements (_elements)
+        
+        Yields:
+            FHIR resources, one at a time
+        """
+        if stream:
+            yield from self._stream_search(f"{self.base_url}/{resource_type}", _search_params(params, updated_since=updated_since, elements=elements))
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            bundle = self._get_page(f"{self.base_url}/{resource_type}", _search_params(params, updated_since=updated_since, elements=elements))
+            while bundle:
+                next_url = _next_link(bundle)
+                pending = executor.submit(self._get_page, next_url) if executor and next_url else None
+                yield from _bundle_resources(bundle)
+                if pending is not None:
+                    bundle = pending.result()
+                else:
+                    bundle = self._get_page(next_url) if next_url else None
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _stream_search(self, url: str, params: Dict[str, Any] = None) -> Iterator[Dict]:
+        """Follow next links, yielding each page's matched resources as its body streams in"""
+        while url:
+            parser = BundleStreamParser()
+            try:
+                response = self._request("GET", url, params=params, timeout=20, stream=True)
+            except _SYNC_ERRORS as e:
+                print(f"FHIR search error: {e}")
+                return
+            try:
+                for entry in iter_bundle_entries(response.iter_content(FHIR_STREAM_CHUNK_SIZE), parser):
+                    if "resource" in entry and not _is_included(entry):
+                        yield entry["resource"]
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"FHIR search error: {e}")
+                return
+            finally:
+                response.close()
+            url, params = _next_link(parser.meta), None
+    
+    def count(self, resource_type: str, params: Dict[str, Any] = None) -> Optional[int]:
+        """
+        Count the resources a search matches without fetching them (_summary=count)
+        
+        Args:
+            resource_type: FHIR resource type
+            params: Search parameters
+        
+        Returns:
+            The Bundle total, or None on error
+        """
+        try:
+            response = self._request("GET", f"{self.base_url}/{resource_type}", hedge=True,
+                                     params={**(params or {}), "_summary": "count"}, timeout=20)
+            return loads(response.content).get("total")
+        except _SYNC_ERRORS as e:
+            print(f"FHIR count error: {e}")
+            return None
+    
+    def capabilities(self) -> Dict[str, set]:
+        """
+        Get the search parameters the server declares per resource type
+        
+        Read from the CapabilityStatement (/metadata) and kept for
+        FHIR_CAPABILITIES_TTL seconds; an unreachable statement is retried after a minute.
+        
+        Returns:
+            Dictionary of resource type -> set of search parameter names
+        """
+        if time.monotonic() < self._capabilities_expires:
+            return self._capabilities
+        try:
+            response = self._request("GET", f"{self.base_url}/metadata", timeout=20)
+            self._capabilities = _search_param_index(loads(response.content))
+            self._capabilities_expires = time.monotonic() + FHIR_CAPABILITIES_TTL
+        except _SYNC_ERRORS as e:
+            print(f"FHIR metadata error: {e}")
+            self._capabilities = {}
+            self._capabilities_expires = time.monotonic() + min(60, FHIR_CAPABILITIES_TTL)
+        return self._capabilities
+    
+    def supports_search_param(self, resource_type: str, name: str) -> bool:
+        """Whether the server declares search parameter name for resource_type"""
+        return name in self.capabilities().get(resource_type, ())
     
-    def read(self, resource_type: str, resource_id: str) -> Optional[Dict]:
+    def read(self, resource_type: str, resource_id: str, raise_errors: bool = False) -> Optional[Dict]:
         """
         Read a specific FHIR resource by ID
         
         Args:
             resource_type: FHIR resource type
             resource_id: Resource ID
+            raise_errors: Raise errors other than the resource not existing
+                instead of returning None for them
         
         Returns:
             FHIR resource or None
         """
         url = f"{self.base_url}/{resource_type}/{resource_id}"
         
+        def fetch():
+            # Revalidate with the server instead of re-downloading an unchanged resource
+            response = self._request("GET", url, hedge=True, headers=_validators.conditional_headers(url), timeout=10)
+            if response.status_code == 304:
+                cached = _validators.not_modified(url)
+                if cached is not None:
+                    return cached
+                response = self._request("GET", url, timeout=10)
+            resource = loads(response.content)
+            _validators.remember(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), resource)
+            return resource
+        
+        # Errors are handled per caller, so callers sharing the read can each choose raise_errors
+        # (and another request's spent budget is not shared, see _inflight)
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"FHIR read error: {e}")
-            return None
+            return _inflight.do(("read", url), fetch)
+        except _READ_ERRORS as e:
+            return _read_failed(e, raise_errors)
+    
+    def batch_read(self, refs: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Read many FHIR resources in one round trip using a batch Bundle
+        
+        Args:
+            refs: Relative references such as "Practitioner/123"
+        
+        Returns:
+            Resources keyed by reference (None for any that could not be read)
+        """
+        unique_refs = list(dict.fromkeys(ref for ref in refs if ref))
+        results = {ref: None for ref in unique_refs}
+        
+        for chunk in _chunks(unique_refs, FHIR_BATCH_MAX_ENTRIES):
+            try:
+                response = self._request("POST", self.base_url, idempotent=True, json=_batch_bundle(chunk), timeout=20)
+                results.update(_batch_results(chunk, loads(response.content)))
+            except _SYNC_ERRORS as e:
+                print(f"FHIR batch read error: {e}")
+        
+        return results
+    
+    def transaction(self, entries: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Write many FHIR resources in a few round trips using transaction Bundles
+        
+        Entries go out in chunks of FHIR_TRANSACTION_MAX_ENTRIES; each chunk is
+        one transaction, so it commits or fails as a whole, independently of
+        the other chunks. Cross-entry urn:uuid references must stay within a chunk.
+        
+        Args:
+            entries: Bundle entries, e.g. from write_entry()
+        
+        Returns:
+            One result per entry, in order: {"id", "status", "location", "resource"}
+            with the server-assigned id, or None if its chunk failed
+        """
+        results: List[Optional[Dict]] = []
+        
+        for chunk in _chunks(entries, FHIR_TRANSACTION_MAX_ENTRIES):
+            _forget_updated(self.base_url, chunk)
+            try:
+                response = self._request("POST", self.base_url, idempotent=_transaction_idempotent(chunk),
+                                         json=_transaction_bundle(chunk), timeout=60)
+                results.extend(_transaction_results(chunk, loads(response.content)))
+            except _SYNC_ERRORS as e:
+                print(f"FHIR transaction error: {e}")
+                results.extend([None] * len(chunk))
+        
+        return results
+    
+    def export(self, resource_types: List[str] = None, since: Union[str, datetime, None] = None) -> str:
+        """
+        Kick off an asynchronous Bulk Data $export
+        
+        Args:
+            resource_types: Resource types to export (_type); None exports everything
+            since: Only export resources updated after this instant (_since)
+        
+        Returns:
+            Status URL to poll (the Content-Location of the 202 response)
+        
+        Raises:
+            requests.exceptions.RequestException, CircuitOpenError, ValueError: The
+            export could not be started; callers decide whether to retry
+        """
+        params = {}
+        if resource_types:
+            params["_type"] = ",".join(resource_types)
+        if since:
+            params["_since"] = since.isoformat() if isinstance(since, datetime) else since
+        # Not idempotent: a retried kick-off would start a second export job
+        response = self._request("GET", f"{self.base_url}/$export", idempotent=False, params=params,
+                                 headers={"Prefer": "respond-async"}, timeout=20)
+        status_url = response.headers.get("Content-Location")
+        if response.status_code != 202 or not status_url:
+            raise ValueError(f"FHIR $export was not accepted (HTTP {response.status_code})")
+        return status_url
+    
+    def export_status(self, status_url: str) -> Tuple[Optional[Dict], Optional[float]]:
+        """
+        Poll a Bulk Data $export status URL
+        
+        Returns:
+            (manifest, None) once the export is complete, or (None, seconds to wait)
+            while it is still running
+        
+        Raises:
+            requests.exceptions.RequestException, CircuitOpenError: The export failed or the poll errored
+        """
+        response = self._request("GET", status_url, timeout=20)
+        if response.status_code == 202:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                return None, float(retry_after) if retry_after else None
+            except ValueError:
+                return None, None
+        return loads(response.content), None
+    
+    def iter_ndjson(self, url: str) -> Iterator[Dict]:
+        """
+        Stream an NDJSON file (e.g. a $export output) one resource per line
+        
+        Raises:
+            requests.exceptions.RequestException, CircuitOpenError: The download failed
+        """
+        response = self._request("GET", url, stream=True, headers={"Accept": "application/fhir+ndjson"}, timeout=60)
+        try:
+            for line in response.iter_lines(chunk_size=FHIR_STREAM_CHUNK_SIZE):
+                if line.strip():
+                    yield loads(line)
+        finally:
+            response.close()
+    
+    def history(self, resource_type: str, since: Union[str, datetime, None] = None, page_size: int = 200) -> List[Dict]:
+        """
+        Get the type-level _history entries changed since an instant, following every page
+        
+        Entries carry request.method (PUT/POST/DELETE) and, except for deletes, the
+        resource version; servers usually list the newest first.
+        
+        Raises:
+            requests.exceptions.RequestException, CircuitOpenError, ValueError: A page
+            could not be fetched; a partial history is never returned
+        """
+        params = {"_count": page_size}
+        if since:
+            params["_since"] = since.isoformat() if isinstance(since, datetime) else since
+        return [entry for bundle in self.iter_pages(f"{self.base_url}/{resource_type}/_history", params)
+                for entry in bundle.get("entry", [])]
+    
+    def iter_pages(self, url: str, params: Dict[str, Any] = None) -> Iterator[Dict]:
+        """
+        Yield every Bundle page from url, following next links
+        
+        Unlike iter_search this raises instead of stopping quietly, for callers
+        (such as sync) that must not mistake a failed page for the end of the results.
+        """
+        while url:
+            response = self._request("GET", url, params=params, timeout=20)
+            bundle = loads(response.content)
+            yield bundle
+            url, params = _next_link(bundle), None
     
     def create(self, resource_type: str, resource: Dict) -> Optional[Dict]:
         """
@@ -87,10 +688,9 @@ class FHIRClient:
         url = f"{self.base_url}/{resource_type}"
         
         try:
-            response = self.session.post(url, json=resource, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            response = self._request("POST", url, json=resource, timeout=10)
+            return loads(response.content)
+        except _SYNC_ERRORS as e:
             print(f"FHIR create error: {e}")
             return None
     
@@ -109,11 +709,12 @@ class FHIRClient:
         url = f"{self.base_url}/{resource_type}/{resource_id}"
         resource["id"] = resource_id
         
+        _validators.forget(url)
+        
         try:
-            response = self.session.put(url, json=resource, timeout=10)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            response = self._request("PUT", url, json=resource, timeout=10)
+            return loads(response.content)
+        except _SYNC_ERRORS as e:
             print(f"FHIR update error: {e}")
             return None
     
@@ -130,22 +731,543 @@ class FHIRClient:
         """
         url = f"{self.base_url}/{resource_type}/{resource_id}"
         
+        _validators.forget(url)
+        
+        try:
+            response = self._request("DELETE", url, timeout=10)
+            return True
+        except _SYNC_ERRORS as e:
+            print(f"FHIR delete error: {e}")
+            return False
+
+
+
+class AsyncFHIRClient:
+    def __init__(
+        self,
+        base_url: str = None,
+        max_connections: int = FHIR_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections: int = FHIR_POOL_MAX_KEEPALIVE,
+        keepalive_expiry: float = FHIR_KEEPALIVE_EXPIRY,
+        max_concurrency_per_host: int = FHIR_MAX_CONCURRENCY_PER_HOST
+    ):
+        """
+        Initialize asyncio-native FHIR client
+        
+        Mirrors FHIRClient (search/read/create/update/delete) but never blocks a
+        threadpool worker while waiting on the FHIR server.
+        
+        Args:
+            base_url: FHIR server base URL (defaults to config setting)
+            max_connections: Total connections kept by the pool
+            max_keepalive_connections: Idle connections kept alive for reuse
+            keepalive_expiry: Seconds an idle keep-alive connection is retained
+            max_concurrency_per_host: In-flight requests allowed per FHIR host
+        """
+        self.base_url = base_url or FHIR_BASE_URL
+        self.max_concurrency_per_host = max_concurrency_per_host
+        self.client = httpx.AsyncClient(
+            headers=FHIR_HEADERS,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry
+            )
+        )
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._capabilities: Dict[str, set] = {}
+        self._capabilities_expires = 0.0
+    
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        """Get the concurrency limiter for the host serving url"""
+        host = urlparse(url).netloc
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrency_per_host)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+    
+    async def _send(self, method: str, url: str, stream: bool = False, **kwargs) -> httpx.Response:
+        """Send one request, waiting for a free per-host slot first (stream leaves the body unread)"""
+        async with self._host_semaphore(url):
+            if stream:
+                return await self.client.send(self.client.build_request(method, url, **kwargs), stream=True)
+            return await self.client.request(method, url, **kwargs)
+    
+    async def _send_hedged(self, host, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, firing a duplicate if it is slower than the host's hedge threshold"""
+        delay = host.hedge_delay()
+        if delay is None:
+            return await self._send(method, url, **kwargs)
+        
+        primary = asyncio.ensure_future(self._send(method, url, **kwargs))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+        
+        host.count("hedged")
+        backup = asyncio.ensure_future(self._send(method, url, **kwargs))
+        pending = {primary, backup}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    if task is backup:
+                        host.count("hedge_wins")
+                    return task.result()
+        return primary.result()
+    
+    async def _request(self, method: str, url: str, idempotent: Optional[bool] = None, hedge: bool = False, **kwargs) -> httpx.Response:
+        """
+        Send a request through the host's rate limiter and circuit breaker,
+        retrying idempotent calls with jittered exponential backoff
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            idempotent: Whether retries are safe (defaults to the method's HTTP semantics)
+            hedge: Allow a duplicate request once the first exceeds the host's latency percentile
+        """
+        netloc = urlparse(url).netloc
+        host = for_host(netloc)
+        resource_type = _resource_type(self.base_url, url)
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        attempts = retry_policy.max_retries + 1 if idempotent else 1
+        timeout = kwargs.get("timeout")
+        
+        for attempt in range(attempts):
+            # Queue for the host's and resource type's request budget rather than risk a 429
+            await rate_limiter.acquire_async(netloc, resource_type)
+            # Never wait on the server past the per-request deadline (see fhir_deadline)
+            bounded = clamp_timeout(timeout)
+            if bounded is not None:
+                kwargs["timeout"] = bounded
+            budget_bound = bounded != timeout
+            if not host.breaker.allow():
+                host.count("short_circuited")
+                raise CircuitOpenError(f"FHIR circuit open for {netloc}")
+            host.count("requests")
+            is_last = attempt == attempts - 1
+            started = time.monotonic()
+            try:
+                if hedge:
+                    response = await self._send_hedged(host, method, url, **kwargs)
+                else:
+                    response = await self._send(method, url, **kwargs)
+            except httpx.TransportError as e:
+                if budget_bound and isinstance(e, httpx.TimeoutException):
+                    # Our own deadline cut the call short; that says nothing about the host,
+                    # but a half-open trial must not stay claimed
+                    host.breaker.abandon()
+                    raise DeadlineExceeded("FHIR request budget exhausted") from e
+                host.breaker.record_failure()
+                host.count("failures")
+                if is_last:
+                    raise
+                host.count("retries")
+                await asyncio.sleep(within_budget(retry_policy.delay(attempt)))
+                continue
+            except Exception:
+                # Any other error still counts against the host (and ends a half-open trial)
+                host.breaker.record_failure()
+                host.count("failures")
+                raise
+            except BaseException:
+                # Cancelled (task cancel, wait_for): no verdict on the host,
+                # but a half-open trial must not stay claimed
+                host.breaker.abandon()
+                raise
+            
+            if response.status_code >= 500:
+                host.breaker.record_failure()
+                host.count("failures")
+            else:
+                host.breaker.record_success()
+                host.latency.record(time.monotonic() - started)
+            
+            if response.status_code == 429:
+                rate_limiter.throttle(netloc, response.headers.get("Retry-After"))
+            
+            if response.status_code in RETRYABLE_STATUS and not is_last:
+                host.count("retries")
+                await response.aclose()
+                await asyncio.sleep(within_budget(retry_policy.delay(attempt, response.headers.get("Retry-After"))))
+                continue
+            
+            # 304 Not Modified answers a conditional read rather than signalling an error
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+    
+    async def search(self, resource_type: str, params: Dict[str, Any] = None, include: List[str] = None, revinclude: List[str] = None, updated_since: Union[str, datetime, None] = None, elements: List[str] = None) -> List[Dict]:
+        """
+        Search for FHIR resources
+        
+        Args:
+            resource_type: FHIR resource type (Patient, Practitioner, Organization, etc.)
+            params: Search parameters (e.g., {"name": "john", "_count": 10})
+            include: _include directives (e.g., ["PractitionerRole:practitioner"])
+            revinclude: _revinclude directives
+            updated_since: Only return resources with _lastUpdated after this instant
+            elements: Only return these top-level elements (_elements)
+        
+        Returns:
+            List of FHIR resources (primary matches only; see search_with_includes)
+        """
+        resources, _ = await self.search_with_includes(resource_type, params, include=include, revinclude=revinclude, updated_since=updated_since, elements=elements)
+        return resources
+    
+    async def search_with_includes(self, resource_type: str, params: Dict[str, Any] = None, include: List[str] = None, revinclude: List[str] = None, updated_since: Union[str, datetime, None] = None, elements: List[str] = None) -> Tuple[List[Dict], Dict[str, Dict]]:
+        """
+        Search for FHIR resources together with the resources they reference
+        
+        Returns:
+            (primary resources, included resources keyed by reference such as "Practitioner/123")
+        """
+        url = f"{self.base_url}/{resource_type}"
+        search_params = _search_params(params, include, revinclude, updated_since, elements)
+        
+        async def fetch():
+            response = await self._request("GET", url, hedge=True, params=search_params, timeout=20)
+            bundle = loads(response.content)
+            return _bundle_resources(bundle), _included_resources(bundle)
+        
+        # Handled outside the shared call, so another request's spent budget is not shared (see _inflight)
+        try:
+            resources, included = await _inflight.do_async(("search", url, cache_key(resource_type, search_params)), fetch)
+        except _READ_ERRORS as e:
+            print(f"FHIR search error: {e}")
+            return [], {}
+        return list(resources), dict(included)
+    
+    async def search_page(self, resource_type: str, params: Dict[str, Any] = None, elements: List[str] = None) -> List[Dict]:
+        """
+        Fetch the first page of a search, raising on errors
+        
+        Unlike search(), a failed request is not turned into an empty result, so
+        callers can tell an unreachable server from one with no matches.
+        
+        Raises:
+            httpx.HTTPError or CircuitOpenError if the server could not answer
+        """
+        response = await self._request("GET", f"{self.base_url}/{resource_type}", hedge=True,
+                                       params=_search_params(params, elements=elements), timeout=20)
+        return _bundle_resources(loads(response.content))
+    
+    async def _get_page(self, url: str, params: Dict[str, Any] = None) -> Optional[Dict]:
+        """Fetch one page of a search Bundle, returning None on error"""
+        try:
+            response = await self._request("GET", url, hedge=True, params=params, timeout=20)
+            return loads(response.content)
+        except _ASYNC_ERRORS as e:
+            print(f"FHIR search error: {e}")
+            return None
+    
+    async def iter_search(self, resource_type: str, params: Dict[str, Any] = None, prefetch: bool = False, updated_since: Union[str, datetime, None] = None, stream: bool = False, elements: List[str] = None) -> AsyncIterator[Dict]:
+        """
+        Search for FHIR resources, following Bundle next links lazily
+        
+        Args:
+            resource_type: FHIR resource type
+            params: Search parameters
+            prefetch: Fetch the next page concurrently while the current one is consumed
+            updated_since: Only return resources with _lastUpdated after this instant
+            stream: Parse each page incrementally as it downloads (prefetch does not apply)
+            elements: Only return these top-level elements (_elements)
+        
+        Yields:
+            FHIR resources, one at a time
+        """
+        if stream:
+            async for resource in self._stream_search(f"{self.base_url}/{resource_type}", _search_params(params, updated_since=updated_since, elements=elements)):
+                yield resource
+            return
+        
+        pending = None
+        try:
+            bundle = await self._get_page(f"{self.base_url}/{resource_type}", _search_params(params, updated_since=updated_since, elements=elements))
+            while bundle:
+                next_url = _next_link(bundle)
+                if prefetch and next_url:
+                    pending = asyncio.ensure_future(self._get_page(next_url))
+                for resource in _bundle_resources(bundle):
+                    yield resource
+                if pending is not None:
+                    bundle = await pending
+                    pending = None
+                else:
+                    bundle = await self._get_page(next_url) if next_url else None
+        finally:
+            if pending is not None:
+                pending.cancel()
+    
+    async def _stream_search(self, url: str, params: Dict[str, Any] = None) -> AsyncIterator[Dict]:
+        """Follow next links, yielding each page's matched resources as its body streams in"""
+        while url:
+            parser = BundleStreamParser()
+            try:
+                response = await self._request("GET", url, params=params, timeout=20, stream=True)
+            except _ASYNC_ERRORS as e:
+                print(f"FHIR search error: {e}")
+                return
+            try:
+                async for chunk in response.aiter_bytes(FHIR_STREAM_CHUNK_SIZE):
+                    for entry in parser.feed(chunk):
+                        if "resource" in entry and not _is_included(entry):
+                            yield entry["resource"]
+                for entry in parser.close():
+                    if "resource" in entry and not _is_included(entry):
+                        yield entry["resource"]
+            except (httpx.HTTPError, ValueError) as e:
+                print(f"FHIR search error: {e}")
+                return
+            finally:
+                await response.aclose()
+            url, params = _next_link(parser.meta), None
+    
+    async def iter_search_from(self, url: str, params: Dict[str, Any] = None, skip: int = 0) -> AsyncIterator[Tuple[Dict, Tuple[str, Optional[Dict[str, Any]], int]]]:
+        """
+        Stream matched resources from a search page onwards, each with the position just after it
+
+        A position is (page URL, page params, matches to skip on that page);
+        passing it back in resumes the search after that resource, e.g. from a
+        continuation cursor. Raises on errors, unlike iter_search.
+
+        Args:
+            url: Search URL or a Bundle next link
+            params: Query parameters for url (None for next links, which carry their own)
+            skip: Matches on the first page already consumed
+
+        Yields:
+            (FHIR resource, resume position)
+        """
+        while url:
+            parser = BundleStreamParser()
+            response = await self._request("GET", url, params=params, timeout=20, stream=True)
+            try:
+                index = 0
+                async for chunk in response.aiter_bytes(FHIR_STREAM_CHUNK_SIZE):
+                    for entry in parser.feed(chunk):
+                        if "resource" in entry and not _is_included(entry):
+                            index += 1
+                            if index > skip:
+                                yield entry["resource"], (url, params, index)
+                for entry in parser.close():
+                    if "resource" in entry and not _is_included(entry):
+                        index += 1
+                        if index > skip:
+                            yield entry["resource"], (url, params, index)
+            finally:
+                await response.aclose()
+            url, params, skip = _next_link(parser.meta), None, 0
+
+    async def capabilities(self) -> Dict[str, set]:
+        """Get the search parameters the server declares per resource type (see FHIRClient.capabilities)"""
+        if time.monotonic() < self._capabilities_expires:
+            return self._capabilities
+        try:
+            response = await self._request("GET", f"{self.base_url}/metadata", timeout=20)
+            self._capabilities = _search_param_index(loads(response.content))
+            self._capabilities_expires = time.monotonic() + FHIR_CAPABILITIES_TTL
+        except _ASYNC_ERRORS as e:
+            print(f"FHIR metadata error: {e}")
+            self._capabilities = {}
+            self._capabilities_expires = time.monotonic() + min(60, FHIR_CAPABILITIES_TTL)
+        return self._capabilities
+    
+    async def supports_search_param(self, resource_type: str, name: str) -> bool:
+        """Whether the server declares search parameter name for resource_type"""
+        return name in (await self.capabilities()).get(resource_type, ())
+    
+    async def read(self, resource_type: str, resource_id: str, raise_errors: bool = False) -> Optional[Dict]:
+        """
+        Read a specific FHIR resource by ID
+        
+        Args:
+            resource_type: FHIR resource type
+            resource_id: Resource ID
+            raise_errors: Raise errors other than the resource not existing
+                instead of returning None for them
+        
+        Returns:
+            FHIR resource or None
+        """
+        url = f"{self.base_url}/{resource_type}/{resource_id}"
+        
+        async def fetch():
+            # Revalidate with the server instead of re-downloading an unchanged resource
+            response = await self._request("GET", url, hedge=True, headers=_validators.conditional_headers(url), timeout=10)
+            if response.status_code == 304:
+                cached = _validators.not_modified(url)
+                if cached is not None:
+                    return cached
+                response = await self._request("GET", url, timeout=10)
+            resource = loads(response.content)
+            _validators.remember(url, response.headers.get("ETag"), response.headers.get("Last-Modified"), resource)
+            return resource
+        
+        # Errors are handled per caller, so callers sharing the read can each choose raise_errors
+        # (and another request's spent budget is not shared, see _inflight)
+        try:
+            return await _inflight.do_async(("read", url), fetch)
+        except _READ_ERRORS as e:
+            return _read_failed(e, raise_errors)
+    
+    async def batch_read(self, refs: List[str]) -> Dict[str, Optional[Dict]]:
+        """
+        Read many FHIR resources in one round trip using a batch Bundle
+        
+        Args:
+            refs: Relative references such as "Practitioner/123"
+        
+        Returns:
+            Resources keyed by reference (None for any that could not be read)
+        """
+        unique_refs = list(dict.fromkeys(ref for ref in refs if ref))
+        results = {ref: None for ref in unique_refs}
+        
+        async def read_chunk(chunk: List[str]) -> Dict[str, Optional[Dict]]:
+            try:
+                response = await self._request("POST", self.base_url, idempotent=True, json=_batch_bundle(chunk), timeout=20)
+                return _batch_results(chunk, loads(response.content))
+            except _ASYNC_ERRORS as e:
+                print(f"FHIR batch read error: {e}")
+                return {}
+        
+        for chunk_results in await asyncio.gather(*(read_chunk(chunk) for chunk in _chunks(unique_refs, FHIR_BATCH_MAX_ENTRIES))):
+            results.update(chunk_results)
+        
+        return results
+    
+    async def transaction(self, entries: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Write many FHIR resources in a few round trips using transaction Bundles
+        
+        Chunks of FHIR_TRANSACTION_MAX_ENTRIES are sent concurrently (bounded
+        by the per-host limit); each commits or fails as a whole.
+        
+        Args:
+            entries: Bundle entries, e.g. from write_entry()
+        
+        Returns:
+            One result per entry, in order: {"id", "status", "location", "resource"}
+            with the server-assigned id, or None if its chunk failed
+        """
+        async def write_chunk(chunk: List[Dict]) -> List[Optional[Dict]]:
+            _forget_updated(self.base_url, chunk)
+            try:
+                response = await self._request("POST", self.base_url, idempotent=_transaction_idempotent(chunk),
+                                               json=_transaction_bundle(chunk), timeout=60)
+                return _transaction_results(chunk, loads(response.content))
+            except _ASYNC_ERRORS as e:
+                print(f"FHIR transaction error: {e}")
+                return [None] * len(chunk)
+        
+        chunks = await asyncio.gather(*(write_chunk(chunk) for chunk in _chunks(entries, FHIR_TRANSACTION_MAX_ENTRIES)))
+        return [result for chunk_results in chunks for result in chunk_results]
+    
+    async def create(self, resource_type: str, resource: Dict) -> Optional[Dict]:
+        """
+        Create a new FHIR resource
+        
+        Args:
+            resource_type: FHIR resource type
+            resource: FHIR resource data
+        
+        Returns:
+            Created FHIR resource with server-assigned ID
+        """
+        url = f"{self.base_url}/{resource_type}"
+        
+        try:
+            response = await self._request("POST", url, json=resource, timeout=10)
+            return loads(response.content)
+        except _ASYNC_ERRORS as e:
+            print(f"FHIR create error: {e}")
+            return None
+    
+    async def update(self, resource_type: str, resource_id: str, resource: Dict) -> Optional[Dict]:
+        """
+        Update a FHIR resource
+        
+        Args:
+            resource_type: FHIR resource type
+            resource_id: Resource ID
+            resource: Updated FHIR resource data
+        
+        Returns:
+            Updated FHIR resource
+        """
+        url = f"{self.base_url}/{resource_type}/{resource_id}"
+        resource["id"] = resource_id
+        
+        _validators.forget(url)
+        
+        try:
+            response = await self._request("PUT", url, json=resource, timeout=10)
+            return loads(response.content)
+        except _ASYNC_ERRORS as e:
+            print(f"FHIR update error: {e}")
+            return None
+    
+    async def delete(self, resource_type: str, resource_id: str) -> bool:
+        """
+        Delete a FHIR resource
+        
+        Args:
+            resource_type: FHIR resource type
+            resource_id: Resource ID
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        url = f"{self.base_url}/{resource_type}/{resource_id}"
+        
+        _validators.forget(url)
+        
         try:
-            response = self.session.delete(url, timeout=10)
-            response.raise_for_status()
+            await self._request("DELETE", url, timeout=10)
             return True
-        except requests.exceptions.RequestException as e:
+        except _ASYNC_ERRORS as e:
             print(f"FHIR delete error: {e}")
             return False
+    
+    async def aclose(self):
+        """Close pooled connections"""
+        await self.client.aclose()
 
 
-# Global FHIR client instance
+# Global FHIR client instances
 _fhir_client: Optional[FHIRClient] = None
+_async_fhir_client: Optional[AsyncFHIRClient] = None
 
-def get_fhir_client(base_url: str = None) -> FHIRClient:
-    """Get or create FHIR client instance"""
-    global _fhir_client
+def get_fhir_client(base_url: str = None, asynchronous: bool = False) -> Union[FHIRClient, AsyncFHIRClient]:
+    """
+    Get or create FHIR client instance
+    
+    Args:
+        base_url: FHIR server base URL (defaults to config setting)
+        asynchronous: Return the shared AsyncFHIRClient instead of the blocking client
+    """
+    global _fhir_client, _async_fhir_client
+    if asynchronous:
+        if _async_fhir_client is None:
+            _async_fhir_client = AsyncFHIRClient(base_url)
+        return _async_fhir_client
     if _fhir_client is None:
         _fhir_client = FHIRClient(base_url)
     return _fhir_client
 
+async def close_fhir_clients():
+    """Release pooled connections held by the shared FHIR clients"""
+    global _fhir_client, _async_fhir_client
+    if _async_fhir_client is not None:
+        await _async_fhir_client.aclose()
+        _async_fhir_client = None
+    if _fhir_client is not None:
+        _fhir_client.session.close()
+        _fhir_client = None
+
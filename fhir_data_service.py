@@ -1,8 +1,20 @@
 """
 FHIR Data Service - Real-time data retrieval from FHIR servers
 """
-from typing import List, Dict, Optional
-from backend.app.services.fhir_client import get_fhir_client
+import asyncio
+import base64
+import json
+from datetime import datetime
+from itertools import islice
+from typing import List, Dict, Optional, Iterable, Iterator, AsyncIterator, Mapping, NamedTuple, Tuple, Callable
+from urllib.parse import parse_qs, urlparse
+from backend.app.config import FHIR_CACHE_ENABLED, FHIR_SYNC_ENABLED, FHIR_SYNC_TYPES, FHIR_SUMMARY_DEADLINE
+from backend.app.services.compact_records import to_record
+from backend.app.services.fhir_client import get_fhir_client, write_entry
+from backend.app.services.fhir_deadline import DeadlineExceeded, remaining, request_budget
+from backend.app.services.fhir_cache import FHIRCache
+from backend.app.services.fhir_store import FHIRStore, get_store
+from backend.app.services.fhir_federation import get_federated_client, resource_sources
 from backend.app.services.fhir_mapper import (
     fhir_patient_to_model,
     fhir_practitioner_to_doctor,
@@ -11,38 +23,91 @@ from backend.app.services.fhir_mapper import (
     fhir_claim_to_insurance_claim,
     fhir_coverage_to_coverage_rule,
     fhir_condition_to_medical_history,
-    fhir_encounter_to_visit
+    fhir_encounter_to_visit,
+    elements_for,
+    projector,
+    VisitView,
+    MedicalHistoryView,
+    InsuranceClaimView,
+    MAPPERS,
+    map_many,
+    REVERSE_MAPPERS,
+    RESOURCE_UPDATERS
 )
 
+# Mapper fields each list view renders; searches request only the FHIR elements behind them
+PATIENT_LIST_FIELDS = ("first_name", "last_name", "date_of_birth", "gender", "email", "phone")
+DOCTOR_LIST_FIELDS = ("first_name", "last_name", "specialization", "qualification", "email", "phone")
+HOSPITAL_LIST_FIELDS = ("name", "address", "city", "state", "zip_code", "phone", "email", "emergency_phone", "hospital_type", "specialties")
+COVERAGE_RULE_FIELDS = ("insuranceProvider", "coverageType", "planName", "planType", "status", "startDate", "endDate", "networkType", "copay", "relationship", "rules")
+
 # Cache for performance (optional, can be disabled for real-time)
-USE_CACHE = False
-_cache = {
-    "patients": {},
-    "doctors": {},
-    "hospitals": {},
-    "records": {}
-}
-
-def get_all_patients(use_cache: bool = USE_CACHE) -> List[Dict]:
-    """Get all patients from FHIR server"""
-    client = get_fhir_client()
-    
-    # Search for Patient resources
-    fhir_patients = client.search("Patient", params={"_count": 50})
-    
-    patients = []
-    for fhir_patient in fhir_patients:
-        try:
-            patient = fhir_patient_to_model(fhir_patient)
-            patients.append(patient)
-        except Exception as e:
-            print(f"Error mapping FHIR Patient: {e}")
-            continue
+USE_CACHE = FHIR_CACHE_ENABLED
+_cache = FHIRCache()
+
+def _cached(resource_type: str, params: Dict, use_cache: bool, fetch):
+    """
+    Serve fetch() through the TTL/LRU cache keyed by resource type and search params
     
-    return patients
+    Cached records are held as compact records (see compact_records.RECORD_TYPES).
+    """
+    if not use_cache:
+        return fetch()
+    return _cache.get_or_fetch(resource_type, params, lambda: _compact(resource_type, fetch()))
+
+def _compact(resource_type: str, value):
+    """A fetched record, or list of records, as compact records"""
+    if isinstance(value, list):
+        return [to_record(resource_type, item) for item in value]
+    return to_record(resource_type, value)
+
+def invalidate_cache(resource_type: Optional[str] = None):
+    """Drop cached results for resource_type (or everything), e.g. after a sync applied changes"""
+    _cache.invalidate(resource_type)
 
-def get_patient(patient_id: str) -> Optional[Dict]:
+def _local(resource_type: str) -> Optional[FHIRStore]:
+    """The local store when background sync is on and has completed for resource_type, else None"""
+    if not FHIR_SYNC_ENABLED or resource_type not in FHIR_SYNC_TYPES:
+        return None
+    store = get_store()
+    return store if store.is_synced(resource_type) else None
+
+def _map_resources(fhir_resources: List[Dict], mapper, resource_label: str, limit: Optional[int] = None) -> List[Dict]:
+    """Map FHIR resources with mapper, skipping (and logging) any that fail"""
+    return map_many(resource_label, fhir_resources, mapper=mapper, skip_errors=True, limit=limit)
+
+def _iter_mapped(fhir_resources, mapper, resource_label: str) -> Iterator[Dict]:
+    """Lazily map FHIR resources with mapper, skipping (and logging) any that fail"""
+    return map_many(resource_label, fhir_resources, lazy=True, mapper=mapper, skip_errors=True)
+
+def iter_all_patients(page_size: int = 50, prefetch: bool = True, fields: Optional[Iterable[str]] = None) -> Iterator[Dict]:
+    """Stream every patient from FHIR server, one Bundle page in memory at a time (fields limits the elements fetched)"""
+    client = get_fhir_client()
+    fhir_patients = client.iter_search("Patient", params={"_count": page_size}, prefetch=prefetch, stream=not prefetch,
+                                       elements=elements_for("Patient", fields))
+    return _iter_mapped(fhir_patients, fhir_patient_to_model, "Patient")
+
+def get_all_patients(use_cache: bool = USE_CACHE, limit: Optional[int] = 50) -> List[Dict]:
+    """Get all patients from FHIR server (up to limit; None follows every page)"""
+    # Only prefetch ahead when we know every page will be consumed; otherwise
+    # stream-parse pages so stopping at the limit skips decoding the rest
+    return list(_cached("Patient", {"_limit": limit}, use_cache,
+                        lambda: list(islice(iter_all_patients(prefetch=limit is None, fields=PATIENT_LIST_FIELDS), limit))))
+
+def count_patients() -> int:
+    """Number of patients on the FHIR server (or in the synced local copy), without fetching them"""
+    store = _local("Patient")
+    if store:
+        return store.count("Patient")
+    return get_fhir_client().count("Patient") or 0
+
+def get_patient(patient_id: str, use_cache: bool = USE_CACHE) -> Optional[Dict]:
     """Get a specific patient by ID from FHIR server"""
+    patient = _cached("Patient", {"_id": patient_id}, use_cache, lambda: _read_patient(patient_id))
+    return dict(patient) if patient else None
+
+def _read_patient(patient_id: str) -> Optional[Dict]:
+    """Read and map a Patient, bypassing the cache"""
     client = get_fhir_client()
     fhir_patient = client.read("Patient", patient_id)
     
@@ -55,11 +120,19 @@ def get_patient(patient_id: str) -> Optional[Dict]:
     return None
 
 def get_all_doctors(use_cache: bool = USE_CACHE) -> List[Dict]:
-    """Get all doctors (Practitioners) from FHIR server"""
+    """Get all doctors (Practitioners) from FHIR server, or the synced local copy"""
+    store = _local("Practitioner")
+    if store:
+        return store.all("Practitioner", limit=50)
+    params = {"_count": 50}
+    return list(_cached("Practitioner", params, use_cache, lambda: _search_doctors(params, DOCTOR_LIST_FIELDS)))
+
+def _search_doctors(params: Dict, fields: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Search and map Practitioners, bypassing the cache"""
     client = get_fhir_client()
     
     # Search for Practitioner resources
-    fhir_practitioners = client.search("Practitioner", params={"_count": 50})
+    fhir_practitioners = client.search("Practitioner", params=params, elements=elements_for("Practitioner", fields))
     
     doctors = []
     for fhir_practitioner in fhir_practitioners:
@@ -72,8 +145,17 @@ def get_all_doctors(use_cache: bool = USE_CACHE) -> List[Dict]:
     
     return doctors
 
-def get_doctor(doctor_id: str) -> Optional[Dict]:
-    """Get a specific doctor by ID from FHIR server"""
+def get_doctor(doctor_id: str, use_cache: bool = USE_CACHE) -> Optional[Dict]:
+    """Get a specific doctor by ID from FHIR server, or the synced local copy"""
+    store = _local("Practitioner")
+    doctor = store.get("Practitioner", doctor_id) if store else None
+    if doctor:
+        return doctor
+    doctor = _cached("Practitioner", {"_id": doctor_id}, use_cache, lambda: _read_doctor(doctor_id))
+    return dict(doctor) if doctor else None
+
+def _read_doctor(doctor_id: str) -> Optional[Dict]:
+    """Read and map a Practitioner, bypassing the cache"""
     client = get_fhir_client()
     fhir_practitioner = client.read("Practitioner", doctor_id)
     
@@ -85,16 +167,91 @@ def get_doctor(doctor_id: str) -> Optional[Dict]:
             return None
     return None
 
+def _reference_id(obj, prefix: str) -> Optional[str]:
+    """Extract the ID from a Reference (dict or bare string) such as "Practitioner/123" """
+    ref = None
+    if isinstance(obj, dict):
+        ref = obj.get("reference", "")
+    elif isinstance(obj, str):
+        ref = obj
+    if not ref:
+        return None
+    return ref.replace(f"{prefix}/", "").split("?")[0] or None
+
+def _apply_role(doctor: Dict, role: Dict, hospital_id: str):
+    """Update a doctor with department/specialty/location from a PractitionerRole"""
+    doctor["hospital_id"] = hospital_id
+    
+    # Extract department/role code
+    role_codes = role.get("code", [])
+    if role_codes:
+        if isinstance(role_codes[0], dict):
+            doctor["department"] = role_codes[0].get("text") or role_codes[0].get("coding", [{}])[0].get("display", "")
+        elif isinstance(role_codes[0], str):
+            doctor["department"] = role_codes[0]
+    
+    # Extract specialty from role
+    specialties = role.get("specialty", [])
+    if specialties:
+        specialty_text = specialties[0].get("coding", [{}])[0].get("display", "")
+        if specialty_text and specialty_text != doctor.get("specialization", ""):
+            doctor["department_specialty"] = specialty_text
+    
+    # Extract location if available
+    locations = role.get("location", [])
+    if locations:
+        location_ref = locations[0].get("reference", "") if isinstance(locations[0], dict) else locations[0]
+        if location_ref:
+            doctor["location"] = location_ref
+
+def _read_doctors(practitioner_ids: List[str], included: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+    """
+    Map many Practitioners keyed by ID, taking them from _include results where
+    present and batch-reading (one request) only those the server left out
+    """
+    fhir_practitioners = dict(included or {})
+    missing = [f"Practitioner/{pid}" for pid in practitioner_ids if f"Practitioner/{pid}" not in fhir_practitioners]
+    if missing:
+        client = get_fhir_client()
+        fhir_practitioners.update(client.batch_read(missing))
+    
+    doctors = {}
+    for pid in practitioner_ids:
+        fhir_practitioner = fhir_practitioners.get(f"Practitioner/{pid}")
+        if fhir_practitioner:
+            try:
+                doctors[pid] = fhir_practitioner_to_doctor(fhir_practitioner)
+            except Exception as e:
+                print(f"Error mapping FHIR Practitioner: {e}")
+    return doctors
+
+def _local_doctors(store: FHIRStore, practitioner_ids: List[str]) -> Dict[str, Dict]:
+    """Mapped Practitioners from the local store keyed by ID, falling back to the server for any missing"""
+    doctors = {}
+    for pid in practitioner_ids:
+        doctor = store.get("Practitioner", pid)
+        if doctor:
+            doctors[pid] = doctor
+    missing = [pid for pid in practitioner_ids if pid not in doctors]
+    if missing:
+        doctors.update(_read_doctors(missing))
+    return doctors
+
 def get_doctors_by_hospital(hospital_id: str) -> List[Dict]:
     """
     Get doctors by hospital using multiple methods:
     1. PractitionerRole (primary method - links practitioners to organizations)
     2. Encounter participants (fallback - finds doctors who have encounters at this hospital)
+    
+    Practitioners come back in the same search via _include; any the server
+    does not include are resolved with one batch read, so the number of FHIR
+    requests does not grow with the number of roles or encounters. Once
+    PractitionerRoles and Practitioners are synced locally, method 1 makes no
+    FHIR requests at all.
     """
     client = get_fhir_client()
     
     doctors = []
-    seen_doctor_ids = set()  # Avoid duplicates
     
     # Method 1: Search PractitionerRole by organization (primary method)
     search_params = [
@@ -102,70 +259,37 @@ def get_doctors_by_hospital(hospital_id: str) -> List[Dict]:
         {"organization": f"Organization/{hospital_id}", "_count": 100},
     ]
     
-    for params in search_params:
-        fhir_roles = client.search("PractitionerRole", params=params)
-        
+    store = _local("PractitionerRole") if _local("Practitioner") else None
+    roles_by_practitioner = {}  # First matching role per practitioner, in discovery order
+    included = {}
+    if store:
+        role_results = [store.find("PractitionerRole", "$.organization.reference", f"Organization/{hospital_id}")]
+    else:
+        role_results = []
+        for params in search_params:
+            fhir_roles, role_includes = client.search_with_includes("PractitionerRole", params=params, include=["PractitionerRole:practitioner"])
+            included.update(role_includes)
+            role_results.append(fhir_roles)
+    for fhir_roles in role_results:
         for role in fhir_roles:
             # Verify this role is for the correct organization
-            org_ref = None
-            org_obj = role.get("organization")
-            if isinstance(org_obj, dict):
-                org_ref = org_obj.get("reference", "")
-            elif isinstance(org_obj, str):
-                org_ref = org_obj
-            
-            # Check if organization matches (handle different reference formats)
-            org_id = None
-            if org_ref:
-                org_id = org_ref.replace("Organization/", "").split("?")[0]
-            
-            if org_id != hospital_id:
+            if _reference_id(role.get("organization"), "Organization") != hospital_id:
                 continue  # Skip if organization doesn't match
             
-            # Extract practitioner reference - handle different formats
-            practitioner_ref = None
-            practitioner_obj = role.get("practitioner")
-            
-            if isinstance(practitioner_obj, dict):
-                practitioner_ref = practitioner_obj.get("reference", "")
-            elif isinstance(practitioner_obj, str):
-                practitioner_ref = practitioner_obj
-            
-            if practitioner_ref:
-                # Extract ID from reference (handle formats like "Practitioner/123" or just "123")
-                practitioner_id = practitioner_ref.replace("Practitioner/", "").split("?")[0]
-                
-                if practitioner_id and practitioner_id not in seen_doctor_ids:
-                    doctor = get_doctor(practitioner_id)
-                    if doctor:
-                        seen_doctor_ids.add(practitioner_id)
-                        
-                        # Update with role information
-                        doctor["hospital_id"] = hospital_id
-                        
-                        # Extract department/role code
-                        role_codes = role.get("code", [])
-                        if role_codes:
-                            if isinstance(role_codes[0], dict):
-                                doctor["department"] = role_codes[0].get("text") or role_codes[0].get("coding", [{}])[0].get("display", "")
-                            elif isinstance(role_codes[0], str):
-                                doctor["department"] = role_codes[0]
-                        
-                        # Extract specialty from role
-                        specialties = role.get("specialty", [])
-                        if specialties:
-                            specialty_text = specialties[0].get("coding", [{}])[0].get("display", "")
-                            if specialty_text and specialty_text != doctor.get("specialization", ""):
-                                doctor["department_specialty"] = specialty_text
-                        
-                        # Extract location if available
-                        locations = role.get("location", [])
-                        if locations:
-                            location_ref = locations[0].get("reference", "") if isinstance(locations[0], dict) else locations[0]
-                            if location_ref:
-                                doctor["location"] = location_ref
-                        
-                        doctors.append(doctor)
+            practitioner_id = _reference_id(role.get("practitioner"), "Practitioner")
+            if practitioner_id and practitioner_id not in roles_by_practitioner:
+                roles_by_practitioner[practitioner_id] = role
+    
+    if roles_by_practitioner:
+        if store:
+            found = _local_doctors(store, list(roles_by_practitioner))
+        else:
+            found = _read_doctors(list(roles_by_practitioner), included)
+        for practitioner_id, role in roles_by_practitioner.items():
+            doctor = found.get(practitioner_id)
+            if doctor:
+                _apply_role(doctor, role, hospital_id)
+                doctors.append(doctor)
     
     # Method 2: Fallback - Find doctors through Encounters at this hospital
     # This helps when PractitionerRole data is limited
@@ -176,49 +300,130 @@ def get_doctors_by_hospital(hospital_id: str) -> List[Dict]:
             {"service-provider": f"Organization/{hospital_id}", "_count": 50},
         ]
         
+        practitioner_ids = []
+        included = {}
         for params in encounter_params:
-            fhir_encounters = client.search("Encounter", params=params)
-            
+            fhir_encounters, encounter_includes = client.search_with_includes("Encounter", params=params, include=["Encounter:practitioner"])
+            included.update(encounter_includes)
             for encounter in fhir_encounters:
                 # Get participants (doctors) from the encounter
-                participants = encounter.get("participant", [])
-                for participant in participants:
-                    individual_ref = None
-                    individual_obj = participant.get("individual")
-                    
-                    if isinstance(individual_obj, dict):
-                        individual_ref = individual_obj.get("reference", "")
-                    elif isinstance(individual_obj, str):
-                        individual_ref = individual_obj
-                    
+                for participant in encounter.get("participant", []):
+                    individual = participant.get("individual")
+                    individual_ref = individual.get("reference", "") if isinstance(individual, dict) else individual
                     if individual_ref and "Practitioner/" in individual_ref:
-                        practitioner_id = individual_ref.replace("Practitioner/", "").split("?")[0]
-                        
-                        if practitioner_id and practitioner_id not in seen_doctor_ids:
-                            doctor = get_doctor(practitioner_id)
-                            if doctor:
-                                seen_doctor_ids.add(practitioner_id)
-                                doctor["hospital_id"] = hospital_id
-                                # Mark as found via encounters (less definitive than PractitionerRole)
-                                doctor["source"] = "encounter"
-                                doctors.append(doctor)
+                        practitioner_id = _reference_id(individual_ref, "Practitioner")
+                        if practitioner_id and practitioner_id not in practitioner_ids:
+                            practitioner_ids.append(practitioner_id)
+        
+        if practitioner_ids:
+            found = _read_doctors(practitioner_ids, included)
+            for practitioner_id in practitioner_ids:
+                doctor = found.get(practitioner_id)
+                if doctor:
+                    doctor["hospital_id"] = hospital_id
+                    # Mark as found via encounters (less definitive than PractitionerRole)
+                    doctor["source"] = "encounter"
+                    doctors.append(doctor)
     
     return doctors
 
-def get_doctors_by_specialization(specialization: str) -> List[Dict]:
-    """Get doctors by specialization"""
-    all_doctors = get_all_doctors()
+def get_doctors_by_specialization(specialization: str, use_cache: bool = USE_CACHE, limit: Optional[int] = 50) -> List[Dict]:
+    """
+    Get doctors by specialization
+    
+    Matches the synced local PractitionerRoles when available; otherwise filters
+    on the server with PractitionerRole?specialty:text= when the server supports
+    it, and falls back to matching get_all_doctors locally.
+    
+    At most limit doctors are returned; on the server, PractitionerRole pages
+    are only followed until that many practitioners are found (None follows
+    every page, which is unbounded for a common specialty on public servers).
+    """
+    store = _local("PractitionerRole") if _local("Practitioner") else None
+    if store:
+        roles = [role for role in store.all_resources("PractitionerRole") if _role_has_specialty(role, specialization)]
+        return _doctors_from_roles(roles, lambda ids: _local_doctors(store, ids), limit)
+    
+    client = get_fhir_client()
+    if client.supports_search_param("PractitionerRole", "specialty"):
+        return list(_cached("Practitioner", {"specialty:text": specialization, "_limit": limit}, use_cache,
+                            lambda: _search_doctors_by_specialty(specialization, limit)))
+    
+    all_doctors = get_all_doctors(use_cache)
     return [d for d in all_doctors if specialization.lower() in d.get("specialization", "").lower()]
 
-def get_all_hospitals(use_cache: bool = USE_CACHE) -> List[Dict]:
-    """Get all hospitals (Organizations) from FHIR server"""
+def _search_doctors_by_specialty(specialization: str, limit: Optional[int] = 50) -> List[Dict]:
+    """Find doctors through PractitionerRoles matching a specialty, following pages until limit practitioners are found"""
     client = get_fhir_client()
+    params = {"specialty:text": specialization, "_count": min(limit, 100) if limit else 100}
+    roles = client.iter_search("PractitionerRole", params=params, prefetch=limit is None, stream=limit is not None)
+    return _doctors_from_roles(roles, _read_doctors, limit)
+
+def _role_has_specialty(role: Dict, specialization: str) -> bool:
+    """Whether any specialty text/display of a PractitionerRole contains specialization"""
+    needle = specialization.lower()
+    for concept in role.get("specialty", []):
+        texts = [concept.get("text", "")] + [coding.get("display", "") for coding in concept.get("coding", [])]
+        if any(needle in (text or "").lower() for text in texts):
+            return True
+    return False
+
+def _doctors_from_roles(roles: Iterable[Dict], read_doctors, limit: Optional[int] = None) -> List[Dict]:
+    """
+    Map the practitioners of PractitionerRoles (first role each), taking the specialty from the role
+    
+    Roles are consumed only until limit practitioners are found, so a lazy
+    search stops paging there.
+    """
+    roles_by_practitioner = {}  # First matching role per practitioner, in discovery order
+    for role in roles:
+        practitioner_id = _reference_id(role.get("practitioner"), "Practitioner")
+        if practitioner_id and practitioner_id not in roles_by_practitioner:
+            roles_by_practitioner[practitioner_id] = role
+            if limit is not None and len(roles_by_practitioner) >= limit:
+                break
     
+    doctors = []
+    found = read_doctors(list(roles_by_practitioner))
+    for practitioner_id, role in roles_by_practitioner.items():
+        doctor = found.get(practitioner_id)
+        if doctor:
+            _apply_role(doctor, role, _reference_id(role.get("organization"), "Organization"))
+            # The matched role, not the Practitioner's qualification, carries the specialty
+            specialty = _first_coding_display(role.get("specialty"))
+            if specialty:
+                doctor["specialization"] = specialty
+                doctor.pop("department_specialty", None)
+            doctors.append(doctor)
+    return doctors
+
+def _first_coding_display(concepts) -> Optional[str]:
+    """Text or first coding display of the first CodeableConcept in a list"""
+    for concept in concepts or []:
+        if concept.get("text"):
+            return concept["text"]
+        for coding in concept.get("coding", []):
+            if coding.get("display"):
+                return coding["display"]
+    return None
+
+def _local_hospitals(store: FHIRStore) -> List[Dict]:
+    """Synced Organizations typed as healthcare providers (type=prov), mapped"""
+    return store.find_coded("Organization", "$.type", "prov", mapped=True)
+
+def get_all_hospitals(use_cache: bool = USE_CACHE) -> List[Dict]:
+    """Get all hospitals (Organizations) from FHIR server, or the synced local copy"""
+    store = _local("Organization")
+    if store:
+        return _local_hospitals(store)[:50]
     # Search for Organization resources with type=prov (Healthcare Provider)
-    fhir_orgs = client.search("Organization", params={
-        "type": "prov",
-        "_count": 50
-    })
+    params = {"type": "prov", "_count": 50}
+    return list(_cached("Organization", params, use_cache, lambda: _search_hospitals(params, HOSPITAL_LIST_FIELDS)))
+
+def _search_hospitals(params: Dict, fields: Optional[Iterable[str]] = None) -> List[Dict]:
+    """Search and map Organizations, bypassing the cache"""
+    client = get_fhir_client()
+    fhir_orgs = client.search("Organization", params=params, elements=elements_for("Organization", fields))
     
     hospitals = []
     for fhir_org in fhir_orgs:
@@ -231,8 +436,17 @@ def get_all_hospitals(use_cache: bool = USE_CACHE) -> List[Dict]:
     
     return hospitals
 
-def get_hospital(hospital_id: str) -> Optional[Dict]:
-    """Get a specific hospital by ID from FHIR server"""
+def get_hospital(hospital_id: str, use_cache: bool = USE_CACHE) -> Optional[Dict]:
+    """Get a specific hospital by ID from FHIR server, or the synced local copy"""
+    store = _local("Organization")
+    hospital = store.get("Organization", hospital_id) if store else None
+    if hospital:
+        return hospital
+    hospital = _cached("Organization", {"_id": hospital_id}, use_cache, lambda: _read_hospital(hospital_id))
+    return dict(hospital) if hospital else None
+
+def _read_hospital(hospital_id: str) -> Optional[Dict]:
+    """Read and map an Organization, bypassing the cache"""
     client = get_fhir_client()
     fhir_org = client.read("Organization", hospital_id)
     
@@ -244,11 +458,53 @@ def get_hospital(hospital_id: str) -> Optional[Dict]:
             return None
     return None
 
-def search_hospitals(city: Optional[str] = None, state: Optional[str] = None, specialty: Optional[str] = None) -> List[Dict]:
-    """Search hospitals by location and specialty"""
-    all_hospitals = get_all_hospitals()
+def search_hospitals(city: Optional[str] = None, state: Optional[str] = None, specialty: Optional[str] = None,
+                     use_cache: bool = USE_CACHE, limit: Optional[int] = 50) -> List[Dict]:
+    """
+    Search hospitals by location and specialty
     
-    results = all_hospitals
+    Each filter is sent as a FHIR search parameter (address-city, address-state,
+    type:text) when the server declares it. Filters the server cannot apply are
+    matched locally instead, as are all of them once Organizations are synced
+    locally.
+    
+    At most limit Organizations are read from the server (one page by default;
+    None follows every page, which is unbounded on public servers), and
+    locally-matched filters are applied to those.
+    """
+    store = _local("Organization")
+    if store:
+        return _filter_hospitals(_local_hospitals(store), city, state, specialty)
+    
+    client = get_fhir_client()
+    params = {"type": "prov", "_count": 50}
+    local_city, local_state, local_specialty = None, None, None
+    if city:
+        if client.supports_search_param("Organization", "address-city"):
+            params["address-city"] = city
+        else:
+            local_city = city
+    if state:
+        if client.supports_search_param("Organization", "address-state"):
+            params["address-state"] = state
+        else:
+            local_state = state
+    if specialty:
+        if client.supports_search_param("Organization", "type"):
+            params["type:text"] = specialty
+        else:
+            local_specialty = specialty
+    
+    fhir_orgs = client.iter_search("Organization", params=params, prefetch=limit is None, stream=limit is not None,
+                                   elements=elements_for("Organization", HOSPITAL_LIST_FIELDS))
+    results = list(_cached("Organization", {**params, "_limit": limit}, use_cache, lambda: list(islice(
+        _iter_mapped(fhir_orgs, fhir_organization_to_hospital, "Organization"), limit))))
+    
+    # Fallback: filter locally on whatever the server could not
+    return _filter_hospitals(results, local_city, local_state, local_specialty)
+
+def _filter_hospitals(results: List[Dict], city: Optional[str], state: Optional[str], specialty: Optional[str]) -> List[Dict]:
+    """Substring-match mapped hospitals on city, state and specialty"""
     if city:
         results = [h for h in results if city.lower() in h.get("city", "").lower()]
     if state:
@@ -281,105 +537,221 @@ def get_medical_records(hospital_id: Optional[str] = None, patient_id: Optional[
     
     return records
 
-# CRUD operations (create/update/delete) - delegate to FHIR client
-def create_patient(patient_data: Dict) -> Dict:
-    """Create a new patient in FHIR server"""
-    # Convert our model to FHIR Patient resource
-    # This is simplified - in production, use a proper FHIR resource builder
+# CRUD operations (create/update/delete). Creates convert our models with the
+# reverse mappers in fhir_mapper, updates change only the elements of changed
+# fields (RESOURCE_UPDATERS), and both go out in FHIR transaction Bundles.
+def _create_entries(resource_type: str, records: List[Dict]) -> List[Dict]:
+    reverse = REVERSE_MAPPERS[resource_type]
+    entries = []
+    for record in records:
+        resource = reverse(record)
+        resource.pop("id", None)
+        entries.append(write_entry(resource))
+    return entries
+
+def _created(records: List[Dict], results: List[Optional[Dict]]) -> List[Optional[Dict]]:
+    """Records carrying their server-assigned ids (None where the write failed)"""
+    return [{**record, "id": result["id"]} if result else None for record, result in zip(records, results)]
+
+def create_many(resource_type: str, records: Iterable[Mapping]) -> List[Optional[Dict]]:
+    """
+    Create many records of one resource type on the FHIR server
+    
+    Records are sent in transaction Bundles (see FHIRClient.transaction), so a
+    bulk import of thousands of records takes a few requests, not one POST each.
+    
+    Args:
+        resource_type: "Patient", "Practitioner" or "Organization" (see REVERSE_MAPPERS)
+        records: Our model records; any id they carry is ignored
+    
+    Returns:
+        The records with their server-assigned ids, in input order (None for
+        records whose transaction failed)
+    """
+    records = [dict(record) for record in records]
     client = get_fhir_client()
-    # Implementation would convert patient_data to FHIR Patient format
-    # For now, return the data (would need full FHIR resource creation)
-    return patient_data
+    results = client.transaction(_create_entries(resource_type, records))
+    _cache.invalidate(resource_type)
+    return _created(records, results)
+
+def _update_entry(resource_type: str, resource_id: str, current: Optional[Dict], changes: Mapping) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """
+    Merge changes (None values leave a field as it is) into the current
+    resource: the updated record and the transaction entry replacing it, or
+    (None, None) if the resource does not exist
+    
+    Only the elements behind fields whose values change are rewritten, and
+    those are merged into the existing ones (see RESOURCE_UPDATERS), so
+    codes, identifiers, contact points and flags our models do not cover
+    are kept.
+    """
+    if not current:
+        return None, None
+    before = MAPPERS[resource_type](current)
+    record = {**before, **{key: value for key, value in changes.items() if value is not None}, "id": resource_id}
+    changed = {field for field, value in record.items() if value != before.get(field)}
+    resource = {key: value for key, value in current.items() if key != "meta"}
+    resource = RESOURCE_UPDATERS[resource_type](resource, record, changed)
+    return record, write_entry(resource, resource_id)
+
+def _updated(records: List[Optional[Dict]], results: List[Optional[Dict]]) -> List[Optional[Dict]]:
+    """Updated records in input order (None where missing or the write failed)"""
+    written = iter(results)
+    return [record if record is not None and next(written) else None for record in records]
+
+def update_many(resource_type: str, changes: Mapping[str, Mapping]) -> List[Optional[Dict]]:
+    """
+    Update many records of one resource type on the FHIR server
+    
+    Current resources are fetched with batch reads and the replacements are
+    sent in transaction Bundles.
+    
+    Args:
+        resource_type: "Patient", "Practitioner" or "Organization" (see REVERSE_MAPPERS)
+        changes: Fields to change, keyed by resource ID
+    
+    Returns:
+        The updated records, in the order of changes (None for resources that
+        do not exist or whose transaction failed)
+    """
+    client = get_fhir_client()
+    current = client.batch_read([f"{resource_type}/{resource_id}" for resource_id in changes])
+    records, entries = [], []
+    for resource_id, fields in changes.items():
+        record, entry = _update_entry(resource_type, resource_id, current.get(f"{resource_type}/{resource_id}"), fields)
+        records.append(record)
+        if entry:
+            entries.append(entry)
+    _cache.invalidate(resource_type)
+    results = client.transaction(entries) if entries else []
+    _cache.invalidate(resource_type)
+    return _updated(records, results)
+
+def _delete(resource_type: str, resource_id: str) -> bool:
+    # Invalidate on both sides of the write, so no read overlapping it can cache the old resource
+    _cache.invalidate(resource_type)
+    try:
+        return get_fhir_client().delete(resource_type, resource_id)
+    finally:
+        _cache.invalidate(resource_type)
+
+def create_patient(patient_data: Dict) -> Optional[Dict]:
+    """Create a new patient in FHIR server"""
+    return create_many("Patient", [patient_data])[0]
 
 def update_patient(patient_id: str, patient_data: Dict) -> Optional[Dict]:
     """Update a patient in FHIR server"""
-    client = get_fhir_client()
-    # Implementation would update FHIR Patient resource
-    return patient_data
+    return update_many("Patient", {patient_id: patient_data})[0]
 
 def delete_patient(patient_id: str) -> bool:
     """Delete a patient from FHIR server"""
-    client = get_fhir_client()
-    return client.delete("Patient", patient_id)
+    return _delete("Patient", patient_id)
 
-def create_doctor(doctor_data: Dict) -> Dict:
-    """Create a new doctor in FHIR server"""
-    return doctor_data
+def create_doctor(doctor_data: Dict) -> Optional[Dict]:
+    """Create a new doctor (Practitioner) in FHIR server"""
+    return create_many("Practitioner", [doctor_data])[0]
 
 def update_doctor(doctor_id: str, doctor_data: Dict) -> Optional[Dict]:
-    """Update a doctor in FHIR server"""
-    return doctor_data
+    """Update a doctor (Practitioner) in FHIR server"""
+    return update_many("Practitioner", {doctor_id: doctor_data})[0]
 
 def delete_doctor(doctor_id: str) -> bool:
     """Delete a doctor from FHIR server"""
-    client = get_fhir_client()
-    return client.delete("Practitioner", doctor_id)
+    return _delete("Practitioner", doctor_id)
 
-def create_hospital(hospital_data: Dict) -> Dict:
-    """Create a new hospital in FHIR server"""
-    return hospital_data
+def create_hospital(hospital_data: Dict) -> Optional[Dict]:
+    """Create a new hospital (Organization) in FHIR server"""
+    return create_many("Organization", [hospital_data])[0]
 
 def update_hospital(hospital_id: str, hospital_data: Dict) -> Optional[Dict]:
-    """Update a hospital in FHIR server"""
-    return hospital_data
+    """Update a hospital (Organization) in FHIR server"""
+    return update_many("Organization", {hospital_id: hospital_data})[0]
 
 def delete_hospital(hospital_id: str) -> bool:
     """Delete a hospital from FHIR server"""
+    return _delete("Organization", hospital_id)
+
+# Max IDs per _id search, keeps the query string well under URL length limits
+_ID_SEARCH_CHUNK = 100
+
+def _chunked(items, size: int) -> Iterator[List]:
+    """Group an iterable into lists of at most size items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _search_by_ids(resource_type: str, ids: List[str], mapper) -> Dict[str, Dict]:
+    """Resolve many resources with _id=a,b,c searches and map them, keyed by ID"""
     client = get_fhir_client()
-    return client.delete("Organization", hospital_id)
+    found = {}
+    for chunk in _chunked(ids, _ID_SEARCH_CHUNK):
+        fhir_resources = client.search(resource_type, params={"_id": ",".join(chunk), "_count": len(chunk)})
+        for resource in _iter_mapped(fhir_resources, mapper, resource_type):
+            found[resource.get("id")] = resource
+    return found
 
-def get_insurance_claims(hospital_id: Optional[str] = None) -> List[Dict]:
-    """Get insurance claims (FHIR Claim resources) from FHIR server"""
+def _claim_lookup_ids(claims: List[Dict]) -> tuple:
+    """Unique patient and hospital IDs referenced by a page of claims"""
+    patient_ids = list(dict.fromkeys(c["patientId"] for c in claims if c.get("patientId")))
+    hospital_ids = list(dict.fromkeys(c["hospitalId"] for c in claims if c.get("hospitalId")))
+    return patient_ids, hospital_ids
+
+def _apply_claim_names(claims: List[Dict], patients: Dict[str, Dict], hospitals: Dict[str, Dict]):
+    """Join resolved patient and hospital names back onto claims"""
+    for claim in claims:
+        patient = patients.get(claim.get("patientId"))
+        if patient:
+            claim["patientName"] = f"{patient.get('first_name', '')} {patient.get('last_name', '')}".strip() or "Unknown Patient"
+        hospital = hospitals.get(claim.get("hospitalId"))
+        if hospital:
+            claim["hospitalName"] = hospital.get("name", "Unknown Hospital")
+
+def _enrich_claims(claims: List[Dict]) -> List[Dict]:
+    """Fill in patient and hospital names with one search per resource type for the whole page"""
+    patient_ids, hospital_ids = _claim_lookup_ids(claims)
+    patients = _search_by_ids("Patient", patient_ids, fhir_patient_to_model) if patient_ids else {}
+    hospitals = _search_by_ids("Organization", hospital_ids, fhir_organization_to_hospital) if hospital_ids else {}
+    _apply_claim_names(claims, patients, hospitals)
+    return claims
+
+def iter_insurance_claims(hospital_id: Optional[str] = None, page_size: int = 100, prefetch: bool = True) -> Iterator[Dict]:
+    """Stream insurance claims (FHIR Claim resources), following every Bundle page"""
     client = get_fhir_client()
     
-    params = {"_count": 100}
+    params = {"_count": page_size}
     if hospital_id:
         params["provider"] = f"Organization/{hospital_id}"
     
-    fhir_claims = client.search("Claim", params=params)
+    fhir_claims = client.iter_search("Claim", params=params, prefetch=prefetch, stream=not prefetch)
+    claims = _iter_mapped(fhir_claims, fhir_claim_to_insurance_claim, "Claim")
     
-    claims = []
-    for fhir_claim in fhir_claims:
-        try:
-            claim = fhir_claim_to_insurance_claim(fhir_claim)
-            
-            # If hospital_id filter was provided, verify it matches
-            if hospital_id and claim.get("hospitalId") != hospital_id:
-                continue
-            
-            # Try to get patient name if we have patient_id
-            if claim.get("patientId"):
-                try:
-                    patient = get_patient(claim["patientId"])
-                    if patient:
-                        claim["patientName"] = f"{patient.get('first_name', '')} {patient.get('last_name', '')}".strip() or "Unknown Patient"
-                except:
-                    pass
-            
-            # Try to get hospital name if we have hospital_id
-            if claim.get("hospitalId"):
-                try:
-                    hospital = get_hospital(claim["hospitalId"])
-                    if hospital:
-                        claim["hospitalName"] = hospital.get("name", "Unknown Hospital")
-                except:
-                    pass
-            
-            claims.append(claim)
-        except Exception as e:
-            print(f"Error mapping FHIR Claim: {e}")
-            continue
+    # If hospital_id filter was provided, verify it matches
+    if hospital_id:
+        claims = (claim for claim in claims if claim.get("hospitalId") == hospital_id)
     
-    return claims
+    # Enrich a page at a time so name lookups cost a constant number of requests per page
+    for page in _chunked(claims, page_size):
+        yield from _enrich_claims(page)
+
+def get_insurance_claims(hospital_id: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict]:
+    """Get insurance claims (FHIR Claim resources) from FHIR server (up to limit; None follows every page)"""
+    page_size = min(limit, 100) if limit else 100
+    return list(islice(iter_insurance_claims(hospital_id, page_size=page_size, prefetch=limit is None), limit))
 
 def get_coverage_rules(hospital_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
-    """Get insurance coverage rules (FHIR Coverage resources) from FHIR server"""
+    """Get insurance coverage rules (FHIR Coverage resources) from FHIR server, or the synced local copy"""
+    store = _local("Coverage")
+    if store:
+        return store.all("Coverage", limit=limit)
     try:
         client = get_fhir_client()
         
         # Limit results to improve performance - use smaller count
-        params = {"_count": min(limit, 20), "_summary": "false"}
-        fhir_coverages = client.search("Coverage", params=params)
+        params = {"_count": min(limit, 20)}
+        fhir_coverages = client.search("Coverage", params=params, elements=elements_for("Coverage", COVERAGE_RULE_FIELDS))
         
         coverage_rules = []
         count = 0
@@ -469,3 +841,560 @@ def get_patient_visits(patient_id: Optional[str] = None, limit: int = 20) -> Lis
         print(f"Error fetching patient visits from FHIR: {e}")
         return []
 
+
+
+# Async variants - awaitable end to end on the AsyncFHIRClient so slow FHIR
+# calls never hold a threadpool worker
+def _map_one(fhir_resource: Optional[Dict], mapper, resource_label: str, now: Optional[str] = None) -> Optional[Dict]:
+    """Map a single FHIR resource, returning None if it is missing or invalid (now: the batch's timestamp)"""
+    if fhir_resource:
+        try:
+            return mapper(fhir_resource, now)
+        except Exception as e:
+            print(f"Error mapping FHIR {resource_label}: {e}")
+            return None
+    return None
+
+async def _collect(items: AsyncIterator[Dict], limit: Optional[int]) -> List[Dict]:
+    """Gather up to limit items from an async iterator (None gathers all)"""
+    results = []
+    if limit is not None and limit <= 0:
+        return results
+    async for item in items:
+        results.append(item)
+        if limit is not None and len(results) >= limit:
+            break
+    await items.aclose()
+    return results
+
+async def iter_all_patients_async(page_size: int = 50, prefetch: bool = True, fields: Optional[Iterable[str]] = None) -> AsyncIterator[Dict]:
+    """Stream every patient from FHIR server, one Bundle page in memory at a time (fields limits the elements fetched)"""
+    client = get_fhir_client(asynchronous=True)
+    async for fhir_patient in client.iter_search("Patient", params={"_count": page_size}, prefetch=prefetch, stream=not prefetch,
+                                                 elements=elements_for("Patient", fields)):
+        patient = _map_one(fhir_patient, fhir_patient_to_model, "Patient")
+        if patient:
+            yield patient
+
+async def get_all_patients_async(limit: Optional[int] = 50) -> List[Dict]:
+    """Get all patients from FHIR server (up to limit; None follows every page)"""
+    return await _collect(iter_all_patients_async(prefetch=limit is None, fields=PATIENT_LIST_FIELDS), limit)
+
+async def get_patient_async(patient_id: str) -> Optional[Dict]:
+    """Get a specific patient by ID from FHIR server"""
+    client = get_fhir_client(asynchronous=True)
+    return _map_one(await client.read("Patient", patient_id), fhir_patient_to_model, "Patient")
+
+async def _read_patient_async(patient_id: str) -> Optional[Dict]:
+    """Like get_patient_async, but a failed read raises rather than looking like a missing patient"""
+    client = get_fhir_client(asynchronous=True)
+    return _map_one(await client.read("Patient", patient_id, raise_errors=True), fhir_patient_to_model, "Patient")
+
+async def get_all_doctors_async() -> List[Dict]:
+    """Get all doctors (Practitioners) from FHIR server, or the synced local copy"""
+    store = _local("Practitioner")
+    if store:
+        return store.all("Practitioner", limit=50)
+    client = get_fhir_client(asynchronous=True)
+    fhir_practitioners = await client.search("Practitioner", params={"_count": 50}, elements=elements_for("Practitioner", DOCTOR_LIST_FIELDS))
+    return _map_resources(fhir_practitioners, fhir_practitioner_to_doctor, "Practitioner")
+
+async def get_doctor_async(doctor_id: str) -> Optional[Dict]:
+    """Get a specific doctor by ID from FHIR server, or the synced local copy"""
+    store = _local("Practitioner")
+    doctor = store.get("Practitioner", doctor_id) if store else None
+    if doctor:
+        return doctor
+    client = get_fhir_client(asynchronous=True)
+    return _map_one(await client.read("Practitioner", doctor_id), fhir_practitioner_to_doctor, "Practitioner")
+
+async def get_all_hospitals_async() -> List[Dict]:
+    """Get all hospitals (Organizations) from FHIR server, or the synced local copy"""
+    store = _local("Organization")
+    if store:
+        return _local_hospitals(store)[:50]
+    client = get_fhir_client(asynchronous=True)
+    fhir_orgs = await client.search("Organization", params={"type": "prov", "_count": 50},
+                                   elements=elements_for("Organization", HOSPITAL_LIST_FIELDS))
+    return _map_resources(fhir_orgs, fhir_organization_to_hospital, "Organization")
+
+async def get_hospital_async(hospital_id: str) -> Optional[Dict]:
+    """Get a specific hospital by ID from FHIR server, or the synced local copy"""
+    store = _local("Organization")
+    hospital = store.get("Organization", hospital_id) if store else None
+    if hospital:
+        return hospital
+    client = get_fhir_client(asynchronous=True)
+    return _map_one(await client.read("Organization", hospital_id), fhir_organization_to_hospital, "Organization")
+
+async def get_medical_records_async(hospital_id: Optional[str] = None, patient_id: Optional[str] = None,
+                                    limit: int = 50, newest_first: bool = False) -> List[Dict]:
+    """
+    Get medical records (Encounters) from FHIR server
+    
+    Args:
+        hospital_id: Only this hospital's (service-provider) encounters
+        patient_id: Only this patient's (subject) encounters
+        limit: Maximum records (one search page)
+        newest_first: Have the server return the most recent encounters (_sort=-date)
+    """
+    client = get_fhir_client(asynchronous=True)
+    
+    params = {"_count": limit}
+    if newest_first:
+        params["_sort"] = "-date"
+    if patient_id:
+        params["subject"] = f"Patient/{patient_id}"
+    if hospital_id:
+        params["service-provider"] = f"Organization/{hospital_id}"
+    
+    fhir_encounters = await client.search("Encounter", params=params)
+    return _map_resources(fhir_encounters, fhir_encounter_to_record, "Encounter")
+
+async def _search_by_ids_async(resource_type: str, ids: List[str], mapper) -> Dict[str, Dict]:
+    """Resolve many resources with concurrent _id=a,b,c searches and map them, keyed by ID"""
+    client = get_fhir_client(asynchronous=True)
+    chunks = list(_chunked(ids, _ID_SEARCH_CHUNK))
+    pages = await asyncio.gather(*(
+        client.search(resource_type, params={"_id": ",".join(chunk), "_count": len(chunk)})
+        for chunk in chunks
+    ))
+    found = {}
+    for fhir_resources in pages:
+        for resource in _iter_mapped(fhir_resources, mapper, resource_type):
+            found[resource.get("id")] = resource
+    return found
+
+async def _enrich_claims_async(claims: List[Dict]) -> List[Dict]:
+    """Fill in patient and hospital names, resolving both lookups concurrently"""
+    patient_ids, hospital_ids = _claim_lookup_ids(claims)
+    patients, hospitals = await asyncio.gather(
+        _search_by_ids_async("Patient", patient_ids, fhir_patient_to_model),
+        _search_by_ids_async("Organization", hospital_ids, fhir_organization_to_hospital)
+    )
+    _apply_claim_names(claims, patients, hospitals)
+    return claims
+
+async def iter_insurance_claims_async(hospital_id: Optional[str] = None, page_size: int = 100, prefetch: bool = True) -> AsyncIterator[Dict]:
+    """Stream insurance claims (FHIR Claim resources), following every Bundle page"""
+    client = get_fhir_client(asynchronous=True)
+    
+    params = {"_count": page_size}
+    if hospital_id:
+        params["provider"] = f"Organization/{hospital_id}"
+    
+    page = []
+    async for fhir_claim in client.iter_search("Claim", params=params, prefetch=prefetch, stream=not prefetch):
+        claim = _map_one(fhir_claim, fhir_claim_to_insurance_claim, "Claim")
+        if not claim:
+            continue
+        
+        # If hospital_id filter was provided, verify it matches
+        if hospital_id and claim.get("hospitalId") != hospital_id:
+            continue
+        
+        page.append(claim)
+        if len(page) >= page_size:
+            for enriched in await _enrich_claims_async(page):
+                yield enriched
+            page = []
+    
+    for enriched in await _enrich_claims_async(page):
+        yield enriched
+
+async def get_insurance_claims_async(hospital_id: Optional[str] = None, limit: Optional[int] = 100) -> List[Dict]:
+    """Get insurance claims (FHIR Claim resources) from FHIR server (up to limit; None follows every page)"""
+    page_size = min(limit, 100) if limit else 100
+    return await _collect(iter_insurance_claims_async(hospital_id, page_size=page_size, prefetch=limit is None), limit)
+
+class InvalidCursor(ValueError):
+    """A continuation cursor that is malformed, does not point at our FHIR server or belongs to another search"""
+
+class InvalidFields(ValueError):
+    """A fields= selection naming a field the view does not have"""
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Split a comma-separated fields= parameter (None or empty selects every field)"""
+    selected = [field.strip() for field in (fields or "").split(",") if field.strip()]
+    return selected or None
+
+def _projector(view: type, fields: Optional[Iterable[str]]):
+    """Mapper computing only fields of view (every field when fields is None)"""
+    try:
+        return projector(view, fields)
+    except ValueError as e:
+        raise InvalidFields(str(e))
+
+class ResultPage(NamedTuple):
+    """One response's worth of mapped results"""
+    items: List[Dict]
+    # Opaque cursor that resumes right after the last item (None when there is nothing more)
+    next_cursor: Optional[str]
+    # True when the request's time budget ran out (or FHIR failed) before limit was reached
+    partial: bool
+
+def _encode_cursor_data(data: Dict) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor_data(cursor: str) -> Dict:
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if not isinstance(data, dict):
+        raise InvalidCursor("Malformed cursor")
+    return data
+
+def _search_filters(params: Dict) -> Dict:
+    """The search params that select results (the page size may change from page to page)"""
+    return {name: value for name, value in params.items() if name != "_count"}
+
+def encode_cursor(position: Tuple[str, Optional[Dict], int], resource_type: str, params: Dict) -> str:
+    """
+    Encode a search position (page URL, page params, matches to skip) as an opaque cursor,
+    bound to the search (resource type and filters) it continues
+    """
+    url, page_params, skip = position
+    return _encode_cursor_data({"t": resource_type, "f": _search_filters(params), "u": url, "p": page_params, "s": skip})
+
+def _is_search_url(url: str, base_url: str, resource_type: str) -> bool:
+    """Whether url is a search of resource_type on base_url's server, or one of its paging links (_getpages)"""
+    base, target = urlparse(base_url), urlparse(url)
+    if (target.scheme, target.netloc) != (base.scheme, base.netloc) or target.params or target.fragment:
+        return False
+    base_path = base.path.rstrip("/")
+    if target.path == f"{base_path}/{resource_type}":
+        return True
+    return target.path.rstrip("/") == base_path and "_getpages" in parse_qs(target.query)
+
+def decode_cursor(cursor: str, base_url: str, resource_type: str, params: Dict) -> Tuple[str, Optional[Dict], int]:
+    """
+    Decode a continuation cursor back into a search position
+    
+    Args:
+        cursor: Cursor from encode_cursor
+        base_url: FHIR server the search runs on
+        resource_type: Resource type the endpoint searches
+        params: Search params of the endpoint's first page
+    
+    Raises:
+        InvalidCursor if it is malformed, was issued for another search, or its
+        URL is not a search of resource_type on base_url's server
+    """
+    data = _decode_cursor_data(cursor)
+    try:
+        url, page_params, skip = data["u"], data.get("p"), int(data.get("s", 0))
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if (page_params is not None and not isinstance(page_params, dict)) or skip < 0 or not isinstance(url, str):
+        raise InvalidCursor("Malformed cursor")
+    
+    if data.get("t") != resource_type or data.get("f") != _search_filters(params):
+        raise InvalidCursor("Cursor belongs to another search")
+    # The cursor's URL is fetched server-side, so only ever follow this search's own pages
+    if not _is_search_url(url, base_url, resource_type):
+        raise InvalidCursor("Cursor does not belong to this FHIR server")
+    if page_params is not None and _search_filters(page_params) != _search_filters(params):
+        raise InvalidCursor("Cursor belongs to another search")
+    return url, page_params, skip
+
+def encode_offset_cursor(offset: int) -> str:
+    """Encode a position in the local store as an opaque cursor"""
+    return _encode_cursor_data({"o": offset})
+
+def decode_offset_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Local-store offset of a cursor: 0 for no cursor, None for a FHIR search cursor
+    
+    Raises:
+        InvalidCursor if it is malformed
+    """
+    if not cursor:
+        return 0
+    data = _decode_cursor_data(cursor)
+    if "o" not in data:
+        return None
+    try:
+        offset = int(data["o"])
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Malformed cursor") from e
+    if offset < 0:
+        raise InvalidCursor("Malformed cursor")
+    return offset
+
+def _local_page(store: FHIRStore, resource_type: str, limit: int, offset: int) -> ResultPage:
+    """A page of mapped records from the local store (one extra row tells whether more follow)"""
+    items = store.all(resource_type, limit=limit + 1, offset=offset)
+    more = len(items) > limit
+    return ResultPage(items[:limit], encode_offset_cursor(offset + limit) if more else None, False)
+
+def page_headers(page: ResultPage) -> Dict[str, str]:
+    """Response headers that carry a page's partial flag and continuation cursor alongside its list body"""
+    headers = {}
+    if page.partial:
+        headers["X-Partial-Result"] = "true"
+    if page.next_cursor:
+        headers["X-Next-Cursor"] = page.next_cursor
+    return headers
+
+async def _page_search_async(resource_type: str, params: Dict, mapper, limit: int, cursor: Optional[str] = None,
+                             accept: Optional[Callable[[Dict], bool]] = None) -> ResultPage:
+    """
+    Map search results as they stream in until limit, the end of the results or
+    the request's deadline (fhir_deadline), whichever comes first
+    
+    Whatever was mapped before the deadline is returned with partial set and a
+    cursor that resumes at the first resource not returned. accept filters
+    mapped records without counting rejected ones towards limit.
+    
+    A request in flight is never cancelled: its timeout is already clamped to
+    the budget, and once the budget is spent no further resource is taken and
+    no further page is requested.
+    """
+    client = get_fhir_client(asynchronous=True)
+    if cursor:
+        position = decode_cursor(cursor, client.base_url, resource_type, params)
+    else:
+        position = (f"{client.base_url}/{resource_type}", params, 0)
+    
+    items = []
+    partial = exhausted = False
+    now = datetime.now().isoformat()
+    resources = client.iter_search_from(*position)
+    try:
+        while len(items) < limit:
+            left = remaining()
+            if left is not None and left <= 0:
+                partial = True
+                break
+            try:
+                fhir_resource, after = await resources.__anext__()
+            except StopAsyncIteration:
+                exhausted = True
+                break
+            except DeadlineExceeded:
+                partial = True
+                break
+            except Exception as e:
+                print(f"Error fetching {resource_type} from FHIR: {e}")
+                partial = True
+                break
+            record = _map_one(fhir_resource, mapper, resource_type, now)
+            if record and (accept is None or accept(record)):
+                items.append(record)
+            position = after
+    finally:
+        await resources.aclose()
+    
+    return ResultPage(items, None if exhausted else encode_cursor(position, resource_type, params), partial)
+
+async def page_medical_records_async(hospital_id: Optional[str] = None, patient_id: Optional[str] = None,
+                                     limit: int = 50, cursor: Optional[str] = None) -> ResultPage:
+    """Get a page of medical records (Encounters) from FHIR server"""
+    params = {"_count": limit}
+    if patient_id:
+        params["subject"] = f"Patient/{patient_id}"
+    if hospital_id:
+        params["service-provider"] = f"Organization/{hospital_id}"
+    return await _page_search_async("Encounter", params, fhir_encounter_to_record, limit, cursor)
+
+async def page_insurance_claims_async(hospital_id: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None,
+                                      fields: Optional[Iterable[str]] = None) -> ResultPage:
+    """
+    Get a page of insurance claims (FHIR Claim resources) with patient and hospital names filled in
+    
+    fields limits the claim fields computed and returned (names are only looked
+    up when requested).
+    """
+    fields = None if fields is None else list(fields)
+    # The hospital filter and the name lookups need the IDs even when they aren't returned
+    needed = None if fields is None else list(dict.fromkeys(fields + ["patientId", "hospitalId"]))
+    mapper = _projector(InsuranceClaimView, needed)
+    params = {"_count": limit}
+    if hospital_id:
+        params["provider"] = f"Organization/{hospital_id}"
+    accept = (lambda claim: claim.get("hospitalId") == hospital_id) if hospital_id else None
+    page = await _page_search_async("Claim", params, mapper, limit, cursor, accept=accept)
+    if fields is None:
+        await _enrich_claims_async(page.items)
+        return page
+    if "patientName" in fields or "hospitalName" in fields:
+        await _enrich_claims_async(page.items)
+    return page._replace(items=[{field: claim[field] for field in fields} for claim in page.items])
+
+async def page_coverage_rules_async(hospital_id: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None) -> ResultPage:
+    """Get a page of insurance coverage rules (FHIR Coverage resources), or the synced local copy"""
+    store = _local("Coverage")
+    offset = decode_offset_cursor(cursor)
+    if store and offset is not None:
+        return _local_page(store, "Coverage", limit, offset)
+    if offset:
+        raise InvalidCursor("Cursor is for the local store, which is not in use")
+    params = {"_count": limit, "_elements": ",".join(elements_for("Coverage", COVERAGE_RULE_FIELDS))}
+    return await _page_search_async("Coverage", params, fhir_coverage_to_coverage_rule, limit, cursor)
+
+async def get_coverage_rules_async(hospital_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+    """Get insurance coverage rules (FHIR Coverage resources) from FHIR server, or the synced local copy"""
+    return (await page_coverage_rules_async(hospital_id, limit)).items
+
+async def page_medical_history_async(patient_id: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None,
+                                     fields: Optional[Iterable[str]] = None) -> ResultPage:
+    """Get a page of medical history (FHIR Condition resources) from FHIR server, computing only fields if given"""
+    mapper = _projector(MedicalHistoryView, fields)
+    params = {"_count": limit}
+    if patient_id:
+        params["subject"] = f"Patient/{patient_id}"
+    return await _page_search_async("Condition", params, mapper, limit, cursor)
+
+async def get_medical_history_async(patient_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+    """Get medical history (FHIR Condition resources) from FHIR server"""
+    return (await page_medical_history_async(patient_id, limit)).items
+
+async def page_patient_visits_async(patient_id: Optional[str] = None, limit: int = 20, cursor: Optional[str] = None,
+                                    fields: Optional[Iterable[str]] = None) -> ResultPage:
+    """Get a page of patient visits (FHIR Encounter resources) from FHIR server, computing only fields if given"""
+    mapper = _projector(VisitView, fields)
+    params = {"_count": limit}
+    if patient_id:
+        params["subject"] = f"Patient/{patient_id}"
+    return await _page_search_async("Encounter", params, mapper, limit, cursor)
+
+async def get_patient_visits_async(patient_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+    """Get patient visits (FHIR Encounter resources) from FHIR server"""
+    return (await page_patient_visits_async(patient_id, limit)).items
+
+async def search_federated_async(resource_type: str, params: Optional[Dict] = None, fields: Optional[Iterable[str]] = None,
+                                 deadline: Optional[float] = None) -> Dict:
+    """
+    Search every FHIR_FEDERATION_SERVERS server at once and map the merged results
+    
+    Args:
+        resource_type: FHIR resource type with a mapper in fhir_mapper.MAPPERS
+        params: Search parameters sent to every server
+        fields: Mapper fields needed (limits the elements fetched)
+        deadline: Per-server seconds before a slow server is left out
+    
+    Returns:
+        Dictionary with mapped "results" (each carrying the "sources" it came
+        from), per-server "sources" status and "partial"
+    """
+    mapper = MAPPERS[resource_type]
+    federated = await get_federated_client().search(resource_type, params, elements=elements_for(resource_type, fields), deadline=deadline)
+    results = []
+    for fhir_resource in federated["resources"]:
+        record = _map_one(fhir_resource, mapper, resource_type)
+        if record:
+            record["sources"] = resource_sources(fhir_resource)
+            results.append(record)
+    return {"results": results, "sources": federated["sources"], "partial": federated["partial"]}
+
+async def _search_mapped_async(resource_type: str, params: Dict, mapper, limit: int) -> List[Dict]:
+    """One search page mapped with mapper (errors yield [] like the other list reads)"""
+    client = get_fhir_client(asynchronous=True)
+    return _map_resources(await client.search(resource_type, params=params), mapper, resource_type, limit=limit)
+
+async def _patient_summary_sections(patient_id: str, limit: int) -> Tuple[Dict, List[str]]:
+    """
+    Run the summary's queries concurrently until they finish or the request
+    budget runs out: (results by section, sections missing)
+    
+    Queries still running at the deadline are cancelled. That is safe for the
+    reads and searches coalesced with other requests' (see SingleFlight): the
+    shared calls carry on for the requests still waiting on them.
+    """
+    subject = f"Patient/{patient_id}"
+    count = min(limit, 50)
+    queries = {
+        "patient": _read_patient_async(patient_id),
+        "encounters": get_fhir_client(asynchronous=True).search("Encounter", params={"subject": subject, "_count": count}),
+        "medical_history": _search_mapped_async("Condition", {"subject": subject, "_count": count}, fhir_condition_to_medical_history, limit),
+        "claims": _search_mapped_async("Claim", {"patient": subject, "_count": count}, fhir_claim_to_insurance_claim, limit),
+        "coverage": _search_mapped_async("Coverage", {"beneficiary": subject, "_count": count}, fhir_coverage_to_coverage_rule, limit)
+    }
+    tasks = {name: asyncio.ensure_future(query) for name, query in queries.items()}
+    await asyncio.wait(tasks.values(), timeout=max(remaining(), 0))
+    
+    results, missing = {}, []
+    for name, task in tasks.items():
+        if not task.done():
+            task.cancel()
+            missing.append(name)
+        elif task.exception() is not None:
+            print(f"Error fetching patient summary {name} from FHIR: {task.exception()}")
+            missing.append(name)
+        else:
+            results[name] = task.result()
+    
+    return results, missing
+
+async def get_patient_summary_async(patient_id: str, deadline: float = FHIR_SUMMARY_DEADLINE, limit: int = 20) -> Optional[Dict]:
+    """
+    Gather everything the patient view shows in one concurrent fan-out
+    
+    The Patient read and the Encounter, Condition, Claim and Coverage searches
+    run at the same time under one request budget (see fhir_deadline), so the
+    summary costs the slowest query rather than the sum of them and no query
+    waits on the server past it. Sections still running at the deadline, or
+    that failed (the patient read included), are left empty and listed in
+    "missing".
+    
+    Args:
+        patient_id: FHIR Patient ID
+        deadline: Seconds the whole fan-out may take (within any enclosing budget)
+        limit: Maximum entries per list section
+    
+    Returns:
+        Summary payload, or None if the patient does not exist
+    """
+    with request_budget(deadline):
+        results, missing = await _patient_summary_sections(patient_id, limit)
+    
+    patient = results.get("patient")
+    if patient is None and "patient" not in missing:
+        return None
+    
+    # Visits and records are two views of the same Encounter search
+    encounters = results.get("encounters", [])
+    if "encounters" in missing:
+        missing = [name for name in missing if name != "encounters"] + ["visits", "records"]
+    claims = results.get("claims", [])
+    store = _local("Organization")
+    hospitals = {}
+    if store:
+        hospitals = {hospital_id: store.get("Organization", hospital_id) for hospital_id in _claim_lookup_ids(claims)[1]}
+    _apply_claim_names(claims, {patient_id: patient} if patient else {}, {k: v for k, v in hospitals.items() if v})
+    
+    return {
+        "patient": patient,
+        "visits": _map_resources(encounters, fhir_encounter_to_visit, "Encounter", limit=limit),
+        "records": _map_resources(encounters, fhir_encounter_to_record, "Encounter", limit=limit),
+        "medical_history": results.get("medical_history", []),
+        "claims": claims,
+        "coverage": results.get("coverage", []),
+        "partial": bool(missing),
+        "missing": missing
+    }
+
+async def create_many_async(resource_type: str, records: Iterable[Mapping]) -> List[Optional[Dict]]:
+    """Create many records of one resource type on the FHIR server (see create_many)"""
+    records = [dict(record) for record in records]
+    client = get_fhir_client(asynchronous=True)
+    results = await client.transaction(_create_entries(resource_type, records))
+    _cache.invalidate(resource_type)
+    return _created(records, results)
+
+async def update_many_async(resource_type: str, changes: Mapping[str, Mapping]) -> List[Optional[Dict]]:
+    """Update many records of one resource type on the FHIR server (see update_many)"""
+    client = get_fhir_client(asynchronous=True)
+    current = await client.batch_read([f"{resource_type}/{resource_id}" for resource_id in changes])
+    records, entries = [], []
+    for resource_id, fields in changes.items():
+        record, entry = _update_entry(resource_type, resource_id, current.get(f"{resource_type}/{resource_id}"), fields)
+        records.append(record)
+        if entry:
+            entries.append(entry)
+    _cache.invalidate(resource_type)
+    results = await client.transaction(entries) if entries else []
+    _cache.invalidate(resource_type)
+    return _updated(records, results)
@@ -0,0 +1,60 @@
+"""
+FHIR Deadline - per-request time budget shared by every FHIR call it makes
+A router opens a budget with request_budget(); the FHIR clients clamp their
+timeouts to what is left of it, so a slow upstream call can only use up the
+request's own budget rather than its full 20s timeout.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# time.monotonic() instant the current request's budget runs out (None: no budget)
+_deadline: ContextVar[Optional[float]] = ContextVar("fhir_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of sending a FHIR request once the request's budget is spent"""
+
+
+@contextmanager
+def request_budget(seconds: float):
+    """
+    Limit every FHIR call made inside the block (including in tasks it spawns) to seconds in total
+    
+    A nested budget can only shorten the enclosing one.
+    """
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left in the current budget (None when no budget is set)"""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def clamp_timeout(timeout: Optional[float]) -> Optional[float]:
+    """
+    Shorten a request timeout to the budget left
+    
+    Raises:
+        DeadlineExceeded if the budget is already spent
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("FHIR request budget exhausted")
+    return left if timeout is None else min(timeout, left)
+
+
+def within_budget(seconds: float) -> float:
+    """Cap a wait (e.g. a retry backoff) at the budget left"""
+    left = remaining()
+    return seconds if left is None else max(0.0, min(seconds, left))
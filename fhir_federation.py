@@ -0,0 +1,164 @@
+"""
+FHIR Federation - Concurrent search across several FHIR servers
+Each configured server is searched at the same time under its own deadline, so
+a federated search takes as long as the slowest server within the deadline
+rather than the sum of all of them. Results are merged, de-duplicated by
+business identifier and tagged with the server(s) they came from.
+"""
+import asyncio
+import copy
+import time
+from typing import List, Dict, Optional, Any, Tuple
+from backend.app.config import FHIR_FEDERATION_SERVERS, FHIR_FEDERATION_DEADLINE
+from backend.app.services.fhir_client import AsyncFHIRClient
+
+# meta.tag system marking which federated server a resource came from
+SOURCE_TAG_SYSTEM = "urn:intent-healthcare:fhir-source"
+
+def _identifier_keys(resource: Dict) -> List[Tuple[str, str]]:
+    """
+    (system, value) pairs that identify the same real-world resource on any server
+    
+    Identifiers without a system are skipped: a bare value such as an MRN
+    "12345" is only unique within the server that assigned it.
+    """
+    return [
+        (identifier["system"], identifier["value"])
+        for identifier in resource.get("identifier", [])
+        if identifier.get("system") and identifier.get("value")
+    ]
+
+def resource_sources(resource: Dict) -> List[str]:
+    """Names of the federated servers a resource was returned by"""
+    return [tag["code"] for tag in resource.get("meta", {}).get("tag", []) if tag.get("system") == SOURCE_TAG_SYSTEM]
+
+def _tag_source(resource: Dict, source: str) -> Dict:
+    """Copy a resource with a source tag added (cached results are shared, so never tag in place)"""
+    tagged = copy.copy(resource)
+    meta = dict(tagged.get("meta") or {})
+    meta["tag"] = list(meta.get("tag", [])) + [{"system": SOURCE_TAG_SYSTEM, "code": source}]
+    tagged["meta"] = meta
+    return tagged
+
+def merge_results(results: List[Tuple[str, List[Dict]]]) -> List[Dict]:
+    """
+    Merge per-server search results, keeping one copy of each resource
+    
+    Resources sharing any identifier (system + value) are the same resource
+    held by several servers; the first server's copy is kept and tagged with
+    every server that returned it. Resources without an identifier that has a
+    system cannot be matched across servers, so they are all kept, each tagged
+    with the one server it came from.
+    
+    Args:
+        results: (server name, resources) pairs in server priority order
+    """
+    merged: List[Dict] = []
+    by_identifier: Dict[Tuple[str, str], Dict] = {}
+    for source, resources in results:
+        for resource in resources:
+            keys = _identifier_keys(resource)
+            existing = next((by_identifier[key] for key in keys if key in by_identifier), None)
+            if existing is not None:
+                if source not in resource_sources(existing):
+                    existing["meta"]["tag"].append({"system": SOURCE_TAG_SYSTEM, "code": source})
+                for key in keys:
+                    by_identifier.setdefault(key, existing)
+                continue
+            tagged = _tag_source(resource, source)
+            merged.append(tagged)
+            for key in keys:
+                by_identifier[key] = tagged
+    return merged
+
+class FederatedFHIRClient:
+    """Searches a set of named FHIR servers concurrently, tolerating slow or failing ones"""
+    
+    def __init__(self, servers: Dict[str, str] = None, deadline: float = FHIR_FEDERATION_DEADLINE):
+        """
+        Initialize federated client
+        
+        Args:
+            servers: Server name -> FHIR base URL, in priority order for de-duplication
+                (defaults to FHIR_FEDERATION_SERVERS)
+            deadline: Seconds each server gets before it is reported as timed out
+        """
+        self.servers = dict(servers or FHIR_FEDERATION_SERVERS)
+        self.deadline = deadline
+        self.clients = {name: AsyncFHIRClient(base_url) for name, base_url in self.servers.items()}
+    
+    async def _search_one(self, name: str, resource_type: str, params: Optional[Dict[str, Any]],
+                          elements: Optional[List[str]], deadline: float) -> Tuple[List[Dict], Dict]:
+        """Search one server, returning its resources and a status that never raises"""
+        started = time.monotonic()
+        resources: List[Dict] = []
+        try:
+            resources = await asyncio.wait_for(
+                self.clients[name].search_page(resource_type, params, elements=elements), timeout=deadline
+            )
+            status = {"status": "ok"}
+        except asyncio.TimeoutError:
+            status = {"status": "timeout", "error": f"No response within {deadline:.1f}s"}
+        except Exception as e:
+            print(f"FHIR federated search error on {name}: {e}")
+            status = {"status": "error", "error": str(e)}
+        status["count"] = len(resources)
+        status["elapsed_ms"] = round((time.monotonic() - started) * 1000, 1)
+        return resources, status
+    
+    async def search(
+        self,
+        resource_type: str,
+        params: Dict[str, Any] = None,
+        elements: List[str] = None,
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Search every server concurrently and merge the results
+        
+        Args:
+            resource_type: FHIR resource type
+            params: Search parameters, sent unchanged to every server
+            elements: Only return these top-level elements (_elements; identifier is always kept)
+            deadline: Per-server seconds for this call (defaults to the client's deadline)
+        
+        Returns:
+            Dictionary with the merged, source-tagged "resources", per-server
+            "sources" status (ok/timeout/error, count, elapsed_ms) and "partial",
+            which is True when any server's results are missing
+        """
+        deadline = self.deadline if deadline is None else deadline
+        if elements and "identifier" not in elements:
+            # De-duplication needs the identifiers even when the caller projects them away
+            elements = list(elements) + ["identifier"]
+        names = list(self.clients)
+        outcomes = await asyncio.gather(*(
+            self._search_one(name, resource_type, params, elements, deadline) for name in names
+        ))
+        sources = {name: status for name, (_, status) in zip(names, outcomes)}
+        return {
+            "resources": merge_results([(name, resources) for name, (resources, _) in zip(names, outcomes)]),
+            "sources": sources,
+            "partial": any(status["status"] != "ok" for status in sources.values())
+        }
+    
+    async def aclose(self):
+        """Close every server's pooled connections"""
+        await asyncio.gather(*(client.aclose() for client in self.clients.values()))
+
+# Global federated client instance
+_federated_client: Optional[FederatedFHIRClient] = None
+
+def get_federated_client() -> FederatedFHIRClient:
+    """Get or create the federated client for FHIR_FEDERATION_SERVERS"""
+    global _federated_client
+    if _federated_client is None:
+        _federated_client = FederatedFHIRClient()
+    return _federated_client
+
+async def close_federated_client():
+    """Release pooled connections held by the federated client"""
+    global _federated_client
+    if _federated_client is not None:
+        await _federated_client.aclose()
+        _federated_client = None
@@ -0,0 +1,220 @@
+"""
+FHIR JSON - pluggable JSON decoding and incremental Bundle parsing
+Uses orjson when it is installed (several times faster than the stdlib on
+large Bundles) and falls back to the json module otherwise.
+"""
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Optional
+from backend.app.config import FHIR_JSON_BACKEND
+
+# Try to import orjson, but fall back to the stdlib if not installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+    orjson = None
+
+if ORJSON_AVAILABLE and FHIR_JSON_BACKEND in ("auto", "orjson"):
+    JSON_BACKEND = "orjson"
+    
+    def loads(data: Any) -> Any:
+        """Decode JSON from bytes/str"""
+        return orjson.loads(data)
+    
+    def dumps(data: Any) -> bytes:
+        """Encode JSON to UTF-8 bytes"""
+        return orjson.dumps(data)
+else:
+    JSON_BACKEND = "json"
+    
+    def loads(data: Any) -> Any:
+        """Decode JSON from bytes/str"""
+        return json.loads(data)
+    
+    def dumps(data: Any) -> bytes:
+        """Encode JSON to UTF-8 bytes"""
+        return json.dumps(data, separators=(",", ":")).encode()
+
+
+_WHITESPACE = b" \t\r\n"
+# Structural bytes inside a JSON value, and the bytes that matter inside a string
+_STRUCTURAL = re.compile(rb'["{}\[\]]')
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_SCALAR_END = re.compile(rb'[,}\]\s]')
+# Compact the buffer once this many bytes have been consumed
+_COMPACT_AT = 1 << 16
+
+
+class BundleStreamParser:
+    """
+    Incremental parser for a FHIR Bundle
+    
+    Feed it the response body chunk by chunk; each call returns the entry[]
+    objects completed so far. Only the entry being parsed is buffered, so the
+    full Bundle is never held in memory. Other top-level fields (link, total,
+    type, ...) are decoded into meta as they arrive.
+    """
+    
+    def __init__(self):
+        self.meta: Dict[str, Any] = {}
+        self._buf = bytearray()
+        self._pos = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        # Resumable scan of the current value: next index to inspect, nesting depth, inside-string flag
+        self._scan: Optional[list] = None
+    
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+    
+    def feed(self, chunk: bytes) -> list:
+        """Add a chunk of the body, returning any entries it completed"""
+        self._buf += chunk
+        entries = list(self._parse(final=False))
+        if self._pos >= _COMPACT_AT:
+            del self._buf[:self._pos]
+            if self._scan is not None:
+                self._scan[0] -= self._pos
+            self._pos = 0
+        return entries
+    
+    def close(self) -> list:
+        """Signal the end of the body, returning any remaining entries"""
+        entries = list(self._parse(final=True))
+        if self._state != "done":
+            raise ValueError("Truncated FHIR Bundle")
+        return entries
+    
+    def _skip_whitespace(self):
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+    
+    def _value_end(self, final: bool) -> Optional[int]:
+        """End index of the JSON value starting at _pos, or None if it is not complete yet"""
+        buf, start = self._buf, self._pos
+        first = buf[start]
+        
+        if first not in b'{["':
+            match = _SCALAR_END.search(buf, start)
+            if match:
+                return match.start()
+            return len(buf) if final else None
+        
+        if self._scan is None:
+            self._scan = [start, 0, False]
+        i, depth, in_string = self._scan
+        
+        while True:
+            if in_string:
+                match = _STRING_SPECIAL.search(buf, i)
+                if not match:
+                    break
+                i = match.start()
+                if buf[i] == 0x5C:  # backslash escapes the next byte
+                    if i + 1 >= len(buf):
+                        break
+                    i += 2
+                    continue
+                in_string = False
+                i += 1
+                if depth == 0:
+                    self._scan = None
+                    return i
+                continue
+            
+            match = _STRUCTURAL.search(buf, i)
+            if not match:
+                i = len(buf)
+                break
+            i = match.start()
+            char = buf[i]
+            i += 1
+            if char == 0x22:  # "
+                in_string = True
+            elif char in b"{[":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    self._scan = None
+                    return i
+        
+        self._scan = [i, depth, in_string]
+        return None
+    
+    def _parse(self, final: bool) -> Iterator[Dict]:
+        while self._state != "done":
+            self._skip_whitespace()
+            if self._pos >= len(self._buf):
+                return
+            char = self._buf[self._pos]
+            state = self._state
+            
+            if state == "start":
+                if char != 0x7B:  # {
+                    raise ValueError("FHIR Bundle must be a JSON object")
+                self._pos += 1
+                self._state = "key"
+            elif state == "key":
+                if char == 0x2C:  # ,
+                    self._pos += 1
+                elif char == 0x7D:  # }
+                    self._pos += 1
+                    self._state = "done"
+                else:
+                    end = self._value_end(final)
+                    if end is None:
+                        return
+                    self._key = loads(bytes(self._buf[self._pos:end]))
+                    self._pos = end
+                    self._state = "colon"
+            elif state == "colon":
+                if char != 0x3A:  # :
+                    raise ValueError("Malformed FHIR Bundle")
+                self._pos += 1
+                self._state = "entries" if self._key == "entry" else "value"
+            elif state == "entries":
+                # entry is normally an array; stream its items one by one
+                if char == 0x5B:  # [
+                    self._pos += 1
+                    self._state = "entry"
+                else:
+                    self._state = "value"
+            elif state == "entry":
+                if char == 0x2C:
+                    self._pos += 1
+                elif char == 0x5D:  # ]
+                    self._pos += 1
+                    self._state = "key"
+                else:
+                    end = self._value_end(final)
+                    if end is None:
+                        return
+                    entry = loads(bytes(self._buf[self._pos:end]))
+                    self._pos = end
+                    yield entry
+            elif state == "value":
+                end = self._value_end(final)
+                if end is None:
+                    return
+                self.meta[self._key] = loads(bytes(self._buf[self._pos:end]))
+                self._pos = end
+                self._state = "key"
+
+
+def iter_bundle_entries(chunks: Iterable[bytes], parser: Optional[BundleStreamParser] = None) -> Iterator[Dict]:
+    """
+    Yield Bundle entry[] objects as the body streams in
+    
+    Pass a parser to read its meta (e.g. link) while or after iterating.
+    """
+    parser = parser or BundleStreamParser()
+    for chunk in chunks:
+        if chunk:
+            yield from parser.feed(chunk)
+    yield from parser.close()
@@ -1,19 +1,120 @@
 """
-FHIR Resource Mapper - Converts FHIR resources to our application models
+FHIR Resource Mapper - Converts FHIR resources to our application models, and back for writes
 """
-from typing import Dict, List, Optional
+import re
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
+from functools import lru_cache
+from itertools import islice
+from types import MappingProxyType
+from backend.app.services.compact_records import RECORD_TYPES
+from backend.app.services.fhir_paths import NOW, Field, compile_path, compile_spec, date_only, reference_id, spec_elements
 
-def fhir_patient_to_model(fhir_patient: Dict) -> Dict:
+# FHIR top-level elements each mapper output field is built from. Searches that
+# only render some fields send the union as _elements so the server returns a
+# sparse resource; every mapper falls back to its defaults for missing elements.
+MAPPER_ELEMENTS: Dict[str, Dict[str, List[str]]] = {
+    "Patient": {
+        "first_name": ["name"],
+        "last_name": ["name"],
+        "date_of_birth": ["birthDate"],
+        "gender": ["gender"],
+        "email": ["telecom"],
+        "phone": ["telecom"],
+        "address": ["address"],
+        "emergency_contact_name": ["contact"],
+        "emergency_contact_phone": ["contact"]
+    },
+    "Practitioner": {
+        "first_name": ["name"],
+        "last_name": ["name"],
+        "specialization": ["qualification"],
+        "qualification": ["qualification"],
+        "license_number": ["identifier"],
+        "email": ["telecom"],
+        "phone": ["telecom"]
+    },
+    "Organization": {
+        "name": ["name"],
+        "address": ["address"],
+        "city": ["address"],
+        "state": ["address"],
+        "zip_code": ["address"],
+        "phone": ["telecom"],
+        "email": ["telecom"],
+        "emergency_phone": ["telecom"],
+        "hospital_type": ["type"],
+        "specialties": ["type"]
+    },
+    "Coverage": {
+        "subscriberId": ["subscriber"],
+        "beneficiaryId": ["beneficiary"],
+        "insuranceProvider": ["payor", "identifier"],
+        "coverageType": ["type"],
+        "planName": ["class", "payor", "identifier", "type"],
+        "planType": ["class"],
+        "status": ["status"],
+        "startDate": ["period"],
+        "endDate": ["period"],
+        "networkType": ["network"],
+        "copay": ["costToBeneficiary"],
+        "relationship": ["relationship"],
+        "dependentNumber": ["dependent"],
+        "rules": ["text", "type"]
+    }
+}
+
+def elements_for(resource_type: str, fields: Optional[Iterable[str]]) -> Optional[List[str]]:
+    """
+    Get the FHIR elements needed to map the given output fields
+    
+    Args:
+        resource_type: FHIR resource type (must have an entry in MAPPER_ELEMENTS)
+        fields: Mapper output field names, or None for the full resource
+    
+    Returns:
+        Sorted element names for _elements, or None when the full resource is needed
+    """
+    if fields is None:
+        return None
+    field_elements = MAPPER_ELEMENTS[resource_type]
+    elements = set()
+    for field in fields:
+        if field not in field_elements and field != "id":
+            raise ValueError(f"Unknown {resource_type} mapper field: {field}")
+        elements.update(field_elements.get(field, []))
+    return sorted(elements)
+
+# Shared read-only stand-in for a missing FHIR element, so lookups on absent
+# elements don't allocate a fresh {} per record
+_EMPTY = MappingProxyType({})
+# Marks a MappedView field not computed yet (None is a valid field value)
+_UNSET = object()
+
+def _first(items) -> Dict:
+    """First element of a FHIR list, or an empty mapping when it is missing or empty"""
+    return items[0] if items else _EMPTY
+
+def _now(now: Optional[str]) -> str:
+    """The batch's timestamp, or the current time for a single mapping"""
+    return now or datetime.now().isoformat()
+
+@lru_cache(maxsize=4096)
+def _reference_id(reference: str, prefix: str) -> str:
+    """Id from a reference such as Patient/123?x=y (references repeat heavily within a batch)"""
+    return reference.replace(prefix, "").split("?")[0]
+
+def fhir_patient_to_model(fhir_patient: Dict, now: Optional[str] = None) -> Dict:
     """Convert FHIR Patient resource to our Patient model"""
     name = fhir_patient.get("name", [{}])[0] if fhir_patient.get("name") else {}
-    given_names = name.get("given", [])
+    given_names = name.get("given", ())
     family_name = name.get("family", "")
     
     # Extract email and phone from contact points
     email = None
     phone = None
-    for telecom in fhir_patient.get("telecom", []):
+    for telecom in fhir_patient.get("telecom", ()):
         system = telecom.get("system", "")
         value = telecom.get("value", "")
         if system == "email":
@@ -25,7 +126,7 @@ def fhir_patient_to_model(fhir_patient: Dict) -> Dict:
     address = None
     if fhir_patient.get("address"):
         addr = fhir_patient["address"][0]
-        line = ", ".join(addr.get("line", []))
+        line = ", ".join(addr.get("line", ()))
         city = addr.get("city", "")
         state = addr.get("state", "")
         postal = addr.get("postalCode", "")
@@ -34,11 +135,11 @@ def fhir_patient_to_model(fhir_patient: Dict) -> Dict:
     # Extract emergency contact
     emergency_contact_name = None
     emergency_contact_phone = None
-    for contact in fhir_patient.get("contact", []):
-        relationship = contact.get("relationship", [{}])[0]
-        if relationship.get("coding", [{}])[0].get("code") == "C":
-            emergency_contact_name = contact.get("name", {}).get("text", "")
-            for telecom in contact.get("telecom", []):
+    for contact in fhir_patient.get("contact", ()):
+        relationship = _first(contact.get("relationship"))
+        if _first(relationship.get("coding")).get("code") == "C":
+            emergency_contact_name = contact.get("name", _EMPTY).get("text", "")
+            for telecom in contact.get("telecom", ()):
                 if telecom.get("system") == "phone":
                     emergency_contact_phone = telecom.get("value")
                     break
@@ -57,20 +158,20 @@ def fhir_patient_to_model(fhir_patient: Dict) -> Dict:
         "blood_type": None,  # Not typically in FHIR Patient
         "allergies": [],  # Would come from AllergyIntolerance resources
         "medical_history": [],  # Would come from Condition resources
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
+        "created_at": _now(now),
+        "updated_at": _now(now)
     }
 
-def fhir_practitioner_to_doctor(fhir_practitioner: Dict) -> Dict:
+def fhir_practitioner_to_doctor(fhir_practitioner: Dict, now: Optional[str] = None) -> Dict:
     """Convert FHIR Practitioner resource to our Doctor model"""
     name = fhir_practitioner.get("name", [{}])[0] if fhir_practitioner.get("name") else {}
-    given_names = name.get("given", [])
+    given_names = name.get("given", ())
     family_name = name.get("family", "")
     
     # Extract email and phone
     email = None
     phone = None
-    for telecom in fhir_practitioner.get("telecom", []):
+    for telecom in fhir_practitioner.get("telecom", ()):
         system = telecom.get("system", "")
         value = telecom.get("value", "")
         if system == "email":
@@ -83,15 +184,15 @@ def fhir_practitioner_to_doctor(fhir_practitioner: Dict) -> Dict:
     specialization = "General Practice"
     if fhir_practitioner.get("qualification"):
         qual = fhir_practitioner["qualification"][0]
-        qualification_text = qual.get("code", {}).get("text", "")
-        for coding in qual.get("code", {}).get("coding", []):
+        qualification_text = qual.get("code", _EMPTY).get("text", "")
+        for coding in qual.get("code", _EMPTY).get("coding", ()):
             if coding.get("system") == "http://snomed.info/sct":
                 specialization = coding.get("display", specialization)
     
     # Extract identifier (license number)
     license_number = ""
-    for identifier in fhir_practitioner.get("identifier", []):
-        if identifier.get("type", {}).get("coding", [{}])[0].get("code") == "LN":
+    for identifier in fhir_practitioner.get("identifier", ()):
+        if _first(identifier.get("type", _EMPTY).get("coding")).get("code") == "LN":
             license_number = identifier.get("value", "")
     
     return {
@@ -109,11 +210,11 @@ def fhir_practitioner_to_doctor(fhir_practitioner: Dict) -> Dict:
         "languages": [],
         "consultation_fee": None,
         "availability": "Available",
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
+        "created_at": _now(now),
+        "updated_at": _now(now)
     }
 
-def fhir_organization_to_hospital(fhir_org: Dict) -> Dict:
+def fhir_organization_to_hospital(fhir_org: Dict, now: Optional[str] = None) -> Dict:
     """Convert FHIR Organization resource to our Hospital model"""
     name = fhir_org.get("name", "Unknown Hospital")
     
@@ -124,7 +225,7 @@ def fhir_organization_to_hospital(fhir_org: Dict) -> Dict:
     zip_code = ""
     if fhir_org.get("address"):
         addr = fhir_org["address"][0]
-        address = ", ".join(addr.get("line", []))
+        address = ", ".join(addr.get("line", ()))
         city = addr.get("city", "")
         state = addr.get("state", "")
         zip_code = addr.get("postalCode", "")
@@ -133,7 +234,7 @@ def fhir_organization_to_hospital(fhir_org: Dict) -> Dict:
     phone = None
     email = None
     emergency_phone = None
-    for telecom in fhir_org.get("telecom", []):
+    for telecom in fhir_org.get("telecom", ()):
         system = telecom.get("system", "")
         value = telecom.get("value", "")
         use = telecom.get("use", "")
@@ -147,15 +248,15 @@ def fhir_organization_to_hospital(fhir_org: Dict) -> Dict:
     
     # Extract type (hospital type)
     hospital_type = "General"
-    for type_coding in fhir_org.get("type", []):
-        for coding in type_coding.get("coding", []):
+    for type_coding in fhir_org.get("type", ()):
+        for coding in type_coding.get("coding", ()):
             if "hospital" in coding.get("display", "").lower():
                 hospital_type = coding.get("display", hospital_type)
     
     # Extract specialties from extension or type
     specialties = []
-    for type_coding in fhir_org.get("type", []):
-        for coding in type_coding.get("coding", []):
+    for type_coding in fhir_org.get("type", ()):
+        for coding in type_coding.get("coding", ()):
             display = coding.get("display", "")
             if display and display not in specialties:
                 specialties.append(display)
@@ -178,326 +279,490 @@ def fhir_organization_to_hospital(fhir_org: Dict) -> Dict:
         "facilities": [],  # Would come from Location resources
         "operating_hours": None,
         "website": None,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
+        "created_at": _now(now),
+        "updated_at": _now(now)
     }
 
-def fhir_encounter_to_record(fhir_encounter: Dict) -> Dict:
-    """Convert FHIR Encounter resource to our Medical Record model"""
-    return {
-        "id": fhir_encounter.get("id"),
-        "patient_id": fhir_encounter.get("subject", {}).get("reference", "").replace("Patient/", ""),
-        "patient_name": None,  # Would need to fetch Patient resource
-        "encounter_type": fhir_encounter.get("class", {}).get("display", "Unknown"),
-        "status": fhir_encounter.get("status", "unknown"),
-        "timestamp": fhir_encounter.get("period", {}).get("start", datetime.now().isoformat()),
-        "hospital_id": fhir_encounter.get("serviceProvider", {}).get("reference", "").replace("Organization/", "")
-    }
+def mapped_field(name: str):
+    """Mark a MappedView method as computing the output field name"""
+    def register(method):
+        method.mapped_field = name
+        return method
+    return register
 
-def fhir_encounter_to_visit(fhir_encounter: Dict) -> Dict:
-    """Convert FHIR Encounter resource to our Visit model"""
-    encounter_id = fhir_encounter.get("id", "")
+class MappedView(Mapping):
+    """
+    Read-only mapped record computed field by field from a FHIR resource
     
-    # Extract patient reference
-    subject_ref = fhir_encounter.get("subject", {}).get("reference", "")
-    patient_id = subject_ref.replace("Patient/", "").split("?")[0] if subject_ref else None
+    Each output field is computed by a @mapped_field method on first access and
+    memoized, so serializing a few fields never pays for the rest. Methods read
+    other fields (or "_"-prefixed helper values, which are never output) through
+    self[...] to share intermediate work.
+    """
+    __slots__ = ("resource", "now", "_values")
     
-    # Extract encounter type/class
-    encounter_class = fhir_encounter.get("class", {})
-    encounter_type = encounter_class.get("display", encounter_class.get("code", "Unknown"))
-    encounter_code = encounter_class.get("code", None)
+    # Output field names in output order, and the method computing each field or helper value
+    FIELDS: Tuple[str, ...] = ()
+    _computers: Dict[str, Callable] = {}
+    # (field, method) pairs of the output fields, in output order
+    _output: Tuple[Tuple[str, Callable], ...] = ()
     
-    # Extract status
-    status = fhir_encounter.get("status", "unknown").title()
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        computers = dict(cls._computers)
+        for attribute in vars(cls).values():
+            name = getattr(attribute, "mapped_field", None)
+            if name:
+                computers[name] = attribute
+        cls._computers = computers
+        cls.FIELDS = tuple(name for name in computers if not name.startswith("_"))
+        cls._output = tuple((name, computers[name]) for name in cls.FIELDS)
     
-    # Extract period (visit dates)
-    period = fhir_encounter.get("period", {})
-    start_date = period.get("start", datetime.now().isoformat())
-    end_date = period.get("end", None)
-    duration_minutes = None
-    if start_date and end_date:
-        try:
-            start = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
-            end = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
-            duration_minutes = int((end - start).total_seconds() / 60)
-        except:
-            pass
-    
-    # Extract service provider (hospital)
-    service_provider_ref = fhir_encounter.get("serviceProvider", {}).get("reference", "")
-    hospital_id = service_provider_ref.replace("Organization/", "").split("?")[0] if service_provider_ref else None
-    
-    # Extract location
-    location_name = None
-    locations = fhir_encounter.get("location", [])
-    if locations:
-        location_obj = locations[0] if isinstance(locations[0], dict) else {}
-        location_ref = location_obj.get("location", {}).get("reference", "")
-        if location_ref:
-            location_name = location_ref.replace("Location/", "").split("?")[0]
-    
-    # Extract reason (chief complaint)
-    reason_text = None
-    reason_coding = fhir_encounter.get("reasonCode", [{}])[0].get("coding", [])
-    if reason_coding:
-        reason_text = reason_coding[0].get("display", reason_coding[0].get("code", None))
-    
-    # Extract diagnosis
-    diagnoses = []
-    for diagnosis in fhir_encounter.get("diagnosis", []):
-        condition_ref = diagnosis.get("condition", {}).get("reference", "")
-        if condition_ref:
-            diagnoses.append(condition_ref.replace("Condition/", "").split("?")[0])
-    
-    # Extract participants (doctors/staff)
-    participants = []
-    for participant in fhir_encounter.get("participant", []):
-        participant_type = participant.get("type", [{}])[0].get("coding", [{}])[0].get("code", "")
-        participant_ref = participant.get("individual", {}).get("reference", "")
-        if participant_ref:
-            participants.append({
-                "type": participant_type,
-                "reference": participant_ref.replace("Practitioner/", "").split("?")[0]
-            })
+    def __init__(self, resource: Dict, now: Optional[str] = None):
+        self.resource = resource
+        self.now = now
+        self._values: Dict[str, Any] = {}
     
-    return {
-        "id": encounter_id,
-        "patientId": patient_id or "",
-        "patientName": None,  # Will be enriched by service
-        "encounterType": encounter_type,
-        "encounterCode": encounter_code,
-        "status": status,
-        "startDate": start_date.split("T")[0] if "T" in start_date else start_date,
-        "startTime": start_date.split("T")[1].split(".")[0] if "T" in start_date and len(start_date.split("T")) > 1 else None,
-        "endDate": end_date.split("T")[0] if end_date and "T" in end_date else (end_date or None),
-        "endTime": end_date.split("T")[1].split(".")[0] if end_date and "T" in end_date and len(end_date.split("T")) > 1 else None,
-        "durationMinutes": duration_minutes,
-        "hospitalId": hospital_id or "",
-        "hospitalName": None,  # Will be enriched by service
-        "location": location_name,
-        "reason": reason_text,
-        "diagnoses": diagnoses,
-        "participants": participants
-    }
+    def __getitem__(self, field: str) -> Any:
+        # Every field misses once, and raising KeyError costs more than computing most fields
+        value = self._values.get(field, _UNSET)
+        if value is _UNSET:
+            computer = self._computers.get(field)
+            if computer is None:
+                raise KeyError(field)
+            value = self._values[field] = computer(self)
+        return value
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.FIELDS)
+    
+    def __len__(self) -> int:
+        return len(self.FIELDS)
+    
+    @classmethod
+    def check_fields(cls, fields: Iterable[str]) -> List[str]:
+        """
+        Validate requested output fields
+        
+        Raises:
+            ValueError naming the first unknown field
+        """
+        fields = list(fields)
+        for field in fields:
+            if field not in cls.FIELDS:
+                raise ValueError(f"Unknown field: {field}")
+        return fields
+    
+    def to_dict(self) -> Dict:
+        """Every output field"""
+        values = self._values
+        for field, computer in self._output:
+            if field not in values:
+                values[field] = computer(self)
+        return {field: values[field] for field in self.FIELDS}
+    
+    def project(self, fields: Optional[Iterable[str]] = None) -> Dict:
+        """Only the given output fields (all of them when fields is None)"""
+        if fields is None:
+            return self.to_dict()
+        return {field: self[field] for field in fields}
 
-def fhir_condition_to_medical_history(fhir_condition: Dict) -> Dict:
-    """Convert FHIR Condition resource to our Medical History model"""
-    condition_id = fhir_condition.get("id", "")
+def _date_part(value: Optional[str]) -> Optional[str]:
+    return value.split("T")[0] if value and "T" in value else value
+
+def _time_part(value: Optional[str]) -> Optional[str]:
+    return value.split("T")[1].split(".")[0] if value and "T" in value else None
+
+class VisitView(MappedView):
+    """Visit model over a FHIR Encounter resource"""
+    __slots__ = ()
+    
+    @mapped_field("_period")
+    def period(self):
+        return self.resource.get("period", _EMPTY)
+    
+    @mapped_field("_start")
+    def start(self):
+        return self["_period"].get("start") or _now(self.now)
+    
+    @mapped_field("_end")
+    def end(self):
+        return self["_period"].get("end", None)
+    
+    @mapped_field("_class")
+    def encounter_class(self):
+        return self.resource.get("class", _EMPTY)
+    
+    @mapped_field("id")
+    def id(self):
+        return self.resource.get("id", "")
+    
+    @mapped_field("patientId")
+    def patient_id(self):
+        subject_ref = self.resource.get("subject", _EMPTY).get("reference", "")
+        return _reference_id(subject_ref, "Patient/") if subject_ref else ""
+    
+    @mapped_field("patientName")
+    def patient_name(self):
+        return None  # Will be enriched by service
+    
+    @mapped_field("encounterType")
+    def encounter_type(self):
+        encounter_class = self["_class"]
+        return encounter_class.get("display", encounter_class.get("code", "Unknown"))
+    
+    @mapped_field("encounterCode")
+    def encounter_code(self):
+        return self["_class"].get("code", None)
+    
+    @mapped_field("status")
+    def status(self):
+        return self.resource.get("status", "unknown").title()
     
-    # Extract patient reference
-    subject_ref = fhir_condition.get("subject", {}).get("reference", "")
-    patient_id = subject_ref.replace("Patient/", "").split("?")[0] if subject_ref else None
+    @mapped_field("startDate")
+    def start_date(self):
+        return _date_part(self["_start"])
     
-    # Extract condition/diagnosis
-    condition_text = "Unknown Condition"
-    condition_code = None
-    coding_list = fhir_condition.get("code", {}).get("coding", [])
+    @mapped_field("startTime")
+    def start_time(self):
+        return _time_part(self["_start"])
+    
+    @mapped_field("endDate")
+    def end_date(self):
+        return _date_part(self["_end"]) or None
+    
+    @mapped_field("endTime")
+    def end_time(self):
+        return _time_part(self["_end"])
+    
+    @mapped_field("durationMinutes")
+    def duration_minutes(self):
+        start_date, end_date = self["_start"], self["_end"]
+        if start_date and end_date:
+            try:
+                start = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
+                end = datetime.fromisoformat(end_date.replace("Z", "+00:00"))
+                return int((end - start).total_seconds() / 60)
+            except:
+                pass
+        return None
+    
+    @mapped_field("hospitalId")
+    def hospital_id(self):
+        service_provider_ref = self.resource.get("serviceProvider", _EMPTY).get("reference", "")
+        return _reference_id(service_provider_ref, "Organization/") if service_provider_ref else ""
+    
+    @mapped_field("hospitalName")
+    def hospital_name(self):
+        return None  # Will be enriched by service
+    
+    @mapped_field("location")
+    def location(self):
+        locations = self.resource.get("location", ())
+        if locations:
+            location_obj = locations[0] if isinstance(locations[0], dict) else _EMPTY
+            location_ref = location_obj.get("location", _EMPTY).get("reference", "")
+            if location_ref:
+                return _reference_id(location_ref, "Location/")
+        return None
+    
+    @mapped_field("reason")
+    def reason(self):
+        reason_coding = _first(self.resource.get("reasonCode")).get("coding", ())
+        if reason_coding:
+            return reason_coding[0].get("display", reason_coding[0].get("code", None))
+        return None
+    
+    @mapped_field("diagnoses")
+    def diagnoses(self):
+        diagnoses = []
+        for diagnosis in self.resource.get("diagnosis", ()):
+            condition_ref = diagnosis.get("condition", _EMPTY).get("reference", "")
+            if condition_ref:
+                diagnoses.append(_reference_id(condition_ref, "Condition/"))
+        return diagnoses
+    
+    @mapped_field("participants")
+    def participants(self):
+        participants = []
+        for participant in self.resource.get("participant", ()):
+            participant_type = _first(_first(participant.get("type")).get("coding")).get("code", "")
+            participant_ref = participant.get("individual", _EMPTY).get("reference", "")
+            if participant_ref:
+                participants.append({
+                    "type": participant_type,
+                    "reference": _reference_id(participant_ref, "Practitioner/")
+                })
+        return participants
+
+def fhir_encounter_to_visit(fhir_encounter: Dict, now: Optional[str] = None) -> Dict:
+    """Convert FHIR Encounter resource to our Visit model"""
+    return VisitView(fhir_encounter, now).to_dict()
+
+def _coding_text(coding_list, default):
+    """Display (or code) of the first coding, or default"""
     if coding_list:
-        condition_text = coding_list[0].get("display", coding_list[0].get("code", condition_text))
-        condition_code = coding_list[0].get("code", None)
-    
-    # Extract category
-    category = "Diagnosis"
-    category_coding = fhir_condition.get("category", [{}])[0].get("coding", [])
-    if category_coding:
-        category = category_coding[0].get("display", category_coding[0].get("code", category))
-    
-    # Extract severity
-    severity = None
-    severity_coding = fhir_condition.get("severity", {}).get("coding", [])
-    if severity_coding:
-        severity = severity_coding[0].get("display", severity_coding[0].get("code", None))
-    
-    # Extract clinical status
-    clinical_status = fhir_condition.get("clinicalStatus", {}).get("coding", [{}])[0].get("code", "active")
-    
-    # Extract verification status
-    verification_status = fhir_condition.get("verificationStatus", {}).get("coding", [{}])[0].get("code", "confirmed")
-    
-    # Extract onset date
-    onset_date = None
-    onset_datetime = fhir_condition.get("onsetDateTime")
-    if onset_datetime:
-        onset_date = onset_datetime
-    elif fhir_condition.get("onsetPeriod"):
-        onset_date = fhir_condition["onsetPeriod"].get("start", None)
-    elif fhir_condition.get("onsetAge"):
-        # Calculate approximate date from age
-        onset_date = datetime.now().isoformat()
-    
-    # Extract abatement date (when condition resolved)
-    abatement_date = None
-    abatement_datetime = fhir_condition.get("abatementDateTime")
-    if abatement_datetime:
-        abatement_date = abatement_datetime
-    elif fhir_condition.get("abatementPeriod"):
-        abatement_date = fhir_condition["abatementPeriod"].get("end", None)
-    
-    # Extract encounter reference (related visit)
-    encounter_id = None
-    encounter_refs = fhir_condition.get("encounter", [])
-    if encounter_refs:
-        encounter_ref = encounter_refs[0] if isinstance(encounter_refs[0], str) else encounter_refs[0].get("reference", "")
-        if encounter_ref:
-            encounter_id = encounter_ref.replace("Encounter/", "").split("?")[0]
-    
-    # Extract body site
-    body_site = None
-    body_site_coding = fhir_condition.get("bodySite", [{}])[0].get("coding", [])
-    if body_site_coding:
-        body_site = body_site_coding[0].get("display", body_site_coding[0].get("code", None))
-    
-    # Extract notes
-    notes = []
-    for note in fhir_condition.get("note", []):
-        note_text = note.get("text", "")
-        if note_text:
-            notes.append(note_text)
+        return coding_list[0].get("display", coding_list[0].get("code", default))
+    return default
+
+class MedicalHistoryView(MappedView):
+    """Medical History model over a FHIR Condition resource"""
+    __slots__ = ()
     
-    return {
-        "id": condition_id,
-        "patientId": patient_id or "",
-        "patientName": None,  # Will be enriched by service
-        "condition": condition_text,
-        "conditionCode": condition_code,
-        "category": category,
-        "severity": severity,
-        "clinicalStatus": clinical_status.title(),
-        "verificationStatus": verification_status.title(),
-        "onsetDate": onset_date.split("T")[0] if onset_date and "T" in onset_date else (onset_date or "Unknown"),
-        "abatementDate": abatement_date.split("T")[0] if abatement_date and "T" in abatement_date else (abatement_date or None),
-        "encounterId": encounter_id,
-        "bodySite": body_site,
-        "notes": notes,
-        "recordedDate": fhir_condition.get("recordedDate", datetime.now().isoformat()).split("T")[0] if fhir_condition.get("recordedDate") else None
-    }
+    @mapped_field("id")
+    def id(self):
+        return self.resource.get("id", "")
+    
+    @mapped_field("patientId")
+    def patient_id(self):
+        subject_ref = self.resource.get("subject", _EMPTY).get("reference", "")
+        return _reference_id(subject_ref, "Patient/") if subject_ref else ""
+    
+    @mapped_field("patientName")
+    def patient_name(self):
+        return None  # Will be enriched by service
+    
+    @mapped_field("condition")
+    def condition(self):
+        return _coding_text(self.resource.get("code", _EMPTY).get("coding", ()), "Unknown Condition")
+    
+    @mapped_field("conditionCode")
+    def condition_code(self):
+        return _first(self.resource.get("code", _EMPTY).get("coding")).get("code", None)
+    
+    @mapped_field("category")
+    def category(self):
+        return _coding_text(_first(self.resource.get("category")).get("coding", ()), "Diagnosis")
+    
+    @mapped_field("severity")
+    def severity(self):
+        return _coding_text(self.resource.get("severity", _EMPTY).get("coding", ()), None)
+    
+    @mapped_field("clinicalStatus")
+    def clinical_status(self):
+        return _first(self.resource.get("clinicalStatus", _EMPTY).get("coding")).get("code", "active").title()
+    
+    @mapped_field("verificationStatus")
+    def verification_status(self):
+        return _first(self.resource.get("verificationStatus", _EMPTY).get("coding")).get("code", "confirmed").title()
+    
+    @mapped_field("onsetDate")
+    def onset_date(self):
+        fhir_condition = self.resource
+        onset_date = None
+        if fhir_condition.get("onsetDateTime"):
+            onset_date = fhir_condition["onsetDateTime"]
+        elif fhir_condition.get("onsetPeriod"):
+            onset_date = fhir_condition["onsetPeriod"].get("start", None)
+        elif fhir_condition.get("onsetAge"):
+            # Calculate approximate date from age
+            onset_date = _now(self.now)
+        return _date_part(onset_date) or "Unknown"
+    
+    @mapped_field("abatementDate")
+    def abatement_date(self):
+        fhir_condition = self.resource
+        abatement_date = None
+        if fhir_condition.get("abatementDateTime"):
+            abatement_date = fhir_condition["abatementDateTime"]
+        elif fhir_condition.get("abatementPeriod"):
+            abatement_date = fhir_condition["abatementPeriod"].get("end", None)
+        return _date_part(abatement_date) or None
+    
+    @mapped_field("encounterId")
+    def encounter_id(self):
+        encounter_refs = self.resource.get("encounter", ())
+        if encounter_refs:
+            encounter_ref = encounter_refs[0] if isinstance(encounter_refs[0], str) else encounter_refs[0].get("reference", "")
+            if encounter_ref:
+                return _reference_id(encounter_ref, "Encounter/")
+        return None
+    
+    @mapped_field("bodySite")
+    def body_site(self):
+        return _coding_text(_first(self.resource.get("bodySite")).get("coding", ()), None)
+    
+    @mapped_field("notes")
+    def notes(self):
+        return [note["text"] for note in self.resource.get("note", ()) if note.get("text", "")]
+    
+    @mapped_field("recordedDate")
+    def recorded_date(self):
+        recorded = self.resource.get("recordedDate")
+        return recorded.split("T")[0] if recorded else None
 
-def fhir_claim_to_insurance_claim(fhir_claim: Dict) -> Dict:
-    """Convert FHIR Claim resource to our Insurance Claim model"""
-    claim_id = fhir_claim.get("id", "")
-    
-    # Extract claim number
-    claim_number = claim_id
-    for identifier in fhir_claim.get("identifier", []):
-        if identifier.get("type", {}).get("coding", [{}])[0].get("code") == "MR":
-            claim_number = identifier.get("value", claim_id)
-            break
-    
-    # Extract patient info
-    patient_obj = fhir_claim.get("patient", {})
-    if isinstance(patient_obj, dict):
-        patient_ref = patient_obj.get("reference", "")
-    else:
-        patient_ref = str(patient_obj) if patient_obj else ""
-    patient_id = patient_ref.replace("Patient/", "").split("?")[0] if patient_ref else None
-    patient_name = "Unknown Patient"
-    
-    # Extract hospital/provider info
-    provider_obj = fhir_claim.get("provider", {})
-    if isinstance(provider_obj, dict):
-        provider_ref = provider_obj.get("reference", "")
-    else:
-        provider_ref = str(provider_obj) if provider_obj else ""
-    hospital_id = None
-    hospital_name = "Unknown Hospital"
-    if provider_ref and "Organization/" in provider_ref:
-        hospital_id = provider_ref.replace("Organization/", "").split("?")[0]
+def fhir_condition_to_medical_history(fhir_condition: Dict, now: Optional[str] = None) -> Dict:
+    """Convert FHIR Condition resource to our Medical History model"""
+    return MedicalHistoryView(fhir_condition, now).to_dict()
+
+def _reference_of(value) -> str:
+    """Reference string of a Reference element (or of a bare value some servers send instead)"""
+    if isinstance(value, dict):
+        return value.get("reference", "")
+    return str(value) if value else ""
+
+# Claim.status codes shown under our own names
+CLAIM_STATUS_NAMES = {
+    "active": "Pending",
+    "cancelled": "Denied",
+    "draft": "Pending",
+    "entered-in-error": "Rejected"
+}
+
+class InsuranceClaimView(MappedView):
+    """Insurance Claim model over a FHIR Claim resource"""
+    __slots__ = ()
     
-    # Extract insurance provider
-    insurance_provider = "Unknown Provider"
-    for insurance in fhir_claim.get("insurance", []):
-        coverage_ref = insurance.get("coverage", {}).get("reference", "")
-        if coverage_ref:
-            # Extract provider name from coverage reference or identifier
-            insurance_provider = coverage_ref.split("/")[-1] if "/" in coverage_ref else "Unknown"
-            break
-    
-    # Extract claim type
-    claim_type = "Medical"
-    type_coding = fhir_claim.get("type", {}).get("coding", [])
-    if type_coding:
-        claim_type = type_coding[0].get("display", type_coding[0].get("code", "Medical"))
+    @mapped_field("_created")
+    def created(self):
+        return self.resource.get("created") or _now(self.now)
     
-    # Extract status
-    status = fhir_claim.get("status", "active").title()
-    status_mapping = {
-        "active": "Pending",
-        "cancelled": "Denied",
-        "draft": "Pending",
-        "entered-in-error": "Rejected"
-    }
-    status = status_mapping.get(status.lower(), status)
-    
-    # Extract dates
-    created_date = fhir_claim.get("created", datetime.now().isoformat())
-    service_date = created_date
-    if fhir_claim.get("billablePeriod"):
-        service_date = fhir_claim["billablePeriod"].get("start", created_date)
-    
-    # Extract diagnosis
-    diagnosis = "General Examination"
-    diagnosis_coding = fhir_claim.get("diagnosis", [{}])[0].get("diagnosis", {}).get("coding", [])
-    if diagnosis_coding:
-        diagnosis = diagnosis_coding[0].get("display", diagnosis_coding[0].get("code", diagnosis))
-    
-    # Extract service description
-    service_description = claim_type
-    items = fhir_claim.get("item", [])
-    if items:
-        first_item = items[0]
-        product_or_service = first_item.get("productOrService", {}).get("coding", [])
-        if product_or_service:
-            service_description = product_or_service[0].get("display", service_description)
+    @mapped_field("_claim_type")
+    def claim_type_text(self):
+        return _coding_text(self.resource.get("type", _EMPTY).get("coding", ()), "Medical")
     
-    # Extract financial amounts
-    total_amount = 0
-    for item in items:
-        quantity = item.get("quantity", {}).get("value", 1)
-        unit_price = item.get("unitPrice", {}).get("value", 0)
-        total_amount += quantity * unit_price
+    @mapped_field("_total")
+    def total(self):
+        total_amount = 0
+        for item in self.resource.get("item", ()):
+            quantity = item.get("quantity", _EMPTY).get("value", 1)
+            unit_price = item.get("unitPrice", _EMPTY).get("value", 0)
+            total_amount += quantity * unit_price
+        
+        # If no items, use total from total field
+        if total_amount == 0:
+            total_amount = self.resource.get("total", _EMPTY).get("value", 0)
+        return total_amount
     
-    # If no items, use total from total field
-    if total_amount == 0:
-        total_amount = fhir_claim.get("total", {}).get("value", 0)
+    @mapped_field("_covered")
+    def covered(self):
+        # Calculate covered amount (assume 80% coverage)
+        coverage_percentage = 80
+        return int(self["_total"] * (coverage_percentage / 100))
     
-    # Calculate covered amount (assume 80% coverage)
-    coverage_percentage = 80
-    covered_amount = int(total_amount * (coverage_percentage / 100))
-    patient_responsibility = total_amount - covered_amount
+    @mapped_field("id")
+    def id(self):
+        return self.resource.get("id", "")
     
-    return {
-        "id": claim_id,
-        "claimNumber": claim_number,
-        "hospitalId": hospital_id or "",
-        "hospitalName": hospital_name,
-        "patientId": patient_id or "",
-        "patientName": patient_name,
-        "provider": insurance_provider,
-        "claimType": claim_type,
-        "status": status,
-        "submissionDate": created_date.split("T")[0] if "T" in created_date else created_date,
-        "serviceDate": service_date.split("T")[0] if "T" in service_date else service_date,
-        "totalAmount": f"${total_amount:,.2f}",
-        "coveredAmount": f"${covered_amount:,.2f}",
-        "patientResponsibility": f"${patient_responsibility:,.2f}",
-        "diagnosis": diagnosis,
-        "serviceDescription": service_description
-    }
+    @mapped_field("claimNumber")
+    def claim_number(self):
+        claim_id = self["id"]
+        for identifier in self.resource.get("identifier", ()):
+            if _first(identifier.get("type", _EMPTY).get("coding")).get("code") == "MR":
+                return identifier.get("value", claim_id)
+        return claim_id
+    
+    @mapped_field("hospitalId")
+    def hospital_id(self):
+        provider_ref = _reference_of(self.resource.get("provider", {}))
+        if provider_ref and "Organization/" in provider_ref:
+            return _reference_id(provider_ref, "Organization/")
+        return ""
+    
+    @mapped_field("hospitalName")
+    def hospital_name(self):
+        return "Unknown Hospital"
+    
+    @mapped_field("patientId")
+    def patient_id(self):
+        patient_ref = _reference_of(self.resource.get("patient", {}))
+        return _reference_id(patient_ref, "Patient/") if patient_ref else ""
+    
+    @mapped_field("patientName")
+    def patient_name(self):
+        return "Unknown Patient"
+    
+    @mapped_field("provider")
+    def provider(self):
+        for insurance in self.resource.get("insurance", ()):
+            coverage_ref = insurance.get("coverage", _EMPTY).get("reference", "")
+            if coverage_ref:
+                # Extract provider name from coverage reference or identifier
+                return coverage_ref.split("/")[-1] if "/" in coverage_ref else "Unknown"
+        return "Unknown Provider"
+    
+    @mapped_field("claimType")
+    def claim_type(self):
+        return self["_claim_type"]
+    
+    @mapped_field("status")
+    def status(self):
+        status = self.resource.get("status", "active").title()
+        return CLAIM_STATUS_NAMES.get(status.lower(), status)
+    
+    @mapped_field("submissionDate")
+    def submission_date(self):
+        return _date_part(self["_created"])
+    
+    @mapped_field("serviceDate")
+    def service_date(self):
+        service_date = self["_created"]
+        if self.resource.get("billablePeriod"):
+            service_date = self.resource["billablePeriod"].get("start", service_date)
+        return _date_part(service_date)
+    
+    @mapped_field("totalAmount")
+    def total_amount(self):
+        return f"${self['_total']:,.2f}"
+    
+    @mapped_field("coveredAmount")
+    def covered_amount(self):
+        return f"${self['_covered']:,.2f}"
+    
+    @mapped_field("patientResponsibility")
+    def patient_responsibility(self):
+        return f"${self['_total'] - self['_covered']:,.2f}"
+    
+    @mapped_field("diagnosis")
+    def diagnosis(self):
+        diagnosis_coding = _first(self.resource.get("diagnosis")).get("diagnosis", _EMPTY).get("coding", ())
+        return _coding_text(diagnosis_coding, "General Examination")
+    
+    @mapped_field("serviceDescription")
+    def service_description(self):
+        first_item = _first(self.resource.get("item"))
+        product_or_service = first_item.get("productOrService", _EMPTY).get("coding", ())
+        if product_or_service:
+            return product_or_service[0].get("display", self["_claim_type"])
+        return self["_claim_type"]
+
+def fhir_claim_to_insurance_claim(fhir_claim: Dict, now: Optional[str] = None) -> Dict:
+    """Convert FHIR Claim resource to our Insurance Claim model"""
+    return InsuranceClaimView(fhir_claim, now).to_dict()
 
-def fhir_coverage_to_coverage_rule(fhir_coverage: Dict) -> Dict:
+# Lazy view class for each resource type whose list endpoints accept fields=
+VIEWS = {
+    "Encounter": VisitView,
+    "Condition": MedicalHistoryView,
+    "Claim": InsuranceClaimView
+}
+
+def projector(view: type, fields: Optional[Iterable[str]]):
+    """
+    Mapper (resource, now) -> Dict computing only the given fields of view
+    
+    Raises:
+        ValueError if a field is unknown
+    """
+    if fields is None:
+        return lambda resource, now=None: view(resource, now).to_dict()
+    fields = view.check_fields(fields)
+    return lambda resource, now=None: view(resource, now).project(fields)
+
+def fhir_coverage_to_coverage_rule(fhir_coverage: Dict, now: Optional[str] = None) -> Dict:
     """Convert FHIR Coverage resource to our Coverage Rule model"""
     coverage_id = fhir_coverage.get("id", "")
     
     # Extract subscriber info (patient)
-    subscriber_ref = fhir_coverage.get("subscriber", {}).get("reference", "")
-    subscriber_id = subscriber_ref.replace("Patient/", "").split("?")[0] if subscriber_ref else None
+    subscriber_ref = fhir_coverage.get("subscriber", _EMPTY).get("reference", "")
+    subscriber_id = _reference_id(subscriber_ref, "Patient/") if subscriber_ref else None
     
     # Extract beneficiary (who is covered)
-    beneficiary_ref = fhir_coverage.get("beneficiary", {}).get("reference", "")
-    beneficiary_id = beneficiary_ref.replace("Patient/", "").split("?")[0] if beneficiary_ref else None
+    beneficiary_ref = fhir_coverage.get("beneficiary", _EMPTY).get("reference", "")
+    beneficiary_id = _reference_id(beneficiary_ref, "Patient/") if beneficiary_ref else None
     
     # Extract payor (insurance company)
-    payor_refs = fhir_coverage.get("payor", [])
+    payor_refs = fhir_coverage.get("payor", ())
     insurance_provider = "Unknown Provider"
     if payor_refs:
         payor_obj = payor_refs[0]
@@ -517,14 +782,14 @@ def fhir_coverage_to_coverage_rule(fhir_coverage: Dict) -> Dict:
     
     # If still unknown, try to extract from identifier
     if insurance_provider == "Unknown Provider":
-        for identifier in fhir_coverage.get("identifier", []):
-            if identifier.get("type", {}).get("coding", [{}])[0].get("code") == "MB":
+        for identifier in fhir_coverage.get("identifier", ()):
+            if _first(identifier.get("type", _EMPTY).get("coding")).get("code") == "MB":
                 insurance_provider = identifier.get("value", insurance_provider)
                 break
     
     # Extract coverage type
     coverage_type = "Health Insurance"
-    type_coding = fhir_coverage.get("type", {}).get("coding", [])
+    type_coding = fhir_coverage.get("type", _EMPTY).get("coding", ())
     if type_coding:
         coverage_type = type_coding[0].get("display", type_coding[0].get("code", coverage_type))
     
@@ -532,17 +797,17 @@ def fhir_coverage_to_coverage_rule(fhir_coverage: Dict) -> Dict:
     status = fhir_coverage.get("status", "active").title()
     
     # Extract period
-    period = fhir_coverage.get("period", {})
-    start_date = period.get("start", datetime.now().isoformat())
+    period = fhir_coverage.get("period", _EMPTY)
+    start_date = period.get("start") or _now(now)
     end_date = period.get("end", None)
     
     # Extract cost sharing
-    cost_to_beneficiary = fhir_coverage.get("costToBeneficiary", [{}])[0] if fhir_coverage.get("costToBeneficiary") else {}
-    copay = cost_to_beneficiary.get("value", {}).get("value", 0)
-    copay_currency = cost_to_beneficiary.get("value", {}).get("currency", "USD")
+    cost_to_beneficiary = _first(fhir_coverage.get("costToBeneficiary"))
+    copay = cost_to_beneficiary.get("value", _EMPTY).get("value", 0)
+    copay_currency = cost_to_beneficiary.get("value", _EMPTY).get("currency", "USD")
     
     # Extract network
-    network = fhir_coverage.get("network", [])
+    network = fhir_coverage.get("network", ())
     network_type = "In-Network"
     if network:
         network_type = network[0] if isinstance(network[0], str) else "In-Network"
@@ -551,20 +816,20 @@ def fhir_coverage_to_coverage_rule(fhir_coverage: Dict) -> Dict:
     dependent = fhir_coverage.get("dependent", "")
     
     # Extract relationship
-    relationship_coding = fhir_coverage.get("relationship", {}).get("coding", [])
+    relationship_coding = fhir_coverage.get("relationship", _EMPTY).get("coding", ())
     relationship = "Self"
     if relationship_coding:
         relationship = relationship_coding[0].get("display", relationship_coding[0].get("code", relationship))
     
     # Extract class (coverage details)
-    coverage_class = fhir_coverage.get("class", [])
+    coverage_class = fhir_coverage.get("class", ())
     plan_type = "Standard"
     plan_name = ""
     if coverage_class:
         for cls in coverage_class:
-            if cls.get("type", {}).get("coding", [{}])[0].get("code") == "plan":
+            if _first(cls.get("type", _EMPTY).get("coding")).get("code") == "plan":
                 plan_name = cls.get("name", plan_name)
-            elif cls.get("type", {}).get("coding", [{}])[0].get("code") == "subplan":
+            elif _first(cls.get("type", _EMPTY).get("coding")).get("code") == "subplan":
                 plan_type = cls.get("name", plan_type)
     
     # Extract coverage rules from extensions or text
@@ -612,3 +877,509 @@ def fhir_coverage_to_coverage_rule(fhir_coverage: Dict) -> Dict:
         "rules": rules[:10]  # Limit to 10 rules
     }
 
+def _strip_prefix(prefix: str) -> Callable[[str], str]:
+    """Transform dropping a reference's resource type (Patient/123 -> 123)"""
+    return lambda reference: reference.replace(prefix, "")
+
+# Declarative specs (see fhir_paths) for mappers that need no logic beyond
+# picking fields; each compiles to a specialized mapper at import time.
+# The mappers above stay hand-written because their fields are not single paths:
+# - Patient/Practitioner/Organization take the *last* matching telecom,
+#   identifier, coding or contact (a path filter picks the first), match on
+#   two keys (system and use) or on nested codes (LN identifier type, contact
+#   relationship C), and build fields such as address out of several elements
+# - Coverage derives plan, provider and rules from several elements at once
+# - Encounter visits, Conditions and Claims are MappedViews, which compute
+#   only the fields a fields= projection asks for; a spec always builds all
+# Rewriting them as specs would change what they return for such resources.
+ENCOUNTER_RECORD_SPEC = {
+    "id": "id",
+    "patient_id": Field("subject.reference", "", _strip_prefix("Patient/")),
+    "patient_name": Field(None),  # Would need to fetch Patient resource
+    "encounter_type": Field("class.display", "Unknown"),
+    "status": Field("status", "unknown"),
+    "timestamp": Field("period.start", NOW),
+    "hospital_id": Field("serviceProvider.reference", "", _strip_prefix("Organization/"))
+}
+
+ALLERGY_INTOLERANCE_SPEC = {
+    "id": "id",
+    "patientId": Field("patient.reference", "", reference_id),
+    "substance": Field("code.text|code.coding[0].display|code.coding[0].code", "Unknown Substance"),
+    "substanceCode": "code.coding[0].code",
+    "category": "category[0]",
+    "type": "type",
+    "criticality": "criticality",
+    "clinicalStatus": Field("clinicalStatus.coding[0].code", "Active", str.title),
+    "verificationStatus": Field("verificationStatus.coding[0].code", "Confirmed", str.title),
+    # Per reaction, so one reaction's text doesn't hide another's coded manifestation
+    "reactions": Field("reaction[*].manifestation[0]", None, compile_path("text|coding[0].display")),
+    "severity": "reaction[0].severity",
+    "onsetDate": Field("onsetDateTime|onsetPeriod.start", None, date_only),
+    "recordedDate": Field("recordedDate", None, date_only),
+    "notes": "note[*].text"
+}
+
+MEDICATION_REQUEST_SPEC = {
+    "id": "id",
+    "patientId": Field("subject.reference", "", reference_id),
+    "encounterId": Field("encounter.reference", None, reference_id),
+    "medication": Field(
+        "medicationCodeableConcept.text|medicationCodeableConcept.coding[0].display|medicationReference.display",
+        "Unknown Medication"
+    ),
+    "medicationCode": "medicationCodeableConcept.coding[0].code",
+    "status": Field("status", "Unknown", str.title),
+    "intent": "intent",
+    "priority": "priority",
+    "authoredOn": Field("authoredOn", None, date_only),
+    "prescriberId": Field("requester.reference", None, reference_id),
+    "prescriberName": "requester.display",
+    "dosage": "dosageInstruction[0].text",
+    "route": "dosageInstruction[0].route.coding[0].display",
+    "quantity": "dispenseRequest.quantity.value",
+    "refills": Field("dispenseRequest.numberOfRepeatsAllowed", 0),
+    "reason": "reasonCode[0].text|reasonCode[0].coding[0].display",
+    "notes": "note[*].text"
+}
+
+OBSERVATION_COMPONENT_SPEC = {
+    "code": "code.text|code.coding[0].display|code.coding[0].code",
+    "value": "valueQuantity.value|valueString|valueCodeableConcept.text|valueCodeableConcept.coding[0].display",
+    "unit": "valueQuantity.unit|valueQuantity.code"
+}
+
+OBSERVATION_SPEC = {
+    "id": "id",
+    "patientId": Field("subject.reference", "", reference_id),
+    "encounterId": Field("encounter.reference", None, reference_id),
+    "code": Field("code.text|code.coding[0].display|code.coding[0].code", "Unknown Observation"),
+    "loincCode": "code.coding[system=http://loinc.org].code",
+    "category": "category[0].coding[0].display|category[0].coding[0].code",
+    "status": Field("status", "Unknown", str.title),
+    "effectiveDate": "effectiveDateTime|effectivePeriod.start|issued",
+    "value": (
+        "valueQuantity.value|valueString|valueCodeableConcept.text|valueCodeableConcept.coding[0].display"
+        "|valueBoolean|valueInteger"
+    ),
+    "unit": "valueQuantity.unit|valueQuantity.code",
+    "interpretation": "interpretation[0].coding[0].display|interpretation[0].coding[0].code",
+    "referenceLow": "referenceRange[0].low.value",
+    "referenceHigh": "referenceRange[0].high.value",
+    "components": Field("component[*]", None, compile_spec(OBSERVATION_COMPONENT_SPEC, "fhir_observation_component")),
+    "notes": "note[*].text"
+}
+
+fhir_encounter_to_record = compile_spec(ENCOUNTER_RECORD_SPEC, "fhir_encounter_to_record")
+fhir_allergy_intolerance_to_allergy = compile_spec(ALLERGY_INTOLERANCE_SPEC, "fhir_allergy_intolerance_to_allergy")
+fhir_medication_request_to_prescription = compile_spec(MEDICATION_REQUEST_SPEC, "fhir_medication_request_to_prescription")
+fhir_observation_to_observation = compile_spec(OBSERVATION_SPEC, "fhir_observation_to_observation")
+
+MAPPER_ELEMENTS.update({
+    "AllergyIntolerance": spec_elements(ALLERGY_INTOLERANCE_SPEC),
+    "MedicationRequest": spec_elements(MEDICATION_REQUEST_SPEC),
+    "Observation": spec_elements(OBSERVATION_SPEC)
+})
+
+# Mapper used for each resource type when ingesting resources wholesale (bulk export, sync)
+MAPPERS = {
+    "Patient": fhir_patient_to_model,
+    "Practitioner": fhir_practitioner_to_doctor,
+    "Organization": fhir_organization_to_hospital,
+    "Encounter": fhir_encounter_to_visit,
+    "Condition": fhir_condition_to_medical_history,
+    "Claim": fhir_claim_to_insurance_claim,
+    "Coverage": fhir_coverage_to_coverage_rule,
+    "AllergyIntolerance": fhir_allergy_intolerance_to_allergy,
+    "MedicationRequest": fhir_medication_request_to_prescription,
+    "Observation": fhir_observation_to_observation
+}
+
+def _map_skipping(resource_type: str, resources: Iterable[Dict], mapper, now: str) -> Iterator[Dict]:
+    for resource in resources:
+        try:
+            yield mapper(resource, now)
+        except Exception as e:
+            print(f"Error mapping FHIR {resource_type}: {e}")
+
+def map_many(resource_type: str, resources: Iterable[Dict], lazy: bool = False, mapper=None,
+             skip_errors: bool = False, limit: Optional[int] = None, compact: bool = False) -> Union[List[Dict], Iterator[Dict]]:
+    """
+    Map a batch of FHIR resources of one type
+    
+    Values shared by the whole batch (the created_at/updated_at timestamp) are
+    computed once instead of per record.
+    
+    Args:
+        resource_type: FHIR resource type (selects the mapper from MAPPERS)
+        resources: FHIR resources, e.g. a Bundle's entry resources
+        lazy: Return a generator instead of a list, for streaming large batches
+        mapper: Mapper to use instead of MAPPERS[resource_type] (e.g. fhir_encounter_to_record)
+        skip_errors: Skip (and log) resources that fail to map instead of raising
+        limit: Stop after this many mapped records
+        compact: Return slotted RECORD_TYPES records instead of dicts, for results
+            held in memory (types without a record type stay dicts)
+    
+    Returns:
+        Mapped records in input order
+    """
+    mapper = mapper or MAPPERS[resource_type]
+    record_type = RECORD_TYPES.get(resource_type) if compact else None
+    if record_type:
+        base_mapper = mapper
+        mapper = lambda resource, now: record_type(base_mapper(resource, now))
+    now = datetime.now().isoformat()
+    if skip_errors:
+        records = _map_skipping(resource_type, resources, mapper, now)
+    else:
+        records = (mapper(resource, now) for resource in resources)
+    if limit is not None:
+        records = islice(records, limit)
+    return records if lazy else list(records)
+
+# Reverse mappers - our application models back to FHIR resources, for writes.
+# Each is the inverse of the forward mapper above for the fields that mapper
+# reads, so mapping the result forward again gives back the same record.
+# Fields with no home in the resource (a patient's blood_type, a doctor's
+# hospital_id, which belongs on PractitionerRole) are left out.
+
+_SNOMED = "http://snomed.info/sct"
+_CONTACT_ROLE_SYSTEM = "http://terminology.hl7.org/CodeSystem/v2-0131"
+_IDENTIFIER_TYPE_SYSTEM = "http://terminology.hl7.org/CodeSystem/v2-0203"
+
+_FHIR_GENDERS = {"M": "male", "MALE": "male", "F": "female", "FEMALE": "female", "OTHER": "other"}
+
+# The "line, city, state postal" address string fhir_patient_to_model builds
+_PATIENT_ADDRESS = re.compile(r"(?P<line>.+), (?P<city>[^,]+), (?P<state>[^,]*?)(?: (?P<postal>\d[\w-]*))?")
+
+def _human_name(record: Mapping) -> List[Dict]:
+    first_name = record.get("first_name")
+    last_name = record.get("last_name")
+    name = {}
+    if last_name:
+        name["family"] = last_name
+    if first_name:
+        name["given"] = first_name.split()
+    return [name] if name else []
+
+def _telecom(*contact_points: Tuple[str, Optional[str], Optional[str]]) -> List[Dict]:
+    """ContactPoints from (system, value, use) triples, skipping empty values"""
+    telecom = []
+    for system, value, use in contact_points:
+        if value:
+            point = {"system": system, "value": value}
+            if use:
+                point["use"] = use
+            telecom.append(point)
+    return telecom
+
+def _iso(value) -> Optional[str]:
+    """date/datetime (from a Pydantic model) or string as FHIR text"""
+    if value is None or value == "":
+        return None
+    return value.isoformat() if hasattr(value, "isoformat") else str(value)
+
+def _drop_empty(resource: Dict) -> Dict:
+    """FHIR forbids empty elements: drop None, "" and empty lists"""
+    return {key: value for key, value in resource.items() if value not in (None, "", [], {})}
+
+def _patient_address(address: Optional[str]) -> List[Dict]:
+    if not address:
+        return []
+    match = _PATIENT_ADDRESS.fullmatch(address)
+    if not match:
+        return [{"text": address, "line": [address]}]
+    parts = {"line": match.group("line").split(", "), "city": match.group("city"),
+             "state": match.group("state"), "postalCode": match.group("postal")}
+    return [{"text": address, **_drop_empty(parts)}]
+
+def patient_to_fhir(patient: Mapping) -> Dict:
+    """Convert our Patient model (dict, record or the fields of a Pydantic model) to a FHIR Patient resource"""
+    contact = []
+    if patient.get("emergency_contact_name") or patient.get("emergency_contact_phone"):
+        contact.append(_drop_empty({
+            "relationship": [{"coding": [{"system": _CONTACT_ROLE_SYSTEM, "code": "C", "display": "Emergency Contact"}]}],
+            "name": {"text": patient["emergency_contact_name"]} if patient.get("emergency_contact_name") else None,
+            "telecom": _telecom(("phone", patient.get("emergency_contact_phone"), None))
+        }))
+    gender = patient.get("gender")
+    return _drop_empty({
+        "resourceType": "Patient",
+        "id": patient.get("id"),
+        "name": _human_name(patient),
+        "gender": _FHIR_GENDERS.get(str(gender).upper(), "unknown") if gender else None,
+        "birthDate": _iso(patient.get("date_of_birth")),
+        "telecom": _telecom(("phone", patient.get("phone"), None), ("email", patient.get("email"), None)),
+        "address": _patient_address(patient.get("address")),
+        "contact": contact
+    })
+
+def doctor_to_fhir_practitioner(doctor: Mapping) -> Dict:
+    """Convert our Doctor model to a FHIR Practitioner resource"""
+    qualification = []
+    if doctor.get("qualification") or doctor.get("specialization"):
+        code = {"text": doctor.get("qualification")}
+        if doctor.get("specialization"):
+            code["coding"] = [{"system": _SNOMED, "display": doctor["specialization"]}]
+        qualification.append({"code": _drop_empty(code)})
+    identifier = []
+    if doctor.get("license_number"):
+        identifier.append({
+            "type": {"coding": [{"system": _IDENTIFIER_TYPE_SYSTEM, "code": "LN"}]},
+            "value": doctor["license_number"]
+        })
+    return _drop_empty({
+        "resourceType": "Practitioner",
+        "id": doctor.get("id"),
+        "active": True,
+        "identifier": identifier,
+        "name": _human_name(doctor),
+        "telecom": _telecom(("phone", doctor.get("phone"), None), ("email", doctor.get("email"), None)),
+        "qualification": qualification
+    })
+
+def hospital_to_fhir_organization(hospital: Mapping) -> Dict:
+    """Convert our Hospital model to a FHIR Organization resource"""
+    address = _drop_empty({
+        "line": [hospital["address"]] if hospital.get("address") else None,
+        "city": hospital.get("city"),
+        "state": hospital.get("state"),
+        "postalCode": hospital.get("zip_code"),
+        "country": hospital.get("country")
+    })
+    # fhir_organization_to_hospital reads hospital_type and specialties back from the type codings
+    displays = []
+    for display in (hospital.get("hospital_type"), *(hospital.get("specialties") or ())):
+        if display and display not in displays:
+            displays.append(display)
+    return _drop_empty({
+        "resourceType": "Organization",
+        "id": hospital.get("id"),
+        "active": True,
+        "name": hospital.get("name"),
+        "type": [{"coding": [{"display": display} for display in displays]}] if displays else None,
+        "telecom": _telecom(
+            ("phone", hospital.get("phone"), "work"),
+            ("phone", hospital.get("emergency_phone"), "mobile"),
+            ("email", hospital.get("email"), None)
+        ),
+        "address": [address] if address else None
+    })
+
+# Reverse mapper used for each resource type when writing our models to the server
+REVERSE_MAPPERS: Dict[str, Callable[[Mapping], Dict]] = {
+    "Patient": patient_to_fhir,
+    "Practitioner": doctor_to_fhir_practitioner,
+    "Organization": hospital_to_fhir_organization
+}
+
+# Element-level updates - apply changed model fields to a resource read from the
+# server. Only the elements behind the changed fields are touched, and within a
+# list (names, telecoms, identifiers, codings) only the item the forward mapper
+# reads, so everything our models do not cover survives an update.
+
+def _last_index(items: List[Dict], match: Callable[[Dict], bool]) -> Optional[int]:
+    """Index of the last item match accepts (the forward mappers let later items win)"""
+    for index in range(len(items) - 1, -1, -1):
+        if isinstance(items[index], dict) and match(items[index]):
+            return index
+    return None
+
+def _set_contact_point(resource: Dict, value: Optional[str], system: str, uses: Optional[Tuple[str, ...]] = None,
+                       use: Optional[str] = None):
+    """
+    Set the value of the ContactPoint a forward mapper reads (the last one of
+    system, with one of uses when given), adding one if there is none; an empty
+    value removes every point that mapper could read
+    """
+    def match(point: Dict) -> bool:
+        return point.get("system") == system and (uses is None or point.get("use") in uses)
+    
+    telecom = list(resource.get("telecom") or ())
+    if not value:
+        telecom = [point for point in telecom if not (isinstance(point, dict) and match(point))]
+    else:
+        index = _last_index(telecom, match)
+        if index is None:
+            telecom.extend(_telecom((system, value, use)))
+        else:
+            telecom[index] = {**telecom[index], "value": value}
+    resource["telecom"] = telecom
+
+def _set_name(resource: Dict, record: Mapping, changed: set):
+    """Set given/family on the first HumanName, keeping its prefix, use and any further names"""
+    if not changed & {"first_name", "last_name"}:
+        return
+    names = list(resource.get("name") or ())
+    name = dict(names[0]) if names else {}
+    if "first_name" in changed:
+        name["given"] = (record.get("first_name") or "").split()
+    if "last_name" in changed:
+        name["family"] = record.get("last_name")
+    name = _drop_empty(name)
+    if names:
+        names[0] = name
+    elif name:
+        names.append(name)
+    resource["name"] = [item for item in names if item]
+
+def _set(resource: Dict, key: str, value: Any):
+    """Set a top-level element, removing it rather than writing an empty one"""
+    if value in (None, "", [], {}):
+        resource.pop(key, None)
+    else:
+        resource[key] = value
+
+def update_patient_resource(resource: Dict, patient: Mapping, changed: set) -> Dict:
+    """Apply the changed fields of our Patient model to a FHIR Patient resource"""
+    _set_name(resource, patient, changed)
+    if "gender" in changed:
+        gender = patient.get("gender")
+        _set(resource, "gender", _FHIR_GENDERS.get(str(gender).upper(), "unknown") if gender else None)
+    if "date_of_birth" in changed:
+        _set(resource, "birthDate", _iso(patient.get("date_of_birth")))
+    if "phone" in changed:
+        _set_contact_point(resource, patient.get("phone"), "phone")
+    if "email" in changed:
+        _set_contact_point(resource, patient.get("email"), "email")
+    if "address" in changed:
+        addresses = list(resource.get("address") or ())
+        replacement = _patient_address(patient.get("address"))
+        if addresses and replacement:
+            # Keep use, type, country, period... of the address; replace the parts the address string covers
+            kept = {key: value for key, value in addresses[0].items() if key not in ("text", "line", "city", "state", "postalCode")}
+            addresses[0] = {**kept, **replacement[0]}
+        else:
+            addresses = replacement + addresses[1:]
+        resource["address"] = addresses
+    if changed & {"emergency_contact_name", "emergency_contact_phone"}:
+        contacts = list(resource.get("contact") or ())
+        index = _last_index(contacts, lambda contact: _first(_first(contact.get("relationship")).get("coding")).get("code") == "C")
+        if index is None:
+            contacts.extend(patient_to_fhir({
+                "emergency_contact_name": patient.get("emergency_contact_name"),
+                "emergency_contact_phone": patient.get("emergency_contact_phone")
+            }).get("contact", ()))
+        else:
+            contact = dict(contacts[index])
+            if "emergency_contact_name" in changed:
+                _set(contact, "name", {**contact.get("name", {}), "text": patient.get("emergency_contact_name")}
+                     if patient.get("emergency_contact_name") else None)
+            if "emergency_contact_phone" in changed:
+                # The forward mapper reads the contact's first phone
+                telecom = list(contact.get("telecom") or ())
+                phones = [position for position, point in enumerate(telecom) if isinstance(point, dict) and point.get("system") == "phone"]
+                phone = patient.get("emergency_contact_phone")
+                if phones and phone:
+                    telecom[phones[0]] = {**telecom[phones[0]], "value": phone}
+                elif phone:
+                    telecom.extend(_telecom(("phone", phone, None)))
+                else:
+                    telecom = [point for position, point in enumerate(telecom) if position not in phones]
+                _set(contact, "telecom", telecom)
+            contacts[index] = contact
+        resource["contact"] = contacts
+    return _drop_empty(resource)
+
+def update_practitioner_resource(resource: Dict, doctor: Mapping, changed: set) -> Dict:
+    """Apply the changed fields of our Doctor model to a FHIR Practitioner resource"""
+    _set_name(resource, doctor, changed)
+    if "phone" in changed:
+        _set_contact_point(resource, doctor.get("phone"), "phone")
+    if "email" in changed:
+        _set_contact_point(resource, doctor.get("email"), "email")
+    if "license_number" in changed:
+        identifiers = list(resource.get("identifier") or ())
+        index = _last_index(identifiers, lambda identifier: _first(identifier.get("type", _EMPTY).get("coding")).get("code") == "LN")
+        license_number = doctor.get("license_number")
+        if index is None:
+            identifiers.extend(doctor_to_fhir_practitioner({"license_number": license_number}).get("identifier", ()))
+        elif license_number:
+            identifiers[index] = {**identifiers[index], "value": license_number}
+        else:
+            del identifiers[index]
+        resource["identifier"] = identifiers
+    if changed & {"qualification", "specialization"}:
+        qualifications = list(resource.get("qualification") or ())
+        qualification = dict(qualifications[0]) if qualifications else {}
+        code = dict(qualification.get("code") or {})
+        if "qualification" in changed:
+            _set(code, "text", doctor.get("qualification"))
+        if "specialization" in changed:
+            # A new specialization replaces the SNOMED coding the forward mapper reads; other codings stay
+            codings = list(code.get("coding") or ())
+            index = _last_index(codings, lambda coding: coding.get("system") == _SNOMED)
+            replacement = [{"system": _SNOMED, "display": doctor["specialization"]}] if doctor.get("specialization") else []
+            if index is None:
+                codings.extend(replacement)
+            else:
+                codings[index:index + 1] = replacement
+            _set(code, "coding", codings)
+        _set(qualification, "code", code)
+        if qualifications:
+            qualifications[0] = qualification
+        elif qualification:
+            qualifications.append(qualification)
+        resource["qualification"] = [item for item in qualifications if item]
+    return _drop_empty(resource)
+
+def _set_organization_types(resource: Dict, hospital: Mapping):
+    """
+    Make the type codings' displays match hospital_type and specialties (the
+    forward mapper reads both from them). Coded type codings, such as the
+    prov code that marks a healthcare provider, are always kept; display-only
+    codings (the ones hospital_to_fhir_organization writes) are replaced, and
+    a hospital_type only gets a coding when it reads back as one (it names a
+    hospital; anything else maps back to "General" without one).
+    """
+    hospital_type = hospital.get("hospital_type")
+    displays = []
+    if hospital_type and "hospital" not in hospital_type.lower():
+        hospital_type = None
+    for display in (hospital_type, *(hospital.get("specialties") or ())):
+        if display and display not in displays:
+            displays.append(display)
+    types = []
+    for concept in resource.get("type") or ():
+        codings = [coding for coding in concept.get("coding") or () if coding.get("code")]
+        kept = _drop_empty({**concept, "coding": codings})
+        if codings or kept.get("text"):
+            types.append(kept)
+    present = {coding.get("display") for concept in types for coding in concept.get("coding", ())}
+    added = [{"display": display} for display in displays if display not in present]
+    if added:
+        types.append({"coding": added})
+    resource["type"] = types
+
+def update_organization_resource(resource: Dict, hospital: Mapping, changed: set) -> Dict:
+    """Apply the changed fields of our Hospital model to a FHIR Organization resource"""
+    if "name" in changed:
+        _set(resource, "name", hospital.get("name"))
+    parts = {"address": "line", "city": "city", "state": "state", "zip_code": "postalCode", "country": "country"}
+    if changed & set(parts):
+        addresses = list(resource.get("address") or ())
+        address = dict(addresses[0]) if addresses else {}
+        for field in changed & set(parts):
+            value = hospital.get(field)
+            _set(address, parts[field], [value] if field == "address" and value else value)
+        if addresses:
+            addresses[0] = address
+        elif address:
+            addresses.append(address)
+        resource["address"] = [item for item in addresses if item]
+    if "phone" in changed:
+        _set_contact_point(resource, hospital.get("phone"), "phone", ("work",), "work")
+    if "emergency_phone" in changed:
+        _set_contact_point(resource, hospital.get("emergency_phone"), "phone", ("mobile", "temp"), "mobile")
+    if "email" in changed:
+        _set_contact_point(resource, hospital.get("email"), "email")
+    if changed & {"hospital_type", "specialties"}:
+        _set_organization_types(resource, hospital)
+    return _drop_empty(resource)
+
+# Element-level updater used for each resource type when changing a resource that already exists
+RESOURCE_UPDATERS: Dict[str, Callable[[Dict, Mapping, set], Dict]] = {
+    "Patient": update_patient_resource,
+    "Practitioner": update_practitioner_resource,
+    "Organization": update_organization_resource
+}
@@ -0,0 +1,176 @@
+"""
+FHIR Mapper Benchmark - per-record mapping cost of the current mappers against a baseline
+Builds a synthetic 10k-resource searchset Bundle for each mapped resource type
+and times mapping every entry with the baseline mapper and with the current one
+through map_many (one timestamp per batch, as the data service maps). The
+baseline is a copy of fhir_mapper.py as it was before the change being measured,
+e.g. taken with git show <commit>:fhir_mapper.py; no FHIR server is needed:
+
+    python -m backend.app.services.fhir_mapper_benchmark --baseline /tmp/fhir_mapper_baseline.py [--size 10000] [--repeat 5]
+"""
+import argparse
+import importlib.util
+import time
+from types import ModuleType
+from typing import Callable, Dict, List
+from backend.app.services import fhir_mapper
+
+def _reference(resource_type: str, index: int, pool: int) -> Dict:
+    return {"reference": f"{resource_type}/{resource_type[:3].lower()}-{index % pool}"}
+
+def _coding(code: str, display: str) -> Dict:
+    return {"coding": [{"system": "http://snomed.info/sct", "code": code, "display": display}]}
+
+def _name(index: int) -> List[Dict]:
+    return [{"given": [f"Given{index}"], "family": f"Family{index % 500}"}]
+
+def _telecom(index: int) -> List[Dict]:
+    return [
+        {"system": "phone", "value": f"555-01{index % 100:02d}", "use": "work"},
+        {"system": "email", "value": f"person{index}@example.org"}
+    ]
+
+def _address(index: int) -> List[Dict]:
+    return [{"line": [f"{index} Main St"], "city": "Boston", "state": "MA", "postalCode": "02101"}]
+
+# Representative resources as returned by a FHIR search, keyed by resource type
+BUILDERS: Dict[str, Callable[[int], Dict]] = {
+    "Patient": lambda i: {
+        "name": _name(i), "gender": "female", "birthDate": "1980-04-02",
+        "telecom": _telecom(i), "address": _address(i)
+    },
+    "Practitioner": lambda i: {
+        "name": _name(i), "telecom": _telecom(i),
+        "qualification": [{"code": {"text": "MD", **_coding("309343006", "Physician")}}],
+        "identifier": [{"type": {"coding": [{"code": "LN"}]}, "value": f"LN-{i}"}]
+    },
+    "Organization": lambda i: {
+        "name": f"Hospital {i}", "address": _address(i), "telecom": _telecom(i),
+        "type": [_coding("prov", "General Hospital")]
+    },
+    "Encounter": lambda i: {
+        "status": "finished", "class": {"code": "AMB", "display": "ambulatory"},
+        "subject": _reference("Patient", i, 1000), "serviceProvider": _reference("Organization", i, 20),
+        "period": {"start": "2024-01-01T10:00:00Z", "end": "2024-01-01T10:30:00Z"},
+        "participant": [{"individual": _reference("Practitioner", i, 200)}],
+        "reasonCode": [_coding("386661006", "Fever")]
+    },
+    "Condition": lambda i: {
+        "subject": _reference("Patient", i, 1000), "code": _coding("195967001", "Asthma"),
+        "clinicalStatus": {"coding": [{"code": "active"}]}, "onsetDateTime": "2019-06-01T00:00:00Z",
+        "recordedDate": "2019-06-02"
+    },
+    "Claim": lambda i: {
+        "status": "active", "created": "2024-02-01T09:00:00Z", "type": _coding("professional", "Professional"),
+        "patient": _reference("Patient", i, 1000), "provider": _reference("Organization", i, 20),
+        "item": [{"productOrService": _coding("99213", "Office visit"), "quantity": {"value": 1}, "unitPrice": {"value": 150}}]
+    },
+    "Coverage": lambda i: {
+        "status": "active", "beneficiary": _reference("Patient", i, 1000),
+        "payor": [{"display": "Acme Health"}], "type": _coding("HIP", "health insurance plan policy"),
+        "period": {"start": "2024-01-01"}
+    },
+    "AllergyIntolerance": lambda i: {
+        "patient": _reference("Patient", i, 1000), "code": _coding("91935009", "Peanut allergy"),
+        "clinicalStatus": {"coding": [{"code": "active"}]}, "criticality": "high",
+        "reaction": [{"manifestation": [_coding("247472004", "Hives")], "severity": "moderate"}]
+    },
+    "MedicationRequest": lambda i: {
+        "status": "active", "intent": "order", "subject": _reference("Patient", i, 1000),
+        "medicationCodeableConcept": _coding("1191", "Aspirin"), "authoredOn": "2024-03-01T08:00:00Z",
+        "requester": _reference("Practitioner", i, 200), "dosageInstruction": [{"text": "81 mg daily"}]
+    },
+    "Observation": lambda i: {
+        "status": "final", "subject": _reference("Patient", i, 1000),
+        "code": {"coding": [{"system": "http://loinc.org", "code": "8867-4", "display": "Heart rate"}]},
+        "effectiveDateTime": "2024-01-01T10:00:00Z", "valueQuantity": {"value": 60 + i % 40, "unit": "/min"}
+    }
+}
+
+# Mappers compared, as (resource type, function name in both fhir_mapper versions)
+BENCHMARKED = [
+    ("Patient", "fhir_patient_to_model"),
+    ("Practitioner", "fhir_practitioner_to_doctor"),
+    ("Organization", "fhir_organization_to_hospital"),
+    ("Encounter", "fhir_encounter_to_record"),
+    ("Encounter", "fhir_encounter_to_visit"),
+    ("Condition", "fhir_condition_to_medical_history"),
+    ("Claim", "fhir_claim_to_insurance_claim"),
+    ("Coverage", "fhir_coverage_to_coverage_rule")
+]
+
+# Fields stamped with the mapping time, which differ between any two runs
+TIMESTAMP_FIELDS = ("created_at", "updated_at")
+
+def build_bundle(resource_type: str, size: int) -> Dict:
+    """A searchset Bundle of size synthetic resources of resource_type"""
+    build = BUILDERS[resource_type]
+    return {
+        "resourceType": "Bundle",
+        "type": "searchset",
+        "total": size,
+        "entry": [
+            {"resource": {"resourceType": resource_type, "id": f"{resource_type.lower()}-{i}", **build(i)}}
+            for i in range(size)
+        ]
+    }
+
+def _best_of(repeat: int, run: Callable[[], object]) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def load_baseline(path: str) -> ModuleType:
+    """Import a copy of fhir_mapper.py (e.g. from git history) under its own module name"""
+    spec = importlib.util.spec_from_file_location("fhir_mapper_baseline", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _differing_fields(baseline: Dict, current: Dict) -> List[str]:
+    keys = (set(baseline) | set(current)) - set(TIMESTAMP_FIELDS)
+    return sorted(key for key in keys if baseline.get(key) != current.get(key))
+
+def run_benchmark(baseline: ModuleType, size: int = 10000, repeat: int = 5) -> List[Dict]:
+    """
+    Time mapping a size-resource Bundle with each baseline and current mapper
+    
+    Returns:
+        One row per mapper with the best per-record cost (microseconds) of the
+        baseline and the current version, and the output fields they disagree on
+    """
+    rows = []
+    for resource_type, name in BENCHMARKED:
+        old, new = getattr(baseline, name, None), getattr(fhir_mapper, name)
+        if old is None:
+            continue
+        resources = [entry["resource"] for entry in build_bundle(resource_type, size)["entry"]]
+        before = _best_of(repeat, lambda: [old(resource) for resource in resources])
+        after = _best_of(repeat, lambda: fhir_mapper.map_many(resource_type, resources, mapper=new))
+        differing = sorted({field for resource in resources[:100] for field in _differing_fields(old(resource), new(resource))})
+        rows.append({
+            "mapper": name,
+            "baseline_us": before / size * 1e6,
+            "current_us": after / size * 1e6,
+            "speedup": before / after if after else None,
+            "differing_fields": differing
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--baseline", required=True, help="Path to a baseline copy of fhir_mapper.py")
+    parser.add_argument("--size", type=int, default=10000, help="Resources per Bundle")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    args = parser.parse_args()
+    
+    print(f"{'Mapper':<36} {'baseline':>12} {'current':>12} {'speedup':>8}  differing fields")
+    for row in run_benchmark(load_baseline(args.baseline), args.size, args.repeat):
+        print(f"{row['mapper']:<36} {row['baseline_us']:>10.2f}us {row['current_us']:>10.2f}us {row['speedup']:>7.2f}x  "
+              f"{', '.join(row['differing_fields']) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""
+FHIR Paths - declarative field specs compiled into specialized mapper functions
+A spec maps each output field to a path into a FHIR resource:
+
+    "name[0].given"                          key, then list index
+    "telecom[system=email].value"            first list item whose key equals a value
+    "note[*].text"                           every list item (the field becomes a list;
+                                             an empty one counts as not present)
+    "code.text|code.coding[0].display"       alternatives, first one present wins
+
+An element of the wrong shape (a list where a key is read, an object where an
+index is taken) counts as not present. Lists of objects with several fields to
+pick each get a per-item spec, compiled and passed as the [*] field's transform.
+
+compile_spec() turns a whole spec into the source of one Python function - a
+straight run of .get() calls and guards with no throwaway {} / [] for missing
+elements - and execs it once. Compiled functions are cached by spec, so
+compiling the same spec again (e.g. on module reload) is free.
+"""
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+class Field(NamedTuple):
+    """
+    One output field of a spec
+    
+    path: FHIR path, with |-separated alternatives (None for a field that
+        always takes its default, e.g. one the data service fills in later)
+    default: Value when no alternative is present (must be immutable; paths
+        with [*] default to a new empty list; NOW is the mapping timestamp)
+    transform: Applied to the value found (to each item for paths with [*])
+    """
+    path: Optional[str]
+    default: Any = None
+    transform: Optional[Callable[[Any], Any]] = None
+
+FieldSpec = Union[str, Field]
+
+# Parsed path operations: ("key", name), ("index", n), ("where", key, value), ("all",)
+PathOp = Tuple
+
+_TOKEN = re.compile(r"(\.?)([A-Za-z_]\w*)|\[([^\]]+)\]")
+_WHERE = re.compile(r"([A-Za-z_]\w*)=(.*)")
+
+# Marks a field no alternative has matched yet (None is a legitimate default)
+_MISSING = object()
+
+# Field default standing for the mapper's now argument (the batch's timestamp), or the current time
+NOW = object()
+
+def _now() -> str:
+    return datetime.now().isoformat()
+
+def reference_id(reference: str) -> str:
+    """Id from a reference such as Patient/123 or Patient/123?x=y"""
+    return reference.split("?")[0].rsplit("/", 1)[-1]
+
+def date_only(value: str) -> str:
+    """Date part of a FHIR dateTime"""
+    return value.split("T")[0]
+
+@lru_cache(maxsize=1024)
+def parse_path(path: str) -> Tuple[PathOp, ...]:
+    """
+    Parse a single FHIR path (no | alternatives) into operations
+    
+    Raises:
+        ValueError if the path is malformed
+    """
+    ops: List[PathOp] = []
+    pos = 0
+    while pos < len(path):
+        match = _TOKEN.match(path, pos)
+        if not match or (match.group(2) and bool(match.group(1)) != (pos > 0)):
+            raise ValueError(f"Invalid FHIR path {path!r} at position {pos}")
+        if match.group(2):
+            ops.append(("key", match.group(2)))
+        else:
+            selector = match.group(3).strip()
+            where = _WHERE.fullmatch(selector)
+            if selector == "*":
+                ops.append(("all",))
+            elif where:
+                ops.append(("where", where.group(1), where.group(2)))
+            else:
+                try:
+                    ops.append(("index", int(selector)))
+                except ValueError:
+                    raise ValueError(f"Invalid FHIR path selector [{selector}] in {path!r}")
+        pos = match.end()
+    if not ops or ops[0][0] != "key":
+        raise ValueError(f"Invalid FHIR path {path!r}: must start with an element name")
+    return tuple(ops)
+
+def _field(spec: FieldSpec) -> Field:
+    return spec if isinstance(spec, Field) else Field(spec)
+
+def spec_elements(spec: Dict[str, FieldSpec]) -> Dict[str, List[str]]:
+    """Top-level FHIR elements each field of a spec reads (for _elements, see fhir_mapper.MAPPER_ELEMENTS)"""
+    return {
+        name: sorted({parse_path(alternative)[0][1] for alternative in (_field(field).path or "").split("|") if alternative})
+        for name, field in spec.items()
+    }
+
+class _Emitter:
+    """Accumulates the generated source and the constants it refers to"""
+    
+    def __init__(self):
+        self.lines: List[str] = []
+        self.constants: Dict[str, Any] = {}
+        self._counter = 0
+    
+    def name(self, prefix: str = "v") -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+    
+    def constant(self, value: Any) -> str:
+        name = f"_c{len(self.constants)}"
+        self.constants[name] = value
+        return name
+    
+    def line(self, indent: int, text: str):
+        self.lines.append("    " * indent + text)
+    
+    def path(self, ops: Tuple[PathOp, ...], var: str, indent: int, sink: Callable[[str, int], None]):
+        """Emit code walking ops from var, calling sink(expression, indent) where a value is found"""
+        if not ops:
+            sink(var, indent)
+            return
+        op, rest = ops[0], ops[1:]
+        target = self.name()
+        # Each step checks the shape it needs, so a malformed element reads as missing rather than raising
+        if op[0] == "key":
+            self.line(indent, f"{target} = {var}.get({op[1]!r}) if isinstance({var}, dict) else None")
+            self.line(indent, f"if {target} is not None:")
+            self.path(rest, target, indent + 1, sink)
+        elif op[0] == "index":
+            index = op[1]
+            bound = f"len({var}) > {index}" if index >= 0 else f"len({var}) >= {-index}"
+            self.line(indent, f"if isinstance({var}, list) and {bound}:")
+            self.line(indent + 1, f"{target} = {var}[{index}]")
+            self.line(indent + 1, f"if {target} is not None:")
+            self.path(rest, target, indent + 2, sink)
+        elif op[0] == "where":
+            self.line(indent, f"for {target} in ({var} if isinstance({var}, list) else ()):")
+            self.line(indent + 1, f"if isinstance({target}, dict) and {target}.get({op[1]!r}) == {op[2]!r}:")
+            self.path(rest, target, indent + 2, sink)
+            self.line(indent + 2, "break")
+        else:
+            items = self.name("a")
+            self.line(indent, f"{items} = []")
+            self.line(indent, f"for {target} in ({var} if isinstance({var}, list) else ()):")
+            self.path(rest, target, indent + 1, lambda value, at: self.line(at, f"{items}.append({value})"))
+            sink(items, indent)
+    
+    def field(self, target: str, field: Field):
+        """Emit code assigning field's value for the resource to the local target"""
+        if field.path is None:
+            self.line(1, f"{target} = {self._default(field.default)}")
+            return
+        alternatives = [parse_path(alternative.strip()) for alternative in field.path.split("|")]
+        transform = self.constant(field.transform) if field.transform else None
+        collects = any(op[0] == "all" for ops in alternatives for op in ops)
+        
+        def assign(value: str, indent: int):
+            self.line(indent, f"{target} = {value}")
+        
+        def convert(value: str) -> str:
+            return f"{transform}({value})" if transform else value
+        
+        self.line(1, f"{target} = _MISSING")
+        for position, ops in enumerate(alternatives):
+            indent = 1
+            if position:
+                self.line(1, f"if {target} is _MISSING:")
+                indent = 2
+            if any(op[0] == "all" for op in ops):
+                # Transform each collected item rather than the list
+                all_at = next(i for i, op in enumerate(ops) if op[0] == "all")
+                head, tail = ops[:all_at], ops[all_at + 1:]
+                self.path(head, "resource", indent, lambda value, at: self._collect(value, at, tail, target, convert))
+            else:
+                self.path(ops, "resource", indent, lambda value, at: assign(convert(value), at))
+        default = "[]" if collects and field.default is None else self._default(field.default)
+        self.line(1, f"if {target} is _MISSING:")
+        self.line(2, f"{target} = {default}")
+    
+    def _default(self, default: Any) -> str:
+        return "(now or _now())" if default is NOW else self.constant(default)
+    
+    def _collect(self, var: str, indent: int, tail: Tuple[PathOp, ...], target: str, convert: Callable[[str], str]):
+        items = self.name("a")
+        item = self.name()
+        self.line(indent, f"{items} = []")
+        self.line(indent, f"for {item} in {var}:")
+        self.path(tail, item, indent + 1, lambda value, at: self.line(at, f"{items}.append({convert(value)})"))
+        # An alternative that collects nothing leaves the next one to try
+        self.line(indent, f"if {items}:")
+        self.line(indent + 1, f"{target} = {items}")
+
+# Bounded: compile_path may be handed paths built at run time
+@lru_cache(maxsize=256)
+def _compile(name: str, fields: Tuple[Tuple[str, Field], ...]) -> Callable[..., Dict]:
+    emitter = _Emitter()
+    emitter.line(0, f"def {name}(resource, now=None):")
+    locals_ = []
+    for index, (_, field) in enumerate(fields):
+        local = f"f{index}"
+        emitter.field(local, field)
+        locals_.append(local)
+    emitter.line(1, "return {")
+    emitter.line(2, ", ".join(f"{output!r}: {local}" for (output, _), local in zip(fields, locals_)))
+    emitter.line(1, "}")
+    source = "\n".join(emitter.lines)
+    namespace = {"_MISSING": _MISSING, "_now": _now, **emitter.constants}
+    exec(compile(source, f"<fhir spec {name}>", "exec"), namespace)
+    mapper = namespace[name]
+    mapper.__source__ = source
+    return mapper
+
+def compile_spec(spec: Dict[str, FieldSpec], name: str = "map_resource") -> Callable[..., Dict]:
+    """
+    Compile a spec into a mapper function mapper(resource, now=None) -> Dict
+    
+    The signature matches the hand-written mappers in fhir_mapper, so compiled
+    mappers can go straight into MAPPERS. The generated source is
+    kept on the function as __source__.
+    
+    Raises:
+        ValueError if a path is malformed
+    """
+    return _compile(name, tuple((output, _field(field)) for output, field in spec.items()))
+
+def compile_path(path: str, default: Any = None, transform: Optional[Callable[[Any], Any]] = None) -> Callable[[Any], Any]:
+    """
+    Compile one path (with | alternatives) into a function of a resource or
+    element returning the value found, e.g. as the per-item transform of a [*] field
+    
+    Raises:
+        ValueError if the path is malformed
+    """
+    mapper = _compile("path_value", (("value", Field(path, default, transform)),))
+    return lambda element: mapper(element)["value"]
@@ -0,0 +1,240 @@
+"""
+FHIR Rate Limiting - client-side token buckets per host and per resource type
+Requests wait for a token instead of failing, in arrival order, and a 429's
+Retry-After pauses the whole host. Shared by the sync and async FHIR clients.
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+from backend.app.config import (
+    FHIR_RATE_LIMIT_ENABLED,
+    FHIR_RATE_LIMIT_HOST_RPS,
+    FHIR_RATE_LIMIT_HOST_BURST,
+    FHIR_RATE_LIMIT_TYPE_RPS,
+    FHIR_RATE_LIMIT_TYPE_BURST,
+    FHIR_RATE_LIMIT_MAX_PAUSE
+)
+
+# Pause applied to a host when a 429 carries no usable Retry-After
+DEFAULT_THROTTLE_PAUSE = 1.0
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations instead of rejecting requests
+    
+    Tokens may go negative: each caller takes one and is told how long to wait
+    for it, so callers are served first come, first served.
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+    
+    def reserve(self) -> float:
+        """Take a token, returning the seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens -= 1
+            # Tokens only start refilling once a pause is over, so the debt is counted from there
+            return max(self.paused_until - now, 0.0) + max(-self.tokens, 0.0) / self.rate
+    
+    def pause(self, seconds: float):
+        """Hand out no tokens for seconds, then refill from empty"""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = min(self.tokens, 0.0)
+            self.updated = max(self.updated, self.paused_until)
+    
+    def pause_remaining(self) -> float:
+        """Seconds left of a pause imposed after a caller's reservation was made"""
+        with self._lock:
+            return max(0.0, self.paused_until - time.monotonic())
+
+
+class QueueStats:
+    """Queue wait times and throttling counts for one bucket"""
+    
+    def __init__(self, window: int = 500):
+        self.requests = 0
+        self.queued = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._waits = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.requests += 1
+            if seconds > 0:
+                self.queued += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self._waits.append(seconds)
+    
+    def record_throttle(self):
+        with self._lock:
+            self.throttled += 1
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            ordered = sorted(self._waits)
+            requests, queued, throttled = self.requests, self.queued, self.throttled
+            total_wait, max_wait = self.total_wait, self.max_wait
+        
+        def pct(p: float) -> Optional[float]:
+            return round(ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))] * 1000, 1) if ordered else None
+        
+        return {
+            "requests": requests,
+            "queued": queued,
+            "throttled": throttled,
+            "wait_p50_ms": pct(50),
+            "wait_p95_ms": pct(95),
+            "wait_max_ms": round(max_wait * 1000, 1),
+            "wait_total_s": round(total_wait, 3)
+        }
+
+
+class RateLimiter:
+    """Host and resource-type buckets; a request waits for a token from both"""
+    
+    def __init__(
+        self,
+        host_rate: float = FHIR_RATE_LIMIT_HOST_RPS,
+        host_burst: int = FHIR_RATE_LIMIT_HOST_BURST,
+        type_rate: float = FHIR_RATE_LIMIT_TYPE_RPS,
+        type_burst: int = FHIR_RATE_LIMIT_TYPE_BURST,
+        enabled: bool = FHIR_RATE_LIMIT_ENABLED
+    ):
+        self.host_rate = host_rate
+        self.host_burst = host_burst
+        self.type_rate = type_rate
+        self.type_burst = type_burst
+        self.enabled = enabled
+        self._buckets: Dict[Tuple[str, str], Tuple[TokenBucket, QueueStats]] = {}
+        self._lock = threading.Lock()
+    
+    def _bucket(self, host: str, resource_type: Optional[str] = None) -> Tuple[TokenBucket, QueueStats]:
+        """Get (creating on first use) the host bucket, or the host's bucket for one resource type"""
+        key = (host, resource_type or "")
+        with self._lock:
+            entry = self._buckets.get(key)
+            if entry is None:
+                if resource_type:
+                    entry = (TokenBucket(self.type_rate, self.type_burst), QueueStats())
+                else:
+                    entry = (TokenBucket(self.host_rate, self.host_burst), QueueStats())
+                self._buckets[key] = entry
+            return entry
+    
+    def _reserve(self, host: str, resource_type: Optional[str]) -> Tuple[float, list]:
+        entries = [self._bucket(host)]
+        if resource_type:
+            entries.append(self._bucket(host, resource_type))
+        return max(bucket.reserve() for bucket, _ in entries), entries
+    
+    def _remaining(self, entries: list) -> float:
+        return max(bucket.pause_remaining() for bucket, _ in entries)
+    
+    def _record(self, entries: list, waited: float):
+        for _, stats in entries:
+            stats.record_wait(waited)
+    
+    def acquire(self, host: str, resource_type: Optional[str] = None) -> float:
+        """Block until a request to host (for resource_type) may be sent, returning the seconds waited"""
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        delay, entries = self._reserve(host, resource_type)
+        while delay > 0:
+            time.sleep(delay)
+            # A 429 may have paused the host while this request was queued
+            delay = self._remaining(entries)
+        waited = time.monotonic() - started
+        self._record(entries, waited)
+        return waited
+    
+    async def acquire_async(self, host: str, resource_type: Optional[str] = None) -> float:
+        """Like acquire, but waits without blocking the event loop"""
+        if not self.enabled:
+            return 0.0
+        started = time.monotonic()
+        delay, entries = self._reserve(host, resource_type)
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._remaining(entries)
+        waited = time.monotonic() - started
+        self._record(entries, waited)
+        return waited
+    
+    def throttle(self, host: str, retry_after: Optional[str] = None) -> float:
+        """
+        Pause every request to host after a 429
+        
+        Returns:
+            Seconds the host is paused for (Retry-After capped at FHIR_RATE_LIMIT_MAX_PAUSE)
+        """
+        seconds = parse_retry_after(retry_after)
+        if seconds is None:
+            seconds = DEFAULT_THROTTLE_PAUSE
+        seconds = min(seconds, FHIR_RATE_LIMIT_MAX_PAUSE)
+        bucket, stats = self._bucket(host)
+        bucket.pause(seconds)
+        stats.record_throttle()
+        return seconds
+    
+    def snapshot(self) -> Dict[str, Dict]:
+        """Queue-wait metrics keyed by host, with per-resource-type buckets nested under "types" """
+        with self._lock:
+            buckets = dict(self._buckets)
+        stats: Dict[str, Dict] = {}
+        for (host, resource_type), (bucket, queue) in sorted(buckets.items()):
+            entry = stats.setdefault(host, {"types": {}})
+            snapshot = {"rate": bucket.rate, "burst": bucket.burst, **queue.snapshot()}
+            if resource_type:
+                entry["types"][resource_type] = snapshot
+            else:
+                entry.update(snapshot)
+        return stats
+
+
+rate_limiter = RateLimiter()
+
+def get_rate_limit_stats() -> Dict[str, Dict]:
+    """Queue wait times and 429 counts for every FHIR host and resource type seen so far"""
+    return rate_limiter.snapshot()
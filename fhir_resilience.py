@@ -0,0 +1,173 @@
+"""
+FHIR Resilience - retries, per-host circuit breakers and hedged-read timing
+Shared by the sync and async FHIR clients; the transport-specific request
+loops live in fhir_client.
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from backend.app.config import (
+    FHIR_RETRY_MAX,
+    FHIR_RETRY_BASE_DELAY,
+    FHIR_RETRY_MAX_DELAY,
+    FHIR_BREAKER_FAILURE_THRESHOLD,
+    FHIR_BREAKER_RESET_SECONDS,
+    FHIR_HEDGE_ENABLED,
+    FHIR_HEDGE_PERCENTILE,
+    FHIR_HEDGE_MIN_SAMPLES
+)
+
+# Upstream statuses worth retrying (throttling / gateway / brownout)
+RETRYABLE_STATUS = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "PUT", "DELETE", "OPTIONS"}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while the host's circuit breaker is open"""
+
+
+class RetryPolicy:
+    def __init__(self, max_retries: int = FHIR_RETRY_MAX, base_delay: float = FHIR_RETRY_BASE_DELAY, max_delay: float = FHIR_RETRY_MAX_DELAY):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+    
+    def delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """
+        Seconds to wait before retry number attempt (0-based)
+        
+        Uses "full jitter" exponential backoff so retries from many workers do
+        not arrive in lockstep; a numeric Retry-After header takes precedence.
+        """
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = FHIR_BREAKER_FAILURE_THRESHOLD, reset_seconds: float = FHIR_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow(self) -> bool:
+        """Whether a request may be sent now (one trial request is let through once reset_seconds pass)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+    
+    def abandon(self):
+        """
+        Give back a trial request that ended without a verdict on the host
+        (cancelled, or cut short by our own deadline) so the next one may try
+        """
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+    
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+    
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency at pct (0-100) over the recent window, or None with too few samples"""
+        with self._lock:
+            if len(self._samples) < FHIR_HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(len(ordered) * pct / 100))
+        return ordered[index]
+
+
+class HostResilience:
+    """Breaker, latency window and counters for one FHIR host"""
+    
+    def __init__(self):
+        self.breaker = CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.counters = {"requests": 0, "retries": 0, "failures": 0, "short_circuited": 0, "hedged": 0, "hedge_wins": 0}
+        self._lock = threading.Lock()
+    
+    def count(self, name: str, amount: int = 1):
+        with self._lock:
+            self.counters[name] += amount
+    
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait before sending a hedged duplicate read (None disables hedging)"""
+        if not FHIR_HEDGE_ENABLED:
+            return None
+        return self.latency.percentile(FHIR_HEDGE_PERCENTILE)
+    
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "circuit_state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "p50_latency_ms": _ms(self.latency.percentile(50)),
+            "p95_latency_ms": _ms(self.latency.percentile(95)),
+            **counters
+        }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 1) if seconds is not None else None
+
+
+retry_policy = RetryPolicy()
+_hosts: Dict[str, HostResilience] = {}
+_hosts_lock = threading.Lock()
+
+def for_host(host: str) -> HostResilience:
+    """Get (creating on first use) the resilience state for a FHIR host"""
+    with _hosts_lock:
+        state = _hosts.get(host)
+        if state is None:
+            state = HostResilience()
+            _hosts[host] = state
+        return state
+
+def get_resilience_stats() -> Dict[str, Dict]:
+    """Breaker state, latency and retry/failure counters for every FHIR host seen so far"""
+    with _hosts_lock:
+        hosts = dict(_hosts)
+    return {host: state.snapshot() for host, state in hosts.items()}
@@ -0,0 +1,306 @@
+"""
+FHIR Store - Local copy of FHIR resources for bulk ingest and offline reads
+Backed by SQLite so an interrupted bulk ingest can resume where it stopped.
+"""
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Dict, Optional, Iterable, Tuple
+from backend.app.config import FHIR_STORE_PATH
+from backend.app.services.compact_records import to_record
+from backend.app.services.fhir_json import loads
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS resources (
+    resource_type TEXT NOT NULL,
+    id TEXT NOT NULL,
+    resource TEXT NOT NULL,
+    record TEXT,
+    last_updated TEXT,
+    PRIMARY KEY (resource_type, id)
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    resource_type TEXT PRIMARY KEY,
+    high_water TEXT,
+    last_success REAL,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS export_jobs (
+    status_url TEXT PRIMARY KEY,
+    resource_types TEXT,
+    since TEXT,
+    manifest TEXT,
+    transaction_time TEXT,
+    state TEXT NOT NULL,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS export_files (
+    status_url TEXT NOT NULL,
+    url TEXT NOT NULL,
+    resource_type TEXT,
+    lines_done INTEGER NOT NULL DEFAULT 0,
+    done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (status_url, url)
+);
+"""
+
+# A row to upsert: (id, raw FHIR resource, mapped record or None, meta.lastUpdated)
+StoreRow = Tuple[str, Dict, Optional[Dict], Optional[str]]
+
+class FHIRStore:
+    """
+    Resources keyed by (type, id), holding both the raw FHIR resource and the
+    fhir_mapper record built from it, plus bulk-export checkpoints
+    """
+    
+    def __init__(self, path: str = FHIR_STORE_PATH):
+        """
+        Initialize the store
+        
+        Args:
+            path: SQLite database file (":memory:" keeps it in-process only)
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+    
+    def get(self, resource_type: str, resource_id: str) -> Optional[Dict]:
+        """Get the mapped record for a resource (a compact record where the type has one), or None if it is not stored"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT record FROM resources WHERE resource_type = ? AND id = ?", (resource_type, resource_id)
+            ).fetchone()
+        return to_record(resource_type, loads(row[0])) if row and row[0] else None
+    
+    def get_resource(self, resource_type: str, resource_id: str) -> Optional[Dict]:
+        """Get the raw FHIR resource, or None if it is not stored"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT resource FROM resources WHERE resource_type = ? AND id = ?", (resource_type, resource_id)
+            ).fetchone()
+        return loads(row[0]) if row else None
+    
+    def all(self, resource_type: str, limit: Optional[int] = None, offset: int = 0) -> List[Dict]:
+        """Get mapped records of a type in ID order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT record FROM resources WHERE resource_type = ? AND record IS NOT NULL ORDER BY id LIMIT ? OFFSET ?",
+                (resource_type, -1 if limit is None else limit, offset)
+            ).fetchall()
+        return [to_record(resource_type, loads(row[0])) for row in rows]
+    
+    def all_resources(self, resource_type: str) -> List[Dict]:
+        """Get every raw FHIR resource of a type in ID order"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT resource FROM resources WHERE resource_type = ? ORDER BY id", (resource_type,)
+            ).fetchall()
+        return [loads(row[0]) for row in rows]
+    
+    def find(self, resource_type: str, path: str, value: str, mapped: bool = False) -> List[Dict]:
+        """
+        Get resources whose raw JSON value at path equals value
+        
+        Args:
+            resource_type: FHIR resource type
+            path: SQLite JSON path such as "$.organization.reference"
+            value: Value to match
+            mapped: Return the mapped records instead of the raw resources
+        """
+        column = "record" if mapped else "resource"
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {column} FROM resources WHERE resource_type = ? AND json_extract(resource, ?) = ? ORDER BY id",
+                (resource_type, path, value)
+            ).fetchall()
+        return [to_record(resource_type, loads(row[0])) if mapped else loads(row[0]) for row in rows if row[0]]
+    
+    def find_coded(self, resource_type: str, path: str, code: str, mapped: bool = False) -> List[Dict]:
+        """
+        Get resources with a coding of code anywhere in the CodeableConcept list at path
+        
+        Args:
+            resource_type: FHIR resource type
+            path: SQLite JSON path of a CodeableConcept list such as "$.type"
+            code: Code to match
+            mapped: Return the mapped records instead of the raw resources
+        """
+        column = "record" if mapped else "resource"
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT {column} FROM resources WHERE resource_type = ? AND EXISTS (
+                        SELECT 1 FROM json_each(resources.resource, ?) AS concept, json_each(concept.value, '$.coding') AS coding
+                        WHERE json_extract(coding.value, '$.code') = ?
+                    ) ORDER BY id""",
+                (resource_type, path, code)
+            ).fetchall()
+        return [to_record(resource_type, loads(row[0])) if mapped else loads(row[0]) for row in rows if row[0]]
+    
+    def versions(self, resource_type: str, resource_ids: Iterable[str]) -> Dict[str, Tuple[Optional[str], Optional[str]]]:
+        """(meta.versionId, meta.lastUpdated) of the stored resources among resource_ids"""
+        resource_ids = list(resource_ids)
+        if not resource_ids:
+            return {}
+        placeholders = ",".join("?" * len(resource_ids))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, json_extract(resource, '$.meta.versionId'), last_updated FROM resources "
+                f"WHERE resource_type = ? AND id IN ({placeholders})",
+                (resource_type, *resource_ids)
+            ).fetchall()
+        return {row[0]: (row[1], row[2]) for row in rows}
+    
+    def count(self, resource_type: Optional[str] = None) -> int:
+        """Number of stored resources (of one type, or in total)"""
+        with self._lock:
+            if resource_type:
+                row = self._conn.execute("SELECT COUNT(*) FROM resources WHERE resource_type = ?", (resource_type,)).fetchone()
+            else:
+                row = self._conn.execute("SELECT COUNT(*) FROM resources").fetchone()
+        return row[0]
+    
+    def upsert_many(self, resource_type: str, rows: Iterable[StoreRow]):
+        """Insert or replace resources of one type in a single transaction"""
+        with self._lock, self._conn:
+            self._upsert(resource_type, rows)
+    
+    def delete(self, resource_type: str, resource_id: str) -> bool:
+        """Remove a resource, returning whether it was stored"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM resources WHERE resource_type = ? AND id = ?", (resource_type, resource_id))
+        return cursor.rowcount > 0
+    
+    def _upsert(self, resource_type: str, rows: Iterable[StoreRow]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO resources (resource_type, id, resource, record, last_updated) VALUES (?, ?, ?, ?, ?)",
+            [
+                (resource_type, resource_id, json.dumps(resource), json.dumps(record) if record is not None else None, last_updated)
+                for resource_id, resource, record, last_updated in rows
+            ]
+        )
+    
+    # Incremental sync state
+    
+    def apply_changes(self, resource_type: str, upserts: List[StoreRow], deletes: List[str], high_water: Optional[str]):
+        """Apply a sync delta and advance the type's high-water mark in one transaction"""
+        with self._lock, self._conn:
+            self._upsert(resource_type, upserts)
+            self._conn.executemany(
+                "DELETE FROM resources WHERE resource_type = ? AND id = ?", [(resource_type, resource_id) for resource_id in deletes]
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (resource_type, high_water, last_success, last_error) VALUES (?, ?, ?, NULL)",
+                (resource_type, high_water, time.time())
+            )
+    
+    def record_sync_error(self, resource_type: str, error: str):
+        """Remember why the last sync of a type failed, keeping its high-water mark"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR IGNORE INTO sync_state (resource_type) VALUES (?)", (resource_type,))
+            self._conn.execute("UPDATE sync_state SET last_error = ? WHERE resource_type = ?", (error, resource_type))
+    
+    def sync_state(self, resource_type: str) -> Optional[Dict]:
+        """Get high_water, last_success (epoch seconds) and last_error for a synced type"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT high_water, last_success, last_error FROM sync_state WHERE resource_type = ?", (resource_type,)
+            ).fetchone()
+        if not row:
+            return None
+        return {"high_water": row[0], "last_success": row[1], "last_error": row[2]}
+    
+    def is_synced(self, resource_type: str) -> bool:
+        """Whether a type has completed at least one full sync, so reads can be served locally"""
+        state = self.sync_state(resource_type)
+        return bool(state and state["last_success"])
+    
+    # Bulk export checkpoints
+    
+    def begin_export(self, status_url: str, resource_types: Optional[List[str]], since: Optional[str]):
+        """Record a kicked-off $export so it can be resumed after a restart"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO export_jobs (status_url, resource_types, since, state, started_at) VALUES (?, ?, ?, 'pending', ?)",
+                (status_url, ",".join(sorted(resource_types or [])), since, time.time())
+            )
+    
+    def unfinished_export(self, resource_types: Optional[List[str]], since: Optional[str]) -> Optional[Dict]:
+        """
+        Get the most recent $export with these parameters that has not finished
+        ingesting, if any (an export of other types or another _since is not
+        a substitute for the one asked for)
+        """
+        wanted = sorted(resource_types or [])
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status_url, resource_types, since, manifest FROM export_jobs WHERE state NOT IN ('done', 'abandoned') ORDER BY started_at DESC"
+            ).fetchall()
+        for status_url, types, job_since, manifest in rows:
+            if sorted(types.split(",") if types else []) == wanted and job_since == since:
+                return {
+                    "status_url": status_url,
+                    "resource_types": types.split(",") if types else None,
+                    "since": job_since,
+                    "manifest": loads(manifest) if manifest else None
+                }
+        return None
+    
+    def save_manifest(self, status_url: str, manifest: Dict):
+        """Record the completed export's manifest and the files still to ingest"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE export_jobs SET manifest = ?, transaction_time = ?, state = 'ready' WHERE status_url = ?",
+                (json.dumps(manifest), manifest.get("transactionTime"), status_url)
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO export_files (status_url, url, resource_type) VALUES (?, ?, ?)",
+                [(status_url, output["url"], output.get("type")) for output in manifest.get("output", [])]
+            )
+    
+    def file_progress(self, status_url: str, url: str) -> Tuple[int, bool]:
+        """Get (lines already ingested, finished) for one export file"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT lines_done, done FROM export_files WHERE status_url = ? AND url = ?", (status_url, url)
+            ).fetchone()
+        return (row[0], bool(row[1])) if row else (0, False)
+    
+    def ingest(self, status_url: str, url: str, resource_type: str, rows: List[StoreRow], lines_done: int, done: bool = False):
+        """Upsert a batch from an export file and advance its checkpoint atomically"""
+        with self._lock, self._conn:
+            self._upsert(resource_type, rows)
+            self._conn.execute(
+                "UPDATE export_files SET lines_done = ?, done = ? WHERE status_url = ? AND url = ?",
+                (lines_done, int(done), status_url, url)
+            )
+    
+    def abandon_export(self, status_url: str):
+        """Mark an export that can no longer be resumed (its status URL failed), so unfinished_export skips it"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE export_jobs SET state = 'abandoned' WHERE status_url = ?", (status_url,))
+    
+    def finish_export(self, status_url: str) -> Optional[str]:
+        """Mark an export fully ingested, returning its transactionTime"""
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE export_jobs SET state = 'done' WHERE status_url = ?", (status_url,))
+            row = self._conn.execute("SELECT transaction_time FROM export_jobs WHERE status_url = ?", (status_url,)).fetchone()
+        return row[0] if row else None
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+# Global store instance
+_store: Optional[FHIRStore] = None
+
+def get_store() -> FHIRStore:
+    """Get or create the global local FHIR store"""
+    global _store
+    if _store is None:
+        _store = FHIRStore()
+    return _store
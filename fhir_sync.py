@@ -0,0 +1,302 @@
+"""
+FHIR Sync - Incremental sync of catalog resources into the local FHIR store
+A background worker keeps a high-water mark per resource type, pulls only the
+changes since it (_history?_since=, or _lastUpdated=gt when the server keeps no
+history) and applies upserts and deletes to the local store and response cache.
+"""
+import threading
+import time
+import requests
+from datetime import datetime, timezone
+from typing import Callable, List, Dict, Optional, Tuple
+from backend.app.config import FHIR_SYNC_TYPES, FHIR_SYNC_INTERVAL, FHIR_SYNC_PAGE_SIZE
+from backend.app.services.fhir_client import FHIRClient, get_fhir_client
+from backend.app.services.fhir_store import FHIRStore, StoreRow, get_store
+from backend.app.services.fhir_bulk import BulkExportError, run_export, to_store_row
+from backend.app.services.fhir_data_service import invalidate_cache
+
+# Statuses meaning the server does not offer type-level _history
+_HISTORY_UNSUPPORTED = {400, 404, 405, 501}
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _instant(value: Optional[str]) -> Optional[datetime]:
+    """Parse a FHIR instant (e.g. 2024-05-01T10:00:00.123+00:00 or ...Z)"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def _last_updated(entry: Dict) -> Optional[str]:
+    """When a history/search entry changed (deletes carry it on the response only)"""
+    resource = entry.get("resource") or {}
+    return resource.get("meta", {}).get("lastUpdated") or entry.get("response", {}).get("lastModified")
+
+def _entry_id(entry: Dict) -> Optional[str]:
+    """Resource ID of a history entry, including deletes that carry no resource"""
+    resource = entry.get("resource")
+    if resource and resource.get("id"):
+        return resource["id"]
+    # "Practitioner/123", "Practitioner/123/_history/2" or an absolute fullUrl
+    url = entry.get("request", {}).get("url") or entry.get("fullUrl") or ""
+    parts = url.split("?")[0].rstrip("/").split("/")
+    if "_history" in parts:
+        parts = parts[:parts.index("_history")]
+    return parts[-1] if parts and parts[-1] else None
+
+def _high_water(entries: List[Dict], current: Optional[str]) -> Optional[str]:
+    """Latest change instant among entries, never moving backwards from current"""
+    latest, latest_value = _instant(current), current
+    for entry in entries:
+        value = _last_updated(entry)
+        parsed = _instant(value)
+        if parsed and (latest is None or parsed > latest):
+            latest, latest_value = parsed, value
+    return latest_value
+
+def _version(entry: Dict) -> Optional[str]:
+    return ((entry.get("resource") or {}).get("meta") or {}).get("versionId")
+
+def _is_delete(entry: Dict) -> bool:
+    return entry.get("request", {}).get("method") == "DELETE" or not entry.get("resource")
+
+def unseen_changes(entries: List[Dict], since: Optional[str],
+                   stored_versions: Callable[[List[str]], Dict[str, Tuple[Optional[str], Optional[str]]]]) -> List[Dict]:
+    """
+    Drop entries at or before since that the store already reflects
+    
+    _history?_since= is inclusive, so every poll returns the changes made at
+    the high-water instant again. Those are skipped when the stored resource
+    has the entry's versionId (or lastUpdated, for servers without versions),
+    or is absent for a delete; a different change made in the same instant is kept.
+    
+    Args:
+        stored_versions: Looks up (versionId, lastUpdated) of stored resources
+            by ID, e.g. a bound FHIRStore.versions
+    """
+    boundary = _instant(since)
+    if boundary is None:
+        return entries
+    
+    def at_boundary(entry: Dict) -> bool:
+        changed = _instant(_last_updated(entry))
+        return changed is not None and changed <= boundary
+    
+    candidates = [entry for entry in entries if at_boundary(entry) and _entry_id(entry)]
+    if not candidates:
+        return entries
+    stored = stored_versions(list({_entry_id(entry) for entry in candidates}))
+    
+    def applied(entry: Dict) -> bool:
+        if not at_boundary(entry):
+            return False
+        state = stored.get(_entry_id(entry))
+        if _is_delete(entry):
+            return state is None
+        if state is None:
+            return False
+        version = _version(entry)
+        return version == state[0] if version is not None else _last_updated(entry) == state[1]
+    
+    return [entry for entry in entries if not applied(entry)]
+
+def collapse_changes(entries: List[Dict]) -> Tuple[List[StoreRow], List[str]]:
+    """
+    Reduce history entries to the final state of each resource
+    
+    Servers list history newest first and may return several versions of one
+    resource, so entries are replayed oldest first and the last one wins.
+    
+    Returns:
+        (rows to upsert, IDs to delete)
+    """
+    epoch = datetime.min.replace(tzinfo=timezone.utc)
+    ordered = sorted(entries, key=lambda entry: _instant(_last_updated(entry)) or epoch)
+    final = {}
+    for entry in ordered:
+        resource_id = _entry_id(entry)
+        if resource_id:
+            final[resource_id] = entry
+    
+    upserts, deletes = [], []
+    now = datetime.now().isoformat()
+    for resource_id, entry in final.items():
+        if _is_delete(entry):
+            deletes.append(resource_id)
+        else:
+            upserts.append(to_store_row(entry["resource"], now))
+    return upserts, deletes
+
+class FHIRSyncWorker:
+    """Background thread that keeps the local store in step with the FHIR server"""
+    
+    def __init__(
+        self,
+        resource_types: List[str] = None,
+        interval: float = FHIR_SYNC_INTERVAL,
+        client: Optional[FHIRClient] = None,
+        store: Optional[FHIRStore] = None,
+        page_size: int = FHIR_SYNC_PAGE_SIZE
+    ):
+        """
+        Initialize sync worker
+        
+        Args:
+            resource_types: Types to mirror locally (defaults to FHIR_SYNC_TYPES)
+            interval: Seconds between delta polls
+            client: FHIR client (defaults to the global one)
+            store: Local store (defaults to the global one)
+            page_size: _count for history/search pages
+        """
+        self.resource_types = list(resource_types or FHIR_SYNC_TYPES)
+        self.interval = interval
+        self.client = client or get_fhir_client()
+        self.store = store or get_store()
+        self.page_size = page_size
+        self._history_supported: Dict[str, bool] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start polling in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="fhir-sync", daemon=True)
+        self._thread.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop polling, waiting up to timeout for an in-progress sync to finish"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self.sync_once()
+            self._stop.wait(self.interval)
+    
+    def sync_once(self) -> Dict[str, int]:
+        """
+        Bring every type up to date once, bootstrapping types never synced before
+        
+        Returns:
+            Dictionary of resource type -> number of resources upserted or deleted
+        """
+        unsynced = [t for t in self.resource_types if not self.store.is_synced(t)]
+        if unsynced:
+            self._bootstrap(unsynced)
+        
+        changed = {}
+        for resource_type in self.resource_types:
+            if resource_type in unsynced:
+                continue
+            try:
+                changed[resource_type] = self._sync_type(resource_type)
+            except Exception as e:
+                print(f"FHIR sync error for {resource_type}: {e}")
+                self.store.record_sync_error(resource_type, str(e))
+        return changed
+    
+    def _bootstrap(self, resource_types: List[str]):
+        """Initial full load: Bulk $export when the server offers it, otherwise paged search"""
+        started = _now()
+        try:
+            summary = run_export(resource_types, client=self.client, store=self.store)
+            for resource_type in resource_types:
+                self.store.apply_changes(resource_type, [], [], summary["transaction_time"] or started)
+                invalidate_cache(resource_type)
+            return
+        except BulkExportError as e:
+            print(f"FHIR $export unavailable, loading by search instead: {e}")
+        
+        for resource_type in resource_types:
+            try:
+                self._load_by_search(resource_type)
+            except Exception as e:
+                print(f"FHIR sync error for {resource_type}: {e}")
+                self.store.record_sync_error(resource_type, str(e))
+    
+    def _load_by_search(self, resource_type: str):
+        """Page through every resource of a type into the store"""
+        started = _now()
+        high_water = None
+        for bundle in self.client.iter_pages(f"{self.client.base_url}/{resource_type}", {"_count": self.page_size}):
+            page = [entry for entry in bundle.get("entry", []) if entry.get("resource")]
+            now = datetime.now().isoformat()
+            self.store.upsert_many(resource_type, [to_store_row(entry["resource"], now) for entry in page])
+            high_water = _high_water(page, high_water)
+        # Resources without meta.lastUpdated fall back to the load's start time
+        self.store.apply_changes(resource_type, [], [], high_water or started)
+        invalidate_cache(resource_type)
+    
+    def _sync_type(self, resource_type: str) -> int:
+        """Apply the changes since the type's high-water mark"""
+        since = self.store.sync_state(resource_type)["high_water"]
+        entries = None
+        if self._history_supported.get(resource_type, True):
+            try:
+                entries = self.client.history(resource_type, since, self.page_size)
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code not in _HISTORY_UNSUPPORTED:
+                    raise
+                self._history_supported[resource_type] = False
+        
+        if entries is None:
+            # Search cannot see deletes; they are picked up by the next full load
+            params = {"_count": self.page_size}
+            if since:
+                params["_lastUpdated"] = f"gt{since}"
+            entries = [entry for bundle in self.client.iter_pages(f"{self.client.base_url}/{resource_type}", params)
+                       for entry in bundle.get("entry", []) if entry.get("resource")]
+        
+        entries = unseen_changes(entries, since, lambda ids: self.store.versions(resource_type, ids))
+        upserts, deletes = collapse_changes(entries)
+        self.store.apply_changes(resource_type, upserts, deletes, _high_water(entries, since))
+        if upserts or deletes:
+            invalidate_cache(resource_type)
+        return len(upserts) + len(deletes)
+    
+    def status(self) -> Dict[str, Dict]:
+        """
+        Per-type sync state
+        
+        lag_seconds is the time since the type was last confirmed up to date, an
+        upper bound on how stale locally served reads can be.
+        """
+        now = time.time()
+        status = {}
+        for resource_type in self.resource_types:
+            state = self.store.sync_state(resource_type) or {}
+            last_success = state.get("last_success")
+            status[resource_type] = {
+                "high_water": state.get("high_water"),
+                "lag_seconds": round(now - last_success, 3) if last_success else None,
+                "last_error": state.get("last_error"),
+                "resources": self.store.count(resource_type)
+            }
+        return status
+
+# Global worker instance
+_worker: Optional[FHIRSyncWorker] = None
+
+def start_sync_worker() -> FHIRSyncWorker:
+    """Create (once) and start the global sync worker"""
+    global _worker
+    if _worker is None:
+        _worker = FHIRSyncWorker()
+    _worker.start()
+    return _worker
+
+def stop_sync_worker():
+    """Stop the global sync worker if it is running"""
+    if _worker is not None:
+        _worker.stop()
+
+def get_sync_status() -> Dict[str, Dict]:
+    """Sync state and lag per resource type ({} when sync is not running)"""
+    return _worker.status() if _worker is not None else {}
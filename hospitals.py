@@ -1,11 +1,26 @@
 from fastapi import APIRouter, HTTPException, Query
 from backend.app.services.data_service_router import (
-    get_all_hospitals, get_hospital, search_hospitals,
+    get_hospital, search_hospitals,
     create_hospital, update_hospital, delete_hospital,
-    get_bed_availability, get_all_bed_availability, update_bed_availability
+    get_bed_availability, get_all_bed_availability, update_bed_availability,
+    get_doctors_by_hospital, count_patients
 )
+from backend.app.services.fhir_data_service import get_medical_records_async
 from backend.app.models.hospital import HospitalCreate, HospitalUpdate
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
+import asyncio
+
+# Fields the hospital detail screen renders; everything else stays server-side
+DETAIL_HOSPITAL_FIELDS = ("id", "name", "address", "city", "state", "phone", "emergency_phone", "hospital_type",
+                          "total_beds", "icu_beds", "specialties", "facilities", "operating_hours")
+DETAIL_DOCTOR_FIELDS = ("id", "first_name", "last_name", "specialization", "qualification", "phone", "email",
+                        "department", "availability")
+DETAIL_RECORD_FIELDS = ("id", "patient_id", "patient_name", "encounter_type", "timestamp", "status")
+DETAIL_RECENT_RECORDS = 20
+
+def _sparse(item: dict, fields) -> dict:
+    return {field: item.get(field) for field in fields if field in item}
 
 router = APIRouter(prefix="/hospitals", tags=["hospitals"])
 
@@ -26,6 +41,35 @@ def get_hospital_by_id(hospital_id: str):
         raise HTTPException(status_code=404, detail="Hospital not found")
     return hospital
 
+@router.get("/{hospital_id}/detail", response_model=dict)
+async def get_hospital_detail(hospital_id: str):
+    """
+    Get everything the hospital detail screen shows in one request: the
+    hospital, its doctors, bed availability, recent medical records and a
+    patient count, gathered concurrently with only the fields it renders
+    """
+    # An unknown hospital is a 404 before anything else is fetched
+    hospital = await run_in_threadpool(get_hospital, hospital_id)
+    if not hospital:
+        raise HTTPException(status_code=404, detail="Hospital not found")
+    
+    doctors, beds, patient_count, records = await asyncio.gather(
+        run_in_threadpool(get_doctors_by_hospital, hospital_id),
+        run_in_threadpool(get_bed_availability, hospital_id),
+        run_in_threadpool(count_patients),
+        get_medical_records_async(hospital_id=hospital_id, limit=DETAIL_RECENT_RECORDS, newest_first=True)
+    )
+    
+    # The server already sorted newest first; sorting again covers servers that ignore _sort
+    recent = sorted(records, key=lambda record: record.get("timestamp") or "", reverse=True)[:DETAIL_RECENT_RECORDS]
+    return {
+        "hospital": _sparse(hospital, DETAIL_HOSPITAL_FIELDS),
+        "doctors": [_sparse(doctor, DETAIL_DOCTOR_FIELDS) for doctor in doctors],
+        "beds": beds,
+        "records": [_sparse(record, DETAIL_RECORD_FIELDS) for record in recent],
+        "patient_count": patient_count
+    }
+
 @router.post("/", response_model=dict)
 def create_new_hospital(hospital: HospitalCreate):
     """Create a new hospital"""
@@ -1,23 +1,52 @@
-from fastapi import APIRouter, HTTPException, Query
-from backend.app.services.fhir_data_service import get_insurance_claims, get_coverage_rules
+from fastapi import APIRouter, HTTPException, Query, Response
+from backend.app.config import FHIR_REQUEST_BUDGET
+from backend.app.services.fhir_data_service import (
+    page_insurance_claims_async, page_coverage_rules_async, InvalidCursor, InvalidFields, page_headers, parse_fields
+)
+from backend.app.services.fhir_deadline import request_budget
 from typing import List, Optional
 
 router = APIRouter(prefix="/insurance", tags=["insurance"])
 
 @router.get("/claims", response_model=List[dict])
-def get_claims(
-    hospital_id: Optional[str] = Query(None, description="Filter by hospital ID")
+async def get_claims(
+    response: Response,
+    hospital_id: Optional[str] = Query(None, description="Filter by hospital ID"),
+    limit: Optional[int] = Query(100, description="Maximum number of claims to return", ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)")
 ):
-    """Get all insurance claims from FHIR server, optionally filtered by hospital"""
-    return get_insurance_claims(hospital_id=hospital_id)
+    """
+    Get insurance claims from FHIR server, optionally filtered by hospital
+    X-Next-Cursor fetches the next page; fields= computes and returns only the listed fields
+    """
+    try:
+        with request_budget(FHIR_REQUEST_BUDGET):
+            page = await page_insurance_claims_async(hospital_id=hospital_id, limit=limit, cursor=cursor,
+                                                     fields=parse_fields(fields))
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers.update(page_headers(page))
+    return page.items
 
 @router.get("/coverage-rules", response_model=List[dict])
-def get_coverage_rules_endpoint(
-    limit: Optional[int] = Query(20, description="Maximum number of coverage rules to return", ge=1, le=50)
+async def get_coverage_rules_endpoint(
+    response: Response,
+    limit: Optional[int] = Query(20, description="Maximum number of coverage rules to return", ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page")
 ):
-    """Get insurance coverage rules from FHIR server (limited to 20 by default for performance)"""
+    """
+    Get insurance coverage rules from FHIR server (limited to 20 by default for performance)
+    If the FHIR server is slow, returns what arrived in time with X-Partial-Result: true;
+    X-Next-Cursor continues the list
+    """
     try:
-        return get_coverage_rules(limit=limit)
+        with request_budget(FHIR_REQUEST_BUDGET):
+            page = await page_coverage_rules_async(limit=limit, cursor=cursor)
+        response.headers.update(page_headers(page))
+        return page.items
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         from fastapi import HTTPException
         raise HTTPException(status_code=500, detail=f"Error fetching coverage rules: {str(e)}")
@@ -2,6 +2,12 @@
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from backend.app.routers import intent, patients, doctors, hospitals, records, insurance, pharmacy
+from backend.app.config import FHIR_SYNC_ENABLED
+from backend.app.services.fhir_client import close_fhir_clients
+from backend.app.services.fhir_resilience import get_resilience_stats
+from backend.app.services.fhir_ratelimit import get_rate_limit_stats
+from backend.app.services.fhir_federation import close_federated_client
+from backend.app.services.fhir_sync import start_sync_worker, stop_sync_worker, get_sync_status
 
 app = FastAPI(title="Intent Healthcare Platform")
 
@@ -12,6 +18,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Paged FHIR lists signal partial results and continuation cursors in headers
+    expose_headers=["X-Partial-Result", "X-Next-Cursor"],
 )
 
 # Include routers
@@ -23,6 +31,24 @@ app.include_router(records.router, prefix="/api/v1")
 app.include_router(insurance.router, prefix="/api/v1")
 app.include_router(pharmacy.router, prefix="/api/v1")
 
+@app.on_event("startup")
+def start_fhir_sync():
+    # Mirror catalog resources locally so reads stop waiting on the FHIR server
+    if FHIR_SYNC_ENABLED:
+        start_sync_worker()
+
+@app.on_event("shutdown")
+async def shutdown_fhir_clients():
+    stop_sync_worker()
+    # Drain the pooled keep-alive connections to the FHIR server
+    await close_fhir_clients()
+    await close_federated_client()
+
+@app.get("/health/fhir")
+def fhir_health():
+    """Circuit breaker state, latency and retry counters per upstream FHIR host, rate-limit queue waits and local sync lag"""
+    return {"hosts": get_resilience_stats(), "rate_limits": get_rate_limit_stats(), "sync": get_sync_status()}
+
 @app.websocket("/ws/er")
 async def er(ws: WebSocket):
     await ws.accept()
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException
 from backend.app.services.data_service_router import get_all_patients, get_patient, create_patient, update_patient, delete_patient
+from backend.app.services.fhir_data_service import get_patient_summary_async
 from backend.app.models.patient import PatientCreate, PatientUpdate
 from typing import List
 
@@ -18,6 +19,18 @@ def get_patient_by_id(patient_id: str):
         raise HTTPException(status_code=404, detail="Patient not found")
     return patient
 
+@router.get("/{patient_id}/summary", response_model=dict)
+async def get_patient_summary(patient_id: str):
+    """
+    Get a patient's full view (details, visits, records, medical history, claims
+    and coverage) from FHIR server in one request
+    Sections still loading at the deadline are listed in "missing"
+    """
+    summary = await get_patient_summary_async(patient_id)
+    if summary is None:
+        raise HTTPException(status_code=404, detail="Patient not found")
+    return summary
+
 @router.post("/", response_model=dict)
 def create_new_patient(patient: PatientCreate):
     """Create a new patient"""
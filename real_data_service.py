@@ -6,12 +6,13 @@ from typing import List, Optional, Dict
 from datetime import datetime, timedelta
 import uuid
 import random
+from backend.app.services.compact_records import BedAvailabilityRecord, DoctorRecord, HospitalRecord, PatientRecord
 
-# In-memory storage with realistic data
-PATIENTS_DB: Dict[str, dict] = {}
-DOCTORS_DB: Dict[str, dict] = {}
-HOSPITALS_DB: Dict[str, dict] = {}
-BED_AVAILABILITY_DB: Dict[str, dict] = {}
+# In-memory storage with realistic data (slotted records keep large stores compact)
+PATIENTS_DB: Dict[str, PatientRecord] = {}
+DOCTORS_DB: Dict[str, DoctorRecord] = {}
+HOSPITALS_DB: Dict[str, HospitalRecord] = {}
+BED_AVAILABILITY_DB: Dict[str, BedAvailabilityRecord] = {}
 
 def generate_realistic_data():
     """Generate comprehensive realistic healthcare data"""
@@ -175,7 +176,7 @@ def generate_realistic_data():
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }
-        HOSPITALS_DB[hospital_id] = hospital
+        HOSPITALS_DB[hospital_id] = HospitalRecord(hospital)
 
     # Generate realistic doctors
     doctor_names = [
@@ -236,7 +237,7 @@ def generate_realistic_data():
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }
-        DOCTORS_DB[doctor_id] = doctor
+        DOCTORS_DB[doctor_id] = DoctorRecord(doctor)
 
     # Generate realistic patients
     patient_names = [
@@ -294,7 +295,7 @@ def generate_realistic_data():
             "created_at": datetime.now().isoformat(),
             "updated_at": datetime.now().isoformat()
         }
-        PATIENTS_DB[patient_id] = patient
+        PATIENTS_DB[patient_id] = PatientRecord(patient)
 
     # Generate bed availability data
     for hospital_id, hospital in HOSPITALS_DB.items():
@@ -329,7 +330,7 @@ def generate_realistic_data():
             "last_updated": datetime.now().isoformat(),
             "status": "Normal" if occupancy_rate < 0.85 else "High" if occupancy_rate < 0.95 else "Critical"
         }
-        BED_AVAILABILITY_DB[hospital_id] = bed_data
+        BED_AVAILABILITY_DB[hospital_id] = BedAvailabilityRecord(bed_data)
 
 # Initialize realistic data
 generate_realistic_data()
@@ -338,25 +339,23 @@ generate_realistic_data()
 def get_all_patients() -> List[dict]:
     return list(PATIENTS_DB.values())
 
+def count_patients() -> int:
+    return len(PATIENTS_DB)
+
 def get_patient(patient_id: str) -> Optional[dict]:
     return PATIENTS_DB.get(patient_id)
 
 def create_patient(patient_data: dict) -> dict:
     patient_id = str(uuid.uuid4())
-    patient = {
-        **patient_data,
-        "id": patient_id,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
+    now = datetime.now().isoformat()
+    patient = PatientRecord(patient_data, id=patient_id, created_at=now, updated_at=now)
     PATIENTS_DB[patient_id] = patient
     return patient
 
 def update_patient(patient_id: str, patient_data: dict) -> Optional[dict]:
     if patient_id not in PATIENTS_DB:
         return None
-    existing = PATIENTS_DB[patient_id]
-    updated = {**existing, **patient_data, "updated_at": datetime.now().isoformat()}
+    updated = PATIENTS_DB[patient_id].updated({**patient_data, "updated_at": datetime.now().isoformat()})
     PATIENTS_DB[patient_id] = updated
     return updated
 
@@ -381,20 +380,15 @@ def get_doctors_by_specialization(specialization: str) -> List[dict]:
 
 def create_doctor(doctor_data: dict) -> dict:
     doctor_id = str(uuid.uuid4())
-    doctor = {
-        **doctor_data,
-        "id": doctor_id,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
+    now = datetime.now().isoformat()
+    doctor = DoctorRecord(doctor_data, id=doctor_id, created_at=now, updated_at=now)
     DOCTORS_DB[doctor_id] = doctor
     return doctor
 
 def update_doctor(doctor_id: str, doctor_data: dict) -> Optional[dict]:
     if doctor_id not in DOCTORS_DB:
         return None
-    existing = DOCTORS_DB[doctor_id]
-    updated = {**existing, **doctor_data, "updated_at": datetime.now().isoformat()}
+    updated = DOCTORS_DB[doctor_id].updated({**doctor_data, "updated_at": datetime.now().isoformat()})
     DOCTORS_DB[doctor_id] = updated
     return updated
 
@@ -423,20 +417,15 @@ def search_hospitals(city: Optional[str] = None, state: Optional[str] = None, sp
 
 def create_hospital(hospital_data: dict) -> dict:
     hospital_id = str(uuid.uuid4())
-    hospital = {
-        **hospital_data,
-        "id": hospital_id,
-        "created_at": datetime.now().isoformat(),
-        "updated_at": datetime.now().isoformat()
-    }
+    now = datetime.now().isoformat()
+    hospital = HospitalRecord(hospital_data, id=hospital_id, created_at=now, updated_at=now)
     HOSPITALS_DB[hospital_id] = hospital
     return hospital
 
 def update_hospital(hospital_id: str, hospital_data: dict) -> Optional[dict]:
     if hospital_id not in HOSPITALS_DB:
         return None
-    existing = HOSPITALS_DB[hospital_id]
-    updated = {**existing, **hospital_data, "updated_at": datetime.now().isoformat()}
+    updated = HOSPITALS_DB[hospital_id].updated({**hospital_data, "updated_at": datetime.now().isoformat()})
     HOSPITALS_DB[hospital_id] = updated
     return updated
 
@@ -456,7 +445,6 @@ def get_all_bed_availability() -> List[dict]:
 def update_bed_availability(hospital_id: str, bed_data: dict) -> Optional[dict]:
     if hospital_id not in BED_AVAILABILITY_DB:
         return None
-    existing = BED_AVAILABILITY_DB[hospital_id]
-    updated = {**existing, **bed_data, "last_updated": datetime.now().isoformat()}
+    updated = BED_AVAILABILITY_DB[hospital_id].updated({**bed_data, "last_updated": datetime.now().isoformat()})
     BED_AVAILABILITY_DB[hospital_id] = updated
     return updated
\ No newline at end of file
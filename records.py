@@ -1,49 +1,81 @@
-from fastapi import APIRouter, HTTPException, Query
-from backend.app.services.fhir_data_service import get_medical_records, get_medical_history, get_patient_visits
+from fastapi import APIRouter, HTTPException, Query, Response
+from backend.app.config import FHIR_REQUEST_BUDGET
+from backend.app.services.fhir_data_service import (
+    page_medical_records_async, page_medical_history_async, page_patient_visits_async,
+    InvalidCursor, InvalidFields, page_headers, parse_fields
+)
+from backend.app.services.fhir_deadline import request_budget
 from typing import List, Optional
 
 router = APIRouter(prefix="/records", tags=["records"])
 
 @router.get("/", response_model=List[dict])
-def get_records(
+async def get_records(
+    response: Response,
     hospital_id: Optional[str] = Query(None, description="Filter by hospital ID"),
-    patient_id: Optional[str] = Query(None, description="Filter by patient ID")
+    patient_id: Optional[str] = Query(None, description="Filter by patient ID"),
+    limit: Optional[int] = Query(50, description="Maximum number of records to return", ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page")
 ):
     """
     Get medical records/encounters from FHIR server
-    Returns real-time data from FHIR Encounter resources
+    Returns real-time data from FHIR Encounter resources; X-Next-Cursor fetches the next page
     """
     try:
-        records = get_medical_records(hospital_id=hospital_id, patient_id=patient_id)
-        return records
+        with request_budget(FHIR_REQUEST_BUDGET):
+            page = await page_medical_records_async(hospital_id=hospital_id, patient_id=patient_id, limit=limit, cursor=cursor)
+        response.headers.update(page_headers(page))
+        return page.items
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching records: {str(e)}")
 
 @router.get("/medical-history", response_model=List[dict])
-def get_medical_history_endpoint(
+async def get_medical_history_endpoint(
+    response: Response,
     patient_id: Optional[str] = Query(None, description="Filter by patient ID"),
-    limit: Optional[int] = Query(20, description="Maximum number of records to return", ge=1, le=50)
+    limit: Optional[int] = Query(20, description="Maximum number of records to return", ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)")
 ):
     """
     Get medical history (conditions/diagnoses) from FHIR server
     Returns real-time data from FHIR Condition resources (limited to 20 by default for performance)
+    If the FHIR server is slow, returns what arrived in time with X-Partial-Result: true;
+    X-Next-Cursor continues the list; fields= computes and returns only the listed fields
     """
     try:
-        return get_medical_history(patient_id=patient_id, limit=limit)
+        with request_budget(FHIR_REQUEST_BUDGET):
+            page = await page_medical_history_async(patient_id=patient_id, limit=limit, cursor=cursor, fields=parse_fields(fields))
+        response.headers.update(page_headers(page))
+        return page.items
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching medical history: {str(e)}")
 
 @router.get("/visits", response_model=List[dict])
-def get_visits_endpoint(
+async def get_visits_endpoint(
+    response: Response,
     patient_id: Optional[str] = Query(None, description="Filter by patient ID"),
-    limit: Optional[int] = Query(20, description="Maximum number of visits to return", ge=1, le=50)
+    limit: Optional[int] = Query(20, description="Maximum number of visits to return", ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return (default: all)")
 ):
     """
     Get patient visits (encounters) from FHIR server
     Returns real-time data from FHIR Encounter resources (limited to 20 by default for performance)
+    If the FHIR server is slow, returns what arrived in time with X-Partial-Result: true;
+    X-Next-Cursor continues the list; fields= computes and returns only the listed fields
     """
     try:
-        return get_patient_visits(patient_id=patient_id, limit=limit)
+        with request_budget(FHIR_REQUEST_BUDGET):
+            page = await page_patient_visits_async(patient_id=patient_id, limit=limit, cursor=cursor, fields=parse_fields(fields))
+        response.headers.update(page_headers(page))
+        return page.items
+    except (InvalidCursor, InvalidFields) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching visits: {str(e)}")
 
@@ -0,0 +1,115 @@
+"""
+Single-flight request coalescing
+Concurrent calls with the same key share one in-flight execution and all
+waiters receive its result - each its own deep copy when the call was shared,
+so one caller mutating the result cannot leak into another's. Threadpool (sync) and asyncio callers share the
+same registry, so a sync request and an async request for the same FHIR
+resource also collapse into one upstream call.
+
+A waiter being cancelled never touches the shared call: a cancelled follower
+just stops waiting, and a cancelled leader withdraws its call so the followers
+(and new callers) start a fresh one instead of receiving the cancellation.
+The same goes for errors that belong to the leader's own request rather than
+to the call (see SingleFlight's personal errors).
+"""
+import asyncio
+import copy
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, Type
+
+class _Withdrawn(Exception):
+    """Set on a call whose leader was cancelled (or hit a personal error): its followers retry"""
+
+class SingleFlight:
+    def __init__(self, personal: Tuple[Type[BaseException], ...] = ()):
+        """
+        Args:
+            personal: Errors the leader raises for reasons of its own (e.g. its
+                request's spent time budget); followers retry the call rather
+                than share them
+        """
+        self.personal = personal
+        self._calls: Dict[Hashable, Future] = {}
+        # Followers per in-flight key
+        self._waiters: Dict[Hashable, int] = {}
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "shared": 0}
+    
+    def _join(self, key: Hashable):
+        """Return (future, is_leader) for key, registering a new call if none is in flight"""
+        with self._lock:
+            self.stats["calls"] += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self.stats["shared"] += 1
+                self._waiters[key] += 1
+                return future, False
+            future = Future()
+            self._calls[key] = future
+            self._waiters[key] = 0
+            return future, True
+    
+    def _finish(self, key: Hashable, future: Future) -> bool:
+        """Unregister the call (no one can join it after this); True if it was shared"""
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+                return self._waiters.pop(key) > 0
+            return True
+    
+    def _withdraw(self, key: Hashable, future: Future):
+        """Give up a call without a result, unregistering it first so the followers woken by _Withdrawn start a fresh one"""
+        self._finish(key, future)
+        future.set_exception(_Withdrawn())
+    
+    @staticmethod
+    def _leader_result(future: Future, shared: bool) -> Any:
+        # Followers copy the stored result, so a shared leader must not hand out (and let its caller mutate) the original
+        result = future.result()
+        return copy.deepcopy(result) if shared else result
+    
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run fn() unless an identical call is already in flight, then return its result"""
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return copy.deepcopy(future.result())
+            except _Withdrawn:
+                return self.do(key, fn)
+        shared = True
+        try:
+            future.set_result(fn())
+        except self.personal:
+            self._withdraw(key, future)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            shared = self._finish(key, future)
+        return self._leader_result(future, shared)
+    
+    async def do_async(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """Await fn() unless an identical call is already in flight, then return its result"""
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                # Shielded: cancelling this waiter must not cancel the call the others share
+                return copy.deepcopy(await asyncio.shield(asyncio.wrap_future(future)))
+            except _Withdrawn:
+                return await self.do_async(key, fn)
+        shared = True
+        try:
+            future.set_result(await fn())
+        except (asyncio.CancelledError, *self.personal):
+            self._withdraw(key, future)
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            shared = self._finish(key, future)
+        return self._leader_result(future, shared)
+    
+    def in_flight(self) -> int:
+        """Number of distinct calls currently executing"""
+        return len(self._calls)
@@ -80,7 +80,9 @@ interface MedicalRecord {
 export default function HospitalDetail({ hospitalId, onBack }: HospitalDetailProps) {
   const [hospital, setHospital] = useState<Hospital | null>(null);
   const [doctors, setDoctors] = useState<Doctor[]>([]);
-  const [patients, setPatients] = useState<Patient[]>([]);
+  // Loaded only when the Patients tab is opened (null until then)
+  const [patients, setPatients] = useState<Patient[] | null>(null);
+  const [patientCount, setPatientCount] = useState(0);
   const [records, setRecords] = useState<MedicalRecord[]>([]);
   const [bedData, setBedData] = useState<BedData | null>(null);
   const [loading, setLoading] = useState(true);
@@ -90,49 +92,39 @@ export default function HospitalDetail({ hospitalId, onBack }: HospitalDetailPro
     fetchHospitalData();
   }, [hospitalId]);
 
+  useEffect(() => {
+    if (activeTab === 'patients' && patients === null) {
+      fetchPatients();
+    }
+  }, [activeTab, patients]);
+
+  const fetchPatients = async () => {
+    try {
+      const patientsRes = await axios.get(`${API_BASE_URL}/api/v1/patients/`, {
+        timeout: 3000
+      });
+      setPatients(patientsRes.data);
+    } catch {
+      setPatients(await mockApiService.getPatients());
+    }
+  };
+
   const fetchHospitalData = async () => {
     try {
       setLoading(true);
       
       // Try backend API first, fallback to mock data
       try {
-        // Fetch hospital details
-        const hospitalRes = await axios.get(`${API_BASE_URL}/api/v1/hospitals/${hospitalId}`, {
+        // One composite request: hospital, doctors, beds, recent records and patient count
+        const detailRes = await axios.get(`${API_BASE_URL}/api/v1/hospitals/${hospitalId}/detail`, {
           timeout: 3000
         });
-        setHospital(hospitalRes.data);
-
-        // Fetch doctors for this hospital
-        const doctorsRes = await axios.get(`${API_BASE_URL}/api/v1/doctors/?hospital_id=${hospitalId}`, {
-          timeout: 3000
-        });
-        setDoctors(doctorsRes.data);
-
-        // Fetch all patients
-        const patientsRes = await axios.get(`${API_BASE_URL}/api/v1/patients/`, {
-          timeout: 3000
-        });
-        setPatients(patientsRes.data);
-
-        // Fetch bed availability data for this hospital
-        try {
-          const bedRes = await axios.get(`${API_BASE_URL}/api/v1/hospitals/${hospitalId}/beds`, {
-            timeout: 3000
-          });
-          setBedData(bedRes.data);
-        } catch {
-          setBedData(null);
-        }
-
-        // Fetch medical records
-        try {
-          const recordsRes = await axios.get(`${API_BASE_URL}/api/v1/records/?hospital_id=${hospitalId}`, {
-            timeout: 3000
-          });
-          setRecords(recordsRes.data || []);
-        } catch {
-          setRecords([]);
-        }
+        setHospital(detailRes.data.hospital);
+        setDoctors(detailRes.data.doctors || []);
+        setBedData(detailRes.data.beds || null);
+        setRecords(detailRes.data.records || []);
+        setPatientCount(detailRes.data.patient_count ?? 0);
+        setPatients(null);
 
       } catch (apiError) {
         console.log('Backend not available, using mock data');
@@ -146,6 +138,7 @@ export default function HospitalDetail({ hospitalId, onBack }: HospitalDetailPro
         
         const mockPatients = await mockApiService.getPatients();
         setPatients(mockPatients);
+        setPatientCount(mockPatients.length);
         
         const mockBedData = await mockApiService.getHospitalBeds(hospitalId);
         setBedData(mockBedData);
@@ -243,7 +236,7 @@ export default function HospitalDetail({ hospitalId, onBack }: HospitalDetailPro
           className={`tab-button ${activeTab === 'patients' ? 'active' : ''}`}
           onClick={() => setActiveTab('patients')}
         >
-          👥 Patients ({patients.length})
+          👥 Patients ({patientCount})
         </button>
         <button
           className={`tab-button ${activeTab === 'records' ? 'active' : ''}`}
@@ -415,7 +408,9 @@ export default function HospitalDetail({ hospitalId, onBack }: HospitalDetailPro
         {activeTab === 'patients' && (
           <div className="data-list">
             <h2>Patients at {hospital.name}</h2>
-            {patients.length === 0 ? (
+            {patients === null ? (
+              <div className="loading">Loading patients...</div>
+            ) : patients.length === 0 ? (
               <p className="no-data">No patients found</p>
             ) : (
               <div className="cards-grid">
@@ -26,6 +26,9 @@ export default function PatientMedicalHistory() {
   const [medicalHistory, setMedicalHistory] = useState<MedicalHistoryItem[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // Opaque cursor for the next page (from the X-Next-Cursor header), null when there is no more
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filterStatus, setFilterStatus] = useState<string>('all');
   const [filterCategory, setFilterCategory] = useState<string>('all');
   const [expandedItem, setExpandedItem] = useState<string | null>(null);
@@ -46,6 +49,7 @@ export default function PatientMedicalHistory() {
       
       const history = response.data || [];
       setMedicalHistory(history);
+      setNextCursor(response.headers['x-next-cursor'] || null);
       
       if (history.length === 0) {
         setError('No medical history found. The FHIR server may be slow or unavailable.');
@@ -64,6 +68,23 @@ export default function PatientMedicalHistory() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(`${API_BASE_URL}/api/v1/records/medical-history`, {
+        params: { limit: 20, cursor: nextCursor },
+        timeout: 20000
+      });
+      setMedicalHistory(prev => [...prev, ...(response.data || [])]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (err: any) {
+      console.error('Error fetching more medical history:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filteredHistory = medicalHistory.filter(item => {
     const statusMatch = filterStatus === 'all' || item.clinicalStatus.toLowerCase() === filterStatus.toLowerCase();
     const categoryMatch = filterCategory === 'all' || item.category.toLowerCase().includes(filterCategory.toLowerCase());
@@ -203,6 +224,25 @@ export default function PatientMedicalHistory() {
           ))}
         </div>
       ) : null}
+
+      {nextCursor && (
+        <div style={{ textAlign: 'center', margin: '20px 0' }}>
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            style={{
+              padding: '10px 20px',
+              background: loadingMore ? '#ccc' : '#1E88E5',
+              color: 'white',
+              border: 'none',
+              borderRadius: '4px',
+              cursor: loadingMore ? 'not-allowed' : 'pointer'
+            }}
+          >
+            {loadingMore ? 'Loading more records...' : 'Load more records'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
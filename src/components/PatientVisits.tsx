@@ -28,6 +28,9 @@ export default function PatientVisits() {
   const [visits, setVisits] = useState<PatientVisit[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  // Opaque cursor for the next page (from the X-Next-Cursor header), null when there is no more
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [filterStatus, setFilterStatus] = useState<string>('all');
   const [filterType, setFilterType] = useState<string>('all');
   const [expandedVisit, setExpandedVisit] = useState<string | null>(null);
@@ -48,6 +51,7 @@ export default function PatientVisits() {
       
       const visitsData = response.data || [];
       setVisits(visitsData);
+      setNextCursor(response.headers['x-next-cursor'] || null);
       
       if (visitsData.length === 0) {
         setError('No visits found. The FHIR server may be slow or unavailable.');
@@ -66,6 +70,23 @@ export default function PatientVisits() {
     }
   };
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const response = await axios.get(`${API_BASE_URL}/api/v1/records/visits`, {
+        params: { limit: 20, cursor: nextCursor },
+        timeout: 20000
+      });
+      setVisits(prev => [...prev, ...(response.data || [])]);
+      setNextCursor(response.headers['x-next-cursor'] || null);
+    } catch (err: any) {
+      console.error('Error fetching more visits:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const filteredVisits = visits.filter(visit => {
     const statusMatch = filterStatus === 'all' || visit.status.toLowerCase() === filterStatus.toLowerCase();
     const typeMatch = filterType === 'all' || visit.encounterType.toLowerCase().includes(filterType.toLowerCase());
@@ -231,6 +252,25 @@ export default function PatientVisits() {
           ))}
         </div>
       ) : null}
+
+      {nextCursor && (
+        <div style={{ textAlign: 'center', margin: '20px 0' }}>
+          <button
+            onClick={loadMore}
+            disabled={loadingMore}
+            style={{
+              padding: '10px 20px',
+              background: loadingMore ? '#ccc' : '#1E88E5',
+              color: 'white',
+              border: 'none',
+              borderRadius: '4px',
+              cursor: loadingMore ? 'not-allowed' : 'pointer'
+            }}
+          >
+            {loadingMore ? 'Loading more visits...' : 'Load more visits'}
+          </button>
+        </div>
+      )}
     </div>
   );
 }
@@ -0,0 +1,42 @@
+"""
+Tests for the compact record types held by the stores and the result cache
+"""
+from backend.app.services import fhir_data_service
+from backend.app.services.compact_records import DoctorRecord, HospitalRecord, VisitRecord
+from backend.app.services.fhir_bulk import to_store_row
+from backend.app.services.fhir_mapper import map_many
+from backend.app.services.fhir_store import FHIRStore
+
+ORGANIZATION = {"resourceType": "Organization", "id": "org-1", "name": "Quincy Community Hospital",
+                "type": [{"coding": [{"code": "prov"}]}]}
+
+def test_local_store_hands_out_records():
+    store = FHIRStore(":memory:")
+    store.upsert_many("Organization", [to_store_row(ORGANIZATION)])
+    
+    hospital = store.get("Organization", "org-1")
+    assert isinstance(hospital, HospitalRecord) and hospital["name"] == "Quincy Community Hospital"
+    assert isinstance(store.all("Organization")[0], HospitalRecord)
+    assert isinstance(store.find_coded("Organization", "$.type", "prov", mapped=True)[0], HospitalRecord)
+    # Raw resources stay plain dicts
+    assert type(store.get_resource("Organization", "org-1")) is dict
+
+def test_cache_holds_records(monkeypatch):
+    fhir_data_service.invalidate_cache()
+    doctors = [{"id": "1", "first_name": "Adaeze", "last_name": "Okafor"}]
+    monkeypatch.setattr(fhir_data_service, "_search_doctors", lambda params, fields=None: [dict(doctor) for doctor in doctors])
+    
+    first = fhir_data_service.get_all_doctors(use_cache=True)
+    second = fhir_data_service.get_all_doctors(use_cache=True)
+    
+    assert all(isinstance(doctor, DoctorRecord) for doctor in first + second)
+    assert second == doctors and second[0] is not first[0]
+    fhir_data_service.invalidate_cache()
+
+def test_map_many_compact_builds_visit_records():
+    encounters = [{"resourceType": "Encounter", "id": "e-1", "status": "finished"}]
+    
+    visits = map_many("Encounter", encounters, compact=True)
+    
+    assert isinstance(visits[0], VisitRecord)
+    assert visits[0].to_dict() == map_many("Encounter", encounters)[0]
@@ -0,0 +1,122 @@
+"""
+Tests for Bulk Data $export ingestion, against a local stand-in FHIR server
+serving the recorded NDJSON files in fixtures/bulk_export
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+import pytest
+from backend.app.services.fhir_bulk import BulkExportError, run_export
+from backend.app.services.fhir_client import FHIRClient
+from backend.app.services.fhir_json import dumps
+from backend.app.services.fhir_store import FHIRStore
+
+FIXTURES = Path(__file__).parent / "fixtures" / "bulk_export"
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """$export kick-off, status polling (one 202 first) and NDJSON downloads"""
+    
+    def log_message(self, *args):
+        pass
+    
+    def _send(self, status: int, body: bytes = b"", headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_GET(self):
+        server = self.server
+        url = urlparse(self.path)
+        base = f"http://127.0.0.1:{server.server_port}"
+        if url.path == "/fhir/$export":
+            server.kickoffs.append(parse_qs(url.query))
+            job = len(server.kickoffs)
+            self._send(202, headers={"Content-Location": f"{base}/status/{job}"})
+        elif url.path.startswith("/status/"):
+            job = int(url.path.rsplit("/", 1)[1])
+            if job > len(server.kickoffs):
+                # Unknown or expired job
+                self._send(404)
+                return
+            server.polls[job] = server.polls.get(job, 0) + 1
+            if server.polls[job] == 1:
+                self._send(202, headers={"Retry-After": "0"})
+                return
+            types = server.kickoffs[job - 1].get("_type", ["Patient,Organization"])[0].split(",")
+            manifest = {
+                "transactionTime": "2024-03-06T00:00:00Z",
+                "request": f"{base}/fhir/$export",
+                "output": [{"type": t, "url": f"{base}/files/{t}.ndjson"} for t in types],
+                "error": []
+            }
+            self._send(200, dumps(manifest), {"Content-Type": "application/json"})
+        elif url.path.startswith("/files/"):
+            name = url.path.rsplit("/", 1)[1]
+            body = (FIXTURES / name).read_bytes()
+            if server.truncate.pop(name, False):
+                # Drop the connection part-way through the file
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body[:len(body) // 2])
+                self.close_connection = True
+                return
+            self._send(200, body, {"Content-Type": "application/fhir+ndjson"})
+        else:
+            self._send(404)
+
+@pytest.fixture
+def stand_in():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StandInHandler)
+    server.kickoffs, server.polls, server.truncate = [], {}, {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, FHIRClient(f"http://127.0.0.1:{server.server_port}/fhir")
+    server.shutdown()
+    server.server_close()
+
+def test_export_ingests_recorded_ndjson(stand_in):
+    server, client = stand_in
+    store = FHIRStore(":memory:")
+    
+    summary = run_export(["Patient", "Organization"], client=client, store=store, workers=2)
+    
+    assert summary["resources"] == {"Patient": 5, "Organization": 3}
+    assert summary["transaction_time"] == "2024-03-06T00:00:00Z"
+    assert store.count("Patient") == 5
+    assert store.get("Patient", "592911")["last_name"] == "Garcia"
+    assert store.get("Organization", "611002")["name"] == "Quincy Community Hospital"
+    assert len(server.kickoffs) == 1
+
+def test_interrupted_export_resumes_only_with_matching_parameters(stand_in):
+    server, client = stand_in
+    store = FHIRStore(":memory:")
+    server.truncate["Patient.ndjson"] = True
+    
+    with pytest.raises(BulkExportError):
+        run_export(["Patient"], since="2024-01-01T00:00:00Z", client=client, store=store)
+    
+    # Another export's parameters start a new job rather than resuming the broken one
+    assert run_export(["Organization"], client=client, store=store)["resources"] == {"Organization": 3}
+    assert len(server.kickoffs) == 2
+    
+    summary = run_export(["Patient"], since="2024-01-01T00:00:00Z", client=client, store=store)
+    assert len(server.kickoffs) == 2
+    assert summary["status_url"].endswith("/status/1")
+    assert store.count("Patient") == 5
+
+def test_expired_job_is_abandoned_for_a_new_export(stand_in):
+    server, client = stand_in
+    store = FHIRStore(":memory:")
+    # An export kicked off by an earlier run whose status URL has since expired
+    store.begin_export(f"{client.base_url.rsplit('/', 1)[0]}/status/99", ["Patient"], None)
+    
+    summary = run_export(["Patient"], client=client, store=store)
+    
+    assert summary["status_url"].endswith("/status/1")
+    assert summary["resources"] == {"Patient": 5}
+    assert store.unfinished_export(["Patient"], None) is None
@@ -0,0 +1,39 @@
+"""
+Tests for the FHIR TTL/LRU cache behind fhir_data_service
+"""
+from backend.app.services.fhir_cache import FHIRCache
+
+def test_callers_get_their_own_copy():
+    cache = FHIRCache(ttls={"Organization": 60})
+    first = cache.get_or_fetch("Organization", {"_count": 50}, lambda: [{"id": "1", "specialties": ["ICU"]}])
+    first[0]["specialties"].append("mutated")
+    first.append({"id": "2"})
+    
+    second = cache.get_or_fetch("Organization", {"_count": 50}, lambda: [])
+    
+    assert second == [{"id": "1", "specialties": ["ICU"]}]
+    assert cache.get("Organization", {"_count": 50}) == second
+
+def test_fetch_overlapping_invalidation_is_not_cached():
+    cache = FHIRCache(ttls={"Organization": 60})
+    
+    def fetch_during_write():
+        # The write (and its invalidation) lands while this read is in flight
+        cache.invalidate("Organization")
+        return [{"id": "1", "name": "Old name"}]
+    
+    assert cache.get_or_fetch("Organization", {}, fetch_during_write) == [{"id": "1", "name": "Old name"}]
+    assert cache.get("Organization", {}) is None
+    
+    cache.get_or_fetch("Organization", {}, lambda: [{"id": "1", "name": "New name"}])
+    assert cache.get("Organization", {}) == [{"id": "1", "name": "New name"}]
+
+def test_full_invalidation_also_blocks_overlapping_fetches():
+    cache = FHIRCache(ttls={"Patient": 60})
+    
+    def fetch_during_clear():
+        cache.invalidate()
+        return [{"id": "p1"}]
+    
+    cache.get_or_fetch("Patient", {}, fetch_during_clear)
+    assert len(cache) == 0
@@ -0,0 +1,59 @@
+"""
+Tests for FHIR client error handling
+"""
+import asyncio
+import httpx
+import pytest
+import requests
+from backend.app.services.fhir_client import AsyncFHIRClient, FHIRClient, write_entry
+
+NOT_JSON = [b"<html><body>502 Bad Gateway</body></html>", b""]
+
+def _response(body: bytes) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response._content = body
+    response.headers["Content-Type"] = "text/html"
+    return response
+
+@pytest.mark.parametrize("body", NOT_JSON)
+def test_non_json_success_body_gives_empty_results(monkeypatch, body):
+    client = FHIRClient("http://not-json.test/fhir")
+    monkeypatch.setattr(client.session, "request", lambda *args, **kwargs: _response(body))
+    
+    assert client.read("Patient", "1") is None
+    assert client.search("Patient", {"name": "lee"}) == []
+    assert client.batch_read(["Patient/1"]) == {"Patient/1": None}
+    assert client.create("Patient", {"resourceType": "Patient"}) is None
+    assert client.transaction([write_entry({"resourceType": "Patient"})]) == [None]
+
+def test_count_asks_for_the_total_only(monkeypatch):
+    client = FHIRClient("http://count.test/fhir")
+    sent = []
+    
+    def request(method, url, params=None, **kwargs):
+        sent.append(params)
+        response = _response(b'{"resourceType": "Bundle", "type": "searchset", "total": 1234}')
+        response.headers["Content-Type"] = "application/fhir+json"
+        return response
+    
+    monkeypatch.setattr(client.session, "request", request)
+    
+    assert client.count("Patient", {"gender": "female"}) == 1234
+    assert sent == [{"gender": "female", "_summary": "count"}]
+
+@pytest.mark.parametrize("body", NOT_JSON)
+def test_non_json_success_body_gives_empty_results_async(body):
+    async def main():
+        client = AsyncFHIRClient("http://not-json-async.test/fhir")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200, content=body)))
+        try:
+            assert await client.read("Patient", "1") is None
+            assert await client.search("Patient", {"name": "lee"}) == []
+            assert await client.batch_read(["Patient/1"]) == {"Patient/1": None}
+            assert await client.update("Patient", "1", {"resourceType": "Patient"}) is None
+            assert await client.transaction([write_entry({"resourceType": "Patient"})]) == [None]
+        finally:
+            await client.aclose()
+    
+    asyncio.run(main())
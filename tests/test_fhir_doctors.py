@@ -0,0 +1,36 @@
+"""
+Tests for doctor searches against the FHIR server
+"""
+from backend.app.services import fhir_data_service
+
+class _Directory:
+    """A server with a PractitionerRole for every practitioner of a common specialty"""
+    
+    def __init__(self, size):
+        self.size = size
+        self.roles_read = 0
+        self.batch_reads = []
+    
+    def supports_search_param(self, resource_type, name):
+        return True
+    
+    def iter_search(self, resource_type, params=None, **kwargs):
+        for n in range(self.size):
+            self.roles_read += 1
+            yield {"resourceType": "PractitionerRole", "practitioner": {"reference": f"Practitioner/{n}"},
+                   "specialty": [{"text": "Cardiology"}]}
+    
+    def batch_read(self, refs):
+        self.batch_reads.append(refs)
+        return {ref: {"resourceType": "Practitioner", "id": ref.split("/")[1]} for ref in refs}
+
+def test_specialty_search_stops_at_the_limit(monkeypatch):
+    directory = _Directory(5000)
+    monkeypatch.setattr(fhir_data_service, "get_fhir_client", lambda asynchronous=False: directory)
+    
+    doctors = fhir_data_service.get_doctors_by_specialization("Cardiology", use_cache=False, limit=20)
+    
+    assert [doctor["id"] for doctor in doctors] == [str(n) for n in range(20)]
+    assert doctors[0]["specialization"] == "Cardiology"
+    assert directory.roles_read == 20
+    assert len(directory.batch_reads[0]) == 20
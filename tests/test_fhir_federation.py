@@ -0,0 +1,26 @@
+"""
+Tests for merging federated FHIR search results
+"""
+from backend.app.services.fhir_federation import merge_results, resource_sources
+
+MRN_SYSTEM = "http://hospital-a.example.org/mrn"
+
+def _patient(resource_id: str, *identifiers) -> dict:
+    return {"resourceType": "Patient", "id": resource_id, "identifier": list(identifiers)}
+
+def test_identifiers_with_a_system_are_merged_across_servers():
+    shared = {"system": MRN_SYSTEM, "value": "12345"}
+    merged = merge_results([("a", [_patient("a-1", shared)]), ("b", [_patient("b-9", shared)])])
+    
+    assert [patient["id"] for patient in merged] == ["a-1"]
+    assert resource_sources(merged[0]) == ["a", "b"]
+
+def test_bare_identifier_values_are_not_merged():
+    merged = merge_results([
+        ("a", [_patient("a-1", {"value": "12345"})]),
+        ("b", [_patient("b-9", {"value": "12345"}), _patient("b-10", {"system": "", "value": "12345"})])
+    ])
+    
+    assert [(patient["id"], resource_sources(patient)) for patient in merged] == [
+        ("a-1", ["a"]), ("b-9", ["b"]), ("b-10", ["b"])
+    ]
@@ -0,0 +1,27 @@
+"""
+Tests for batch mapping with map_many
+"""
+import pytest
+from backend.app.services.fhir_mapper import map_many
+
+PATIENTS = [
+    {"resourceType": "Patient", "id": "1", "name": [{"family": "Lee", "given": ["Ann"]}]},
+    {"resourceType": "Patient", "id": "2", "name": "not a list of HumanNames"},
+    {"resourceType": "Patient", "id": "3", "name": [{"family": "Diaz"}]}
+]
+
+def test_map_many_lists_and_streams_one_batch():
+    records = map_many("Patient", [PATIENTS[0], PATIENTS[2]])
+    assert [record["last_name"] for record in records] == ["Lee", "Diaz"]
+    # The whole batch shares one timestamp
+    assert records[0]["created_at"] == records[1]["created_at"]
+    
+    streamed = map_many("Patient", iter(PATIENTS), lazy=True, skip_errors=True)
+    assert iter(streamed) is streamed
+    assert [record["id"] for record in streamed] == ["1", "3"]
+
+def test_map_many_skips_failures_only_when_asked():
+    with pytest.raises(Exception):
+        map_many("Patient", PATIENTS)
+    assert [record["id"] for record in map_many("Patient", PATIENTS, skip_errors=True, limit=1)] == ["1"]
+    assert [record["id"] for record in map_many("Patient", PATIENTS, skip_errors=True, limit=2)] == ["1", "3"]
@@ -0,0 +1,49 @@
+"""
+Tests for continuation cursors over FHIR searches
+"""
+import pytest
+from backend.app.services.fhir_data_service import InvalidCursor, _encode_cursor_data, decode_cursor, encode_cursor
+
+BASE = "http://fhir.test/baseR4"
+PARAMS = {"_count": 20, "subject": "Patient/7"}
+
+def _forged(url: str, resource_type: str = "Encounter", params: dict = None) -> str:
+    return _encode_cursor_data({"t": resource_type, "f": {"subject": "Patient/7"}, "u": url, "p": params, "s": 0})
+
+def test_cursor_resumes_the_same_search():
+    position = (f"{BASE}/Encounter", PARAMS, 5)
+    cursor = encode_cursor(position, "Encounter", PARAMS)
+    
+    assert decode_cursor(cursor, BASE, "Encounter", PARAMS) == position
+    # The page size may change between pages
+    assert decode_cursor(cursor, BASE, "Encounter", {**PARAMS, "_count": 50}) == position
+
+def test_paging_links_are_accepted():
+    getpages = f"{BASE}?_getpages=2c6e7a&_getpagesoffset=20&_count=20"
+    assert decode_cursor(_forged(getpages), BASE, "Encounter", PARAMS) == (getpages, None, 0)
+    
+    offset_link = f"{BASE}/Encounter?subject=Patient/7&_offset=20"
+    assert decode_cursor(_forged(offset_link), BASE, "Encounter", PARAMS)[0] == offset_link
+
+@pytest.mark.parametrize("resource_type,params", [
+    ("Condition", PARAMS),
+    ("Encounter", {"_count": 20, "subject": "Patient/8"}),
+    ("Encounter", {"_count": 20})
+])
+def test_cursor_from_another_search_is_rejected(resource_type, params):
+    cursor = encode_cursor((f"{BASE}/Encounter", PARAMS, 5), "Encounter", PARAMS)
+    
+    with pytest.raises(InvalidCursor):
+        decode_cursor(cursor, BASE, resource_type, params)
+
+@pytest.mark.parametrize("url,params", [
+    ("http://elsewhere.test/baseR4/Encounter", None),
+    (f"{BASE}/Patient?_count=1000", None),
+    (f"{BASE}/Encounter/1/_history", None),
+    (f"{BASE}/$export", None),
+    (f"{BASE}?_format=json", None),
+    (f"{BASE}/Encounter", {"subject": "Patient/8"})
+])
+def test_forged_cursor_is_rejected(url, params):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(_forged(url, params=params), BASE, "Encounter", PARAMS)
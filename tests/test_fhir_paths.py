@@ -0,0 +1,60 @@
+"""
+Tests for declarative FHIR path specs and the mappers compiled from them
+"""
+from backend.app.services.fhir_mapper import fhir_allergy_intolerance_to_allergy, fhir_encounter_to_record
+from backend.app.services.fhir_paths import Field, compile_path, compile_spec
+
+def _hand_written_encounter_to_record(fhir_encounter, now=None):
+    """fhir_encounter_to_record as it was before it became a spec"""
+    return {
+        "id": fhir_encounter.get("id"),
+        "patient_id": fhir_encounter.get("subject", {}).get("reference", "").replace("Patient/", ""),
+        "patient_name": None,
+        "encounter_type": fhir_encounter.get("class", {}).get("display", "Unknown"),
+        "status": fhir_encounter.get("status", "unknown"),
+        "timestamp": fhir_encounter.get("period", {}).get("start") or now,
+        "hospital_id": fhir_encounter.get("serviceProvider", {}).get("reference", "").replace("Organization/", "")
+    }
+
+ENCOUNTERS = [
+    {
+        "resourceType": "Encounter", "id": "enc-1", "status": "finished",
+        "class": {"system": "http://terminology.hl7.org/CodeSystem/v3-ActCode", "code": "AMB", "display": "ambulatory"},
+        "subject": {"reference": "Patient/592911", "display": "Ana Garcia"},
+        "period": {"start": "2024-01-01T10:00:00Z", "end": "2024-01-01T10:30:00Z"},
+        "serviceProvider": {"reference": "Organization/611002"}
+    },
+    {
+        "resourceType": "Encounter", "id": "enc-2", "status": "in-progress",
+        "class": {"code": "IMP"},
+        "subject": {"reference": "Patient/592912"}
+    },
+    {"resourceType": "Encounter", "id": "enc-3"}
+]
+
+def test_encounter_record_spec_matches_the_hand_written_mapper():
+    now = "2024-06-01T00:00:00"
+    for encounter in ENCOUNTERS:
+        assert fhir_encounter_to_record(encounter, now) == _hand_written_encounter_to_record(encounter, now)
+
+def test_reactions_fall_back_per_reaction():
+    allergy = fhir_allergy_intolerance_to_allergy({
+        "resourceType": "AllergyIntolerance", "id": "1",
+        "reaction": [
+            {"manifestation": [{"text": "Hives"}]},
+            {"manifestation": [{"coding": [{"code": "271807003", "display": "Rash"}]}]},
+            {"severity": "mild"}
+        ]
+    })
+    assert allergy["reactions"] == ["Hives", "Rash"]
+
+def test_wrongly_shaped_elements_read_as_missing():
+    mapper = compile_spec({
+        "first": Field("category[0]", "none"),
+        "where": "telecom[system=email].value",
+        "all": "note[*].text",
+        "key": "code.text"
+    })
+    resource = {"category": {"code": "food"}, "telecom": {"system": "email"}, "note": "text", "code": [{"text": "x"}]}
+    assert mapper(resource) == {"first": "none", "where": None, "all": [], "key": None}
+    assert compile_path("code.coding[0].code", "unknown")({"code": {"coding": {"0": {"code": "x"}}}}) == "unknown"
@@ -0,0 +1,22 @@
+"""
+Tests for client-side FHIR rate limiting
+"""
+import pytest
+from backend.app.services.fhir_ratelimit import TokenBucket
+
+def test_reservations_after_a_pause_are_spaced_at_the_rate():
+    bucket = TokenBucket(rate=10, burst=2)
+    bucket.pause(1.0)
+    
+    waits = [bucket.reserve() for _ in range(3)]
+    
+    # One token every 0.1s once the pause is over, not all at once when it ends
+    assert waits == [pytest.approx(expected, abs=0.02) for expected in (1.1, 1.2, 1.3)]
+
+def test_reservations_without_a_pause_use_the_burst_first():
+    bucket = TokenBucket(rate=10, burst=2)
+    
+    waits = [bucket.reserve() for _ in range(4)]
+    
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == [pytest.approx(expected, abs=0.02) for expected in (0.1, 0.2)]
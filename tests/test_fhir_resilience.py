@@ -0,0 +1,110 @@
+"""
+Tests for the FHIR clients' circuit breaker handling
+"""
+import asyncio
+import httpx
+import pytest
+import requests
+from backend.app.services import fhir_data_service
+from backend.app.services.fhir_client import AsyncFHIRClient, FHIRClient
+from backend.app.services.fhir_deadline import DeadlineExceeded, request_budget
+from backend.app.services.fhir_resilience import CircuitBreaker, for_host
+
+def _half_open_ready(netloc: str) -> CircuitBreaker:
+    """The host's breaker, open with its reset period already over (the next request is the trial)"""
+    breaker = for_host(netloc).breaker
+    breaker.state = CircuitBreaker.OPEN
+    breaker.opened_at = 0.0
+    breaker.reset_seconds = 0.0
+    return breaker
+
+def test_cancelled_trial_frees_the_breaker():
+    breaker = _half_open_ready("cancelled-trial.test")
+    
+    async def slow(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200, json={})
+    
+    async def main():
+        client = AsyncFHIRClient("http://cancelled-trial.test/fhir")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(slow))
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client._request("GET", "http://cancelled-trial.test/fhir/Patient/1"), 0.05)
+        await client.aclose()
+    
+    asyncio.run(main())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+def test_unexpected_error_ends_the_trial_as_a_failure(monkeypatch):
+    breaker = _half_open_ready("broken-trial.test")
+    client = FHIRClient("http://broken-trial.test/fhir")
+    
+    def broken(*args, **kwargs):
+        raise ValueError("malformed response")
+    
+    monkeypatch.setattr(client.session, "request", broken)
+    with pytest.raises(ValueError):
+        client._request("GET", "http://broken-trial.test/fhir/Patient/1")
+    
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.allow()
+
+def test_budget_timeout_frees_the_breaker(monkeypatch):
+    breaker = _half_open_ready("budget-trial.test")
+    client = FHIRClient("http://budget-trial.test/fhir")
+    
+    def timed_out(*args, **kwargs):
+        raise requests.exceptions.ReadTimeout("read timed out")
+    
+    monkeypatch.setattr(client.session, "request", timed_out)
+    with request_budget(5):
+        with pytest.raises(DeadlineExceeded):
+            client._request("GET", "http://budget-trial.test/fhir/Patient/1", timeout=20)
+    
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+def test_budget_timeout_frees_the_breaker_async():
+    breaker = _half_open_ready("budget-trial-async.test")
+    
+    def timed_out(request):
+        raise httpx.ReadTimeout("read timed out", request=request)
+    
+    async def main():
+        client = AsyncFHIRClient("http://budget-trial-async.test/fhir")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(timed_out))
+        with request_budget(5):
+            with pytest.raises(DeadlineExceeded):
+                await client._request("GET", "http://budget-trial-async.test/fhir/Patient/1", timeout=20)
+        await client.aclose()
+    
+    asyncio.run(main())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow()
+
+def test_deadline_stops_a_page_search_without_cancelling_the_request(monkeypatch):
+    breaker = _half_open_ready("slow-page.test")
+    bundle = {"resourceType": "Bundle", "type": "searchset",
+              "entry": [{"resource": {"resourceType": "Encounter", "id": str(n)}} for n in range(1, 4)]}
+    
+    async def slow(request):
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, json=bundle)
+    
+    async def main():
+        client = AsyncFHIRClient("http://slow-page.test/fhir")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(slow))
+        monkeypatch.setattr(fhir_data_service, "get_fhir_client", lambda asynchronous=False: client)
+        with request_budget(0.05):
+            page = await fhir_data_service._page_search_async(
+                "Encounter", {"_count": 3}, lambda resource, now: {"id": resource["id"]}, limit=3)
+        await client.aclose()
+        return page
+    
+    page = asyncio.run(main())
+    
+    # The page that was in flight when the budget ran out still arrives and counts for the host
+    assert page.items == [{"id": "1"}]
+    assert page.partial and page.next_cursor
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,71 @@
+"""
+Tests for incremental FHIR sync and locally served catalog reads
+"""
+from backend.app.services import fhir_data_service, fhir_sync
+from backend.app.services.fhir_bulk import to_store_row
+from backend.app.services.fhir_store import FHIRStore
+from backend.app.services.fhir_sync import FHIRSyncWorker
+
+def _practitioner(resource_id: str, version: str, last_updated: str) -> dict:
+    return {
+        "resourceType": "Practitioner", "id": resource_id,
+        "meta": {"versionId": version, "lastUpdated": last_updated},
+        "name": [{"family": f"Family{resource_id}", "given": ["Given"]}]
+    }
+
+def _entry(resource: dict) -> dict:
+    return {"resource": resource, "request": {"method": "PUT", "url": f"Practitioner/{resource['id']}"}}
+
+class _HistoryClient:
+    """Answers _history the way servers do: _since is inclusive"""
+    base_url = "http://history.test/fhir"
+    
+    def __init__(self, entries):
+        self.entries = entries
+    
+    def history(self, resource_type, since=None, page_size=200):
+        return [entry for entry in self.entries
+                if not since or entry["resource"]["meta"]["lastUpdated"] >= since]
+
+def test_boundary_changes_are_applied_once(monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(fhir_sync, "invalidate_cache", invalidated.append)
+    store = FHIRStore(":memory:")
+    store.apply_changes("Practitioner", [], [], "2024-05-01T00:00:00Z")
+    client = _HistoryClient([
+        _entry(_practitioner("1", "1", "2024-05-01T10:00:00Z")),
+        _entry(_practitioner("2", "1", "2024-05-01T11:00:00Z"))
+    ])
+    worker = FHIRSyncWorker(["Practitioner"], client=client, store=store)
+    
+    assert worker.sync_once() == {"Practitioner": 2}
+    assert store.sync_state("Practitioner")["high_water"] == "2024-05-01T11:00:00Z"
+    
+    # The next poll sees practitioner 2 again at the high-water instant
+    assert worker.sync_once() == {"Practitioner": 0}
+    assert invalidated == ["Practitioner"]
+    
+    # A second change stamped with the same instant is still picked up
+    client.entries.append(_entry(_practitioner("3", "1", "2024-05-01T11:00:00Z")))
+    client.entries[1] = _entry(_practitioner("2", "2", "2024-05-01T11:00:00Z"))
+    assert worker.sync_once() == {"Practitioner": 2}
+    assert store.get_resource("Practitioner", "2")["meta"]["versionId"] == "2"
+
+def test_local_hospitals_match_prov_in_any_coding():
+    store = FHIRStore(":memory:")
+    organizations = [
+        {"resourceType": "Organization", "id": "first", "name": "First",
+         "type": [{"coding": [{"code": "prov"}]}]},
+        {"resourceType": "Organization", "id": "second-coding", "name": "Second coding",
+         "type": [{"coding": [{"code": "other"}, {"code": "prov"}]}]},
+        {"resourceType": "Organization", "id": "second-type", "name": "Second type",
+         "type": [{"text": "Teaching"}, {"coding": [{"code": "prov"}]}]},
+        {"resourceType": "Organization", "id": "payer", "name": "Payer",
+         "type": [{"coding": [{"code": "pay"}]}]},
+        {"resourceType": "Organization", "id": "untyped", "name": "Untyped"}
+    ]
+    store.upsert_many("Organization", [to_store_row(resource) for resource in organizations])
+    
+    hospitals = fhir_data_service._local_hospitals(store)
+    
+    assert [hospital["id"] for hospital in hospitals] == ["first", "second-coding", "second-type"]
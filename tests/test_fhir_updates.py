@@ -0,0 +1,129 @@
+"""
+Tests for updates that change only the FHIR elements of changed fields
+"""
+import copy
+import pytest
+from backend.app.services import fhir_data_service
+from backend.app.services.fhir_mapper import fhir_organization_to_hospital, fhir_practitioner_to_doctor
+
+SNOMED = "http://snomed.info/sct"
+
+# As served upstream (trimmed HAPI / Synthea output), including elements our models do not cover
+PRACTITIONER = {
+    "resourceType": "Practitioner", "id": "pr-1",
+    "meta": {"versionId": "3", "lastUpdated": "2024-04-02T09:00:00Z"},
+    "active": False,
+    "identifier": [
+        {"system": "http://hl7.org/fhir/sid/us-npi", "value": "9999912345"},
+        {"type": {"coding": [{"system": "http://terminology.hl7.org/CodeSystem/v2-0203", "code": "LN"}]},
+         "value": "MA-44120"}
+    ],
+    "name": [
+        {"use": "official", "family": "Okafor", "given": ["Adaeze"], "prefix": ["Dr."]},
+        {"use": "maiden", "family": "Eze", "given": ["Adaeze"]}
+    ],
+    "telecom": [
+        {"system": "phone", "value": "555-0100", "use": "work"},
+        {"system": "fax", "value": "555-0101", "use": "work"},
+        {"system": "email", "value": "a.okafor@example.org", "use": "work"}
+    ],
+    "qualification": [{
+        "code": {"coding": [{"system": SNOMED, "code": "309343006", "display": "Physician"}], "text": "MD"},
+        "issuer": {"display": "Massachusetts Board of Registration in Medicine"}
+    }]
+}
+
+ORGANIZATION = {
+    "resourceType": "Organization", "id": "org-1",
+    "meta": {"versionId": "7", "lastUpdated": "2024-04-02T09:00:00Z"},
+    "active": False,
+    "type": [{"coding": [{"system": "http://terminology.hl7.org/CodeSystem/organization-type",
+                          "code": "prov", "display": "Healthcare Provider"}]}],
+    "name": "Quincy Community Hospital",
+    "telecom": [
+        {"system": "phone", "value": "617-555-0100", "use": "work"},
+        {"system": "fax", "value": "617-555-0199", "use": "work"},
+        {"system": "url", "value": "https://quincy.example.org"}
+    ],
+    "address": [{"line": ["114 Whitwell St"], "city": "Quincy", "state": "MA", "postalCode": "02169"}]
+}
+
+class _Server:
+    """batch_read answers with the stored resource; transaction records the entries it is sent"""
+    
+    def __init__(self, resource):
+        self.resource = resource
+        self.written = []
+    
+    def batch_read(self, references):
+        return {reference: copy.deepcopy(self.resource) for reference in references}
+    
+    def transaction(self, entries):
+        self.written.extend(entry["resource"] for entry in entries)
+        return [{"id": entry["resource"]["id"]} for entry in entries]
+
+@pytest.fixture
+def server(monkeypatch):
+    def serve(resource):
+        upstream = _Server(resource)
+        monkeypatch.setattr(fhir_data_service, "get_fhir_client", lambda asynchronous=False: upstream)
+        return upstream
+    return serve
+
+def _unchanged(resource, written, *keys):
+    """Everything but keys (and meta) is exactly what was read"""
+    return ({k: v for k, v in written.items() if k not in keys}
+            == {k: v for k, v in resource.items() if k not in keys + ("meta",)})
+
+def test_practitioner_update_changes_only_the_changed_elements(server):
+    upstream = server(PRACTITIONER)
+    
+    record = fhir_data_service.update_doctor("pr-1", {"phone": "555-0200", "last_name": "Okafor-Eze"})
+    written = upstream.written[0]
+    
+    assert record["phone"] == "555-0200" and record["last_name"] == "Okafor-Eze"
+    assert _unchanged(PRACTITIONER, written, "telecom", "name")
+    assert written["telecom"] == [
+        {"system": "phone", "value": "555-0200", "use": "work"},
+        PRACTITIONER["telecom"][1], PRACTITIONER["telecom"][2]
+    ]
+    assert written["name"] == [{**PRACTITIONER["name"][0], "family": "Okafor-Eze"}, PRACTITIONER["name"][1]]
+
+def test_practitioner_specialization_and_license_merge_into_existing(server):
+    upstream = server(PRACTITIONER)
+    
+    fhir_data_service.update_doctor("pr-1", {"specialization": "Cardiology", "license_number": "MA-50001"})
+    written = upstream.written[0]
+    
+    assert _unchanged(PRACTITIONER, written, "identifier", "qualification")
+    assert written["identifier"] == [PRACTITIONER["identifier"][0], {**PRACTITIONER["identifier"][1], "value": "MA-50001"}]
+    assert written["qualification"] == [{
+        "code": {"coding": [{"system": SNOMED, "display": "Cardiology"}], "text": "MD"},
+        "issuer": PRACTITIONER["qualification"][0]["issuer"]
+    }]
+    doctor = fhir_practitioner_to_doctor(written)
+    assert (doctor["specialization"], doctor["license_number"]) == ("Cardiology", "MA-50001")
+
+def test_organization_update_keeps_codes_telecoms_and_flags(server):
+    upstream = server(ORGANIZATION)
+    
+    fhir_data_service.update_hospital("org-1", {"city": "Braintree", "emergency_phone": "617-555-0911"})
+    written = upstream.written[0]
+    
+    assert _unchanged(ORGANIZATION, written, "address", "telecom")
+    assert written["address"] == [{**ORGANIZATION["address"][0], "city": "Braintree"}]
+    assert written["telecom"] == ORGANIZATION["telecom"] + [{"system": "phone", "value": "617-555-0911", "use": "mobile"}]
+    
+    # Nothing that was not asked for: no invented "General" type, no country, active stays false
+    fhir_data_service.update_hospital("org-1", {"name": "Quincy Medical Center"})
+    assert upstream.written[1] == {**{k: v for k, v in ORGANIZATION.items() if k != "meta"}, "name": "Quincy Medical Center"}
+
+def test_organization_specialties_keep_the_provider_coding(server):
+    upstream = server(ORGANIZATION)
+    
+    fhir_data_service.update_hospital("org-1", {"specialties": ["Healthcare Provider", "Cardiology"]})
+    written = upstream.written[0]
+    
+    assert _unchanged(ORGANIZATION, written, "type")
+    assert written["type"] == ORGANIZATION["type"] + [{"coding": [{"display": "Cardiology"}]}]
+    assert fhir_organization_to_hospital(written)["specialties"] == ["Healthcare Provider", "Cardiology"]
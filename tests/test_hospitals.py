@@ -0,0 +1,66 @@
+"""
+Tests for the hospital endpoints
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from backend.app.routers import hospitals
+from backend.app.services import fhir_data_service, real_data_service
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(hospitals.router)
+    return TestClient(app)
+
+def test_unknown_hospital_detail_is_404_before_fan_out(client, monkeypatch):
+    def fetched(*args, **kwargs):
+        raise AssertionError("fetched data for a hospital that does not exist")
+    
+    for name in ("get_doctors_by_hospital", "get_bed_availability", "count_patients", "get_medical_records_async"):
+        monkeypatch.setattr(hospitals, name, fetched)
+    
+    response = client.get("/hospitals/no-such-hospital/detail")
+    
+    assert response.status_code == 404
+
+def test_hospital_detail_serializes_bed_records(client, monkeypatch):
+    async def no_records(hospital_id=None, patient_id=None, **kwargs):
+        return []
+    
+    monkeypatch.setattr(hospitals, "get_medical_records_async", no_records)
+    hospital_id = next(iter(real_data_service.HOSPITALS_DB))
+    
+    response = client.get(f"/hospitals/{hospital_id}/detail")
+    
+    assert response.status_code == 200
+    detail = response.json()
+    assert detail["hospital"]["id"] == hospital_id
+    assert detail["beds"] == real_data_service.BED_AVAILABILITY_DB[hospital_id].to_dict()
+    assert detail["patient_count"] == len(real_data_service.PATIENTS_DB)
+
+def test_bed_endpoints_return_records_as_objects(client):
+    hospital_id = next(iter(real_data_service.HOSPITALS_DB))
+    
+    assert client.get(f"/hospitals/{hospital_id}/beds").json()["hospital_id"] == hospital_id
+    assert len(client.get("/hospitals/beds/all").json()) == len(real_data_service.BED_AVAILABILITY_DB)
+    assert client.get("/hospitals/beds/summary").json()["detailed_data"][0]["total_beds"] > 0
+
+def test_hospital_detail_asks_for_the_most_recent_records(client, monkeypatch):
+    searches = []
+    
+    class _Client:
+        async def search(self, resource_type, params=None, **kwargs):
+            searches.append((resource_type, params))
+            return [{"resourceType": "Encounter", "id": str(n), "period": {"start": f"2024-0{n}-01T00:00:00Z"}}
+                    for n in (3, 1, 2)]
+    
+    monkeypatch.setattr(fhir_data_service, "get_fhir_client", lambda asynchronous=False: _Client())
+    hospital_id = next(iter(real_data_service.HOSPITALS_DB))
+    
+    records = client.get(f"/hospitals/{hospital_id}/detail").json()["records"]
+    
+    assert searches == [("Encounter", {"_count": hospitals.DETAIL_RECENT_RECORDS, "_sort": "-date",
+                                       "service-provider": f"Organization/{hospital_id}"})]
+    # A server that ignores _sort still gives the newest first
+    assert [record["id"] for record in records] == ["3", "2", "1"]
@@ -0,0 +1,65 @@
+"""
+Tests for the concurrent patient summary fan-out
+"""
+import asyncio
+import httpx
+from backend.app.services import fhir_data_service
+from backend.app.services.fhir_client import AsyncFHIRClient
+
+EMPTY_BUNDLE = {"resourceType": "Bundle", "type": "searchset", "entry": []}
+
+def _summary(monkeypatch, host, handler, **kwargs):
+    async def main():
+        client = AsyncFHIRClient(f"http://{host}/fhir")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(fhir_data_service, "get_fhir_client", lambda asynchronous=False: client)
+        try:
+            return await fhir_data_service.get_patient_summary_async("1", **kwargs)
+        finally:
+            await client.aclose()
+    
+    return asyncio.run(main())
+
+def test_failed_patient_read_is_partial_not_missing(monkeypatch):
+    def handler(request):
+        if request.url.path.endswith("/Patient/1"):
+            return httpx.Response(500, json={"resourceType": "OperationOutcome"})
+        return httpx.Response(200, json=EMPTY_BUNDLE)
+    
+    summary = _summary(monkeypatch, "summary-error.test", handler)
+    
+    assert summary["patient"] is None
+    assert summary["partial"] and "patient" in summary["missing"]
+
+def test_unknown_patient_gives_none(monkeypatch):
+    def handler(request):
+        if request.url.path.endswith("/Patient/1"):
+            return httpx.Response(404, json={"resourceType": "OperationOutcome"})
+        return httpx.Response(200, json=EMPTY_BUNDLE)
+    
+    assert _summary(monkeypatch, "summary-unknown.test", handler) is None
+
+def test_deadline_leaves_shared_reads_to_other_requests(monkeypatch):
+    async def handler(request):
+        if request.url.path.endswith("/Patient/1"):
+            await asyncio.sleep(0.2)
+            return httpx.Response(200, json={"resourceType": "Patient", "id": "1", "name": [{"family": "Lee"}]})
+        return httpx.Response(200, json=EMPTY_BUNDLE)
+    
+    async def main():
+        client = AsyncFHIRClient("http://summary-shared.test/fhir")
+        client.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(fhir_data_service, "get_fhir_client", lambda asynchronous=False: client)
+        try:
+            # Another request joins the summary's Patient read, then the summary hits its deadline
+            summary = asyncio.ensure_future(fhir_data_service.get_patient_summary_async("1", deadline=0.05))
+            await asyncio.sleep(0.01)
+            other = await client.read("Patient", "1")
+            return await summary, other
+        finally:
+            await client.aclose()
+    
+    summary, other = asyncio.run(main())
+    
+    assert summary["missing"] == ["patient"]
+    assert other["name"] == [{"family": "Lee"}]
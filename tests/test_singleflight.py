@@ -0,0 +1,114 @@
+"""
+Tests for single-flight request coalescing
+"""
+import asyncio
+import threading
+import time
+from backend.app.services.singleflight import SingleFlight
+
+def test_shared_callers_get_independent_results():
+    flight = SingleFlight()
+    release = threading.Event()
+    results = []
+    
+    def fetch():
+        release.wait(5)
+        return [{"id": "1", "telecom": [{"value": "555"}]}]
+    
+    threads = [threading.Thread(target=lambda: results.append(flight.do("read", fetch))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while flight.stats["shared"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    results[0][0]["telecom"].append({"value": "mutated"})
+    results[1].clear()
+    assert results[2] == [{"id": "1", "telecom": [{"value": "555"}]}]
+    assert flight.in_flight() == 0
+
+def test_unshared_call_returns_the_result_itself():
+    flight = SingleFlight()
+    value = {"id": "1"}
+    assert flight.do("read", lambda: value) is value
+
+def test_async_callers_get_independent_results():
+    flight = SingleFlight()
+    
+    async def fetch():
+        await asyncio.sleep(0.01)
+        return {"id": "1", "name": [{"family": "Lee"}]}
+    
+    async def main():
+        return await asyncio.gather(*(flight.do_async("read", fetch) for _ in range(3)))
+    
+    first, second, third = asyncio.run(main())
+    first["name"][0]["family"] = "mutated"
+    assert second == third == {"id": "1", "name": [{"family": "Lee"}]}
+    assert flight.stats == {"calls": 3, "shared": 2}
+
+def test_cancelled_follower_leaves_the_shared_call_alone():
+    flight = SingleFlight()
+    
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return {"id": "1"}
+    
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("read", fetch))
+        followers = [asyncio.ensure_future(flight.do_async("read", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        followers[0].cancel()
+        return await asyncio.gather(leader, *followers, return_exceptions=True)
+    
+    leader, cancelled, follower = asyncio.run(main())
+    assert isinstance(cancelled, asyncio.CancelledError)
+    assert leader == follower == {"id": "1"}
+    assert flight.in_flight() == 0
+
+def test_cancelled_leader_hands_the_call_to_its_followers():
+    flight = SingleFlight()
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"id": "1"}
+    
+    async def main():
+        leader = asyncio.ensure_future(flight.do_async("read", fetch))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.ensure_future(flight.do_async("read", fetch)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await asyncio.gather(leader, *followers, return_exceptions=True)
+    
+    leader, *followers = asyncio.run(main())
+    assert isinstance(leader, asyncio.CancelledError)
+    assert followers == [{"id": "1"}, {"id": "1"}]
+    # One follower took over as leader of a fresh call, the other joined it
+    assert len(calls) == 2
+    assert flight.in_flight() == 0
+
+def test_personal_error_is_not_shared():
+    class BudgetSpent(Exception):
+        pass
+    
+    flight = SingleFlight(personal=(BudgetSpent,))
+    calls = []
+    
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        if len(calls) == 1:
+            raise BudgetSpent()
+        return {"id": "1"}
+    
+    async def main():
+        return await asyncio.gather(*(flight.do_async("read", fetch) for _ in range(2)), return_exceptions=True)
+    
+    leader, follower = asyncio.run(main())
+    assert isinstance(leader, BudgetSpent)
+    assert follower == {"id": "1"} and len(calls) == 2